@@ -23,13 +23,71 @@ interface IAddressesProvider {
  *******************************************************/
 contract AllowlistImplementationIronBank {
   address public addressesProviderAddress;
+  mapping(address => mapping(address => bool)) public indexedUnderlyingTokens; // Underlying tokens stored by refreshMarketUnderlyingTokens, per registry adapter
+  mapping(address => address[]) internal indexedUnderlyingTokensLists; // Used to clear an adapter's index on refresh
 
   constructor(address _addressesProviderAddress) {
     addressesProviderAddress = _addressesProviderAddress;
   }
 
+  /**
+   * @notice Rebuild the current registry adapter's underlying token index
+   * @dev Permissionless: the index only ever contains tokens reported by the adapter.
+   * Indexes are kept per adapter, so tokens indexed from a replaced adapter are never answered.
+   */
+  function refreshMarketUnderlyingTokens() public {
+    address _registryAdapterAddress = registryAdapterAddress();
+    address[] storage indexedTokensAddresses = indexedUnderlyingTokensLists[
+      _registryAdapterAddress
+    ];
+    for (
+      uint256 tokenIdx;
+      tokenIdx < indexedTokensAddresses.length;
+      tokenIdx++
+    ) {
+      indexedUnderlyingTokens[_registryAdapterAddress][
+        indexedTokensAddresses[tokenIdx]
+      ] = false;
+    }
+    address[] memory tokensAddresses = IRegistryAdapter(
+      _registryAdapterAddress
+    ).assetsTokensAddresses();
+    for (uint256 tokenIdx; tokenIdx < tokensAddresses.length; tokenIdx++) {
+      indexedUnderlyingTokens[_registryAdapterAddress][
+        tokensAddresses[tokenIdx]
+      ] = true;
+    }
+    indexedUnderlyingTokensLists[_registryAdapterAddress] = tokensAddresses;
+  }
+
+  /**
+   * @notice Fetch all indexed underlying tokens of the current registry adapter
+   * @return Returns the underlying tokens stored by the last refresh
+   */
+  function indexedUnderlyingTokensList()
+    external
+    view
+    returns (address[] memory)
+  {
+    return indexedUnderlyingTokensLists[registryAdapterAddress()];
+  }
+
+  /**
+   * @notice Determine whether a token is in the current registry adapter's index
+   * @param tokenAddress The token address to test
+   * @return Returns true if the last refresh for the current adapter indexed the token
+   */
+  function isIndexedUnderlyingToken(address tokenAddress)
+    public
+    view
+    returns (bool)
+  {
+    return indexedUnderlyingTokens[registryAdapterAddress()][tokenAddress];
+  }
+
   /**
    * @notice Determine whether a given token is a valid market underlying token
+   * @dev Indexed tokens are answered with a single storage read, index misses fall back to the registry adapter
    * @param tokenAddress The market token address to test
    * @return Returns true if the token address is a valid underlying token, false if not
    */
@@ -38,7 +96,11 @@ contract AllowlistImplementationIronBank {
     view
     returns (bool)
   {
-    address[] memory tokensAddresses = registryAdapter()
+    IRegistryAdapter _registryAdapter = registryAdapter();
+    if (indexedUnderlyingTokens[address(_registryAdapter)][tokenAddress]) {
+      return true;
+    }
+    address[] memory tokensAddresses = _registryAdapter
       .assetsTokensAddresses();
     for (uint256 tokenIdx; tokenIdx < tokensAddresses.length; tokenIdx++) {
       address currentTokenAddress = tokensAddresses[tokenIdx];
@@ -81,9 +143,10 @@ contract AllowlistImplementationIronBank {
     view
     returns (bool)
   {
+    IComptroller _comptroller = comptroller();
     for (uint256 marketIdx; marketIdx < marketAddresses.length; marketIdx++) {
       address marketAddress = marketAddresses[marketIdx];
-      if (!isMarket(marketAddress)) {
+      if (!_comptroller.isMarketListed(marketAddress)) {
         return false;
       }
     }
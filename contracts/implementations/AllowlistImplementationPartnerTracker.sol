@@ -48,9 +48,10 @@ contract AllowlistImplementationPartnerTracker {
         } catch {
             return false;
         }
-        uint256 numVaults = registry().numVaults(tokenAddress);
+        IRegistry _registry = registry();
+        uint256 numVaults = _registry.numVaults(tokenAddress);
         for (uint256 vaultIdx; vaultIdx < numVaults; vaultIdx++) {
-            address currentVaultAddress = registry().vaults(tokenAddress, vaultIdx);
+            address currentVaultAddress = _registry.vaults(tokenAddress, vaultIdx);
             if (currentVaultAddress == vaultAddress) {
                 return true;
             }
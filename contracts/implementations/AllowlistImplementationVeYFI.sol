@@ -38,6 +38,8 @@ contract AllowlistImplementationVeYFI {
   mapping(address => bool) public isZapClaimContract; // Used to test zap claim contracts
   bytes32 public veYfiId; // id for our snapshot voting space
 
+  event ZapClaimContractSet(address indexed contractAddress, bool allowed);
+
   constructor(
     address _addressesProviderAddress,
     address _allowlistRegistryAddress,
@@ -74,6 +76,7 @@ contract AllowlistImplementationVeYFI {
     onlyOwner
   {
     isZapClaimContract[contractAddress] = allowed;
+    emit ZapClaimContractSet(contractAddress, allowed);
   }
 
   /**
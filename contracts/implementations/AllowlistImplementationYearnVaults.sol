@@ -42,6 +42,13 @@ contract AllowlistImplementationYearnVaults {
   mapping(address => bool) public isZapOutContract; // Used to test zap out contracts
   mapping(address => bool) public isMigratorContract; // Used to test migrator contracts
   mapping(address => bool) public isPickleJarContract; // Used to test the pickle jar zap
+  mapping(address => mapping(address => bool)) public cachedVaults; // Vaults read by syncVaults, per registry
+  mapping(address => mapping(address => uint256)) public syncedVaultsLengths; // Number of vaults synced, per registry and token
+
+  event ZapInContractSet(address indexed contractAddress, bool allowed);
+  event ZapOutContractSet(address indexed contractAddress, bool allowed);
+  event MigratorContractSet(address indexed contractAddress, bool allowed);
+  event PickleJarContractSet(address indexed contractAddress, bool allowed);
 
   constructor(
     address _addressesProviderAddress,
@@ -77,6 +84,7 @@ contract AllowlistImplementationYearnVaults {
     onlyOwner
   {
     isZapInContract[contractAddress] = allowed;
+    emit ZapInContractSet(contractAddress, allowed);
   }
 
   /**
@@ -89,6 +97,7 @@ contract AllowlistImplementationYearnVaults {
     onlyOwner
   {
     isZapOutContract[contractAddress] = allowed;
+    emit ZapOutContractSet(contractAddress, allowed);
   }
 
   /**
@@ -101,6 +110,7 @@ contract AllowlistImplementationYearnVaults {
     onlyOwner
   {
     isMigratorContract[contractAddress] = allowed;
+    emit MigratorContractSet(contractAddress, allowed);
   }
 
   /**
@@ -113,6 +123,7 @@ contract AllowlistImplementationYearnVaults {
     onlyOwner
   {
     isPickleJarContract[contractAddress] = allowed;
+    emit PickleJarContractSet(contractAddress, allowed);
   }
 
   /**
@@ -128,12 +139,72 @@ contract AllowlistImplementationYearnVaults {
     return registry().isRegistered(tokenAddress);
   }
 
+  /**
+   * @notice Determine whether or not a vault was cached from the current registry
+   * @dev Vaults cached from a previous registry are ignored
+   * @param vaultAddress The vault address to test
+   * @return Returns true if the vault was synced from the current registry
+   */
+  function isCachedVault(address vaultAddress) public view returns (bool) {
+    return cachedVaults[registryAddress()][vaultAddress];
+  }
+
+  /**
+   * @notice Number of vaults of the current registry synced for a token
+   * @param tokenAddress The vault token address
+   * @return Returns the number of registry vaults cached for the token
+   */
+  function syncedVaultsLength(address tokenAddress)
+    public
+    view
+    returns (uint256)
+  {
+    return syncedVaultsLengths[registryAddress()][tokenAddress];
+  }
+
+  /**
+   * @notice Cache vaults registered for a token since the last sync
+   * @dev Permissionless: only addresses read from the registry are ever cached.
+   *      The cache is keyed by registry, so a registry change starts a new cache
+   * @param tokenAddress The vault token to sync vaults for
+   */
+  function syncVaults(address tokenAddress) public {
+    address _registryAddress = registryAddress();
+    IRegistry _registry = IRegistry(_registryAddress);
+    uint256 numVaults = _registry.numVaults(tokenAddress);
+    for (
+      uint256 vaultIdx = syncedVaultsLengths[_registryAddress][tokenAddress];
+      vaultIdx < numVaults;
+      vaultIdx++
+    ) {
+      cachedVaults[_registryAddress][
+        _registry.vaults(tokenAddress, vaultIdx)
+      ] = true;
+    }
+    syncedVaultsLengths[_registryAddress][tokenAddress] = numVaults;
+  }
+
+  /**
+   * @notice Cache vaults registered for a list of tokens since the last sync
+   * @param tokenAddresses The vault tokens to sync vaults for
+   */
+  function syncVaultsForTokens(address[] memory tokenAddresses) external {
+    for (uint256 tokenIdx; tokenIdx < tokenAddresses.length; tokenIdx++) {
+      syncVaults(tokenAddresses[tokenIdx]);
+    }
+  }
+
   /**
    * @notice Determine whether or not a vault address is a valid vault
+   * @dev Vaults cached from the current registry are answered with a single storage read, cache misses fall back to the registry
    * @param vaultAddress The vault address to test
    * @return Returns true if the valid address is valid and false if not
    */
   function isVault(address vaultAddress) public view returns (bool) {
+    address _registryAddress = registryAddress();
+    if (cachedVaults[_registryAddress][vaultAddress]) {
+      return true;
+    }
     IVault vault = IVault(vaultAddress);
     address tokenAddress;
     try vault.token() returns (address _tokenAddress) {
@@ -141,9 +212,10 @@ contract AllowlistImplementationYearnVaults {
     } catch {
       return false;
     }
-    uint256 numVaults = registry().numVaults(tokenAddress);
+    IRegistry _registry = IRegistry(_registryAddress);
+    uint256 numVaults = _registry.numVaults(tokenAddress);
     for (uint256 vaultIdx; vaultIdx < numVaults; vaultIdx++) {
-      address currentVaultAddress = registry().vaults(tokenAddress, vaultIdx);
+      address currentVaultAddress = _registry.vaults(tokenAddress, vaultIdx);
       if (currentVaultAddress == vaultAddress) {
         return true;
       }
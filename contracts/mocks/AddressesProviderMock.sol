@@ -0,0 +1,13 @@
+// SPDX-License-Identifier: MIT
+pragma solidity 0.8.11;
+
+/**
+ * @notice Local stand-in for the Yearn addresses provider
+ */
+contract AddressesProviderMock {
+  mapping(string => address) public addressById;
+
+  function setAddress(string memory id, address _address) external {
+    addressById[id] = _address;
+  }
+}
@@ -0,0 +1,434 @@
+// SPDX-License-Identifier: MIT
+pragma solidity 0.8.11;
+
+/*******************************************************
+ *                      Allowlist
+ *******************************************************/
+/**
+ * @notice Local stand-in for an eth-allowlist allowlist, used by the test suite on a development chain
+ * @dev Conditions are evaluated like the real allowlist: the selector is derived from methodName + paramTypes
+ *      and every requirement is forwarded to the implementation as `<method>(<paramType>)`
+ */
+contract AllowlistMock {
+  struct Condition {
+    string id;
+    string implementationId;
+    string methodName;
+    string[] paramTypes;
+    string[][] requirements;
+  }
+
+  string public name;
+  address public registryAddress;
+  string[] public conditionsIds;
+  mapping(string => address) public implementationById;
+  mapping(bytes32 => Condition) internal conditionByIdHash;
+  mapping(bytes32 => uint256) internal conditionPositionByIdHash; // Index in conditionsIds + 1
+
+  constructor(string memory _name, address _registryAddress) {
+    name = _name;
+    registryAddress = _registryAddress;
+  }
+
+  /**
+   * @notice Only allow protocol owner to perform certain actions
+   */
+  modifier onlyOwner() {
+    require(
+      msg.sender ==
+        AllowlistRegistryMock(registryAddress).protocolOwnerAddressByOriginName(
+          name
+        ),
+      "Caller is not the protocol owner"
+    );
+    _;
+  }
+
+  /*******************************************************
+   *                   Condition management
+   *******************************************************/
+  function setImplementation(
+    string memory implementationId,
+    address implementationAddress
+  ) public onlyOwner {
+    implementationById[implementationId] = implementationAddress;
+  }
+
+  /**
+   * @notice Add a condition, replacing any existing condition with the same id
+   */
+  function addCondition(Condition memory condition) public onlyOwner {
+    bytes32 idHash = keccak256(bytes(condition.id));
+    if (conditionPositionByIdHash[idHash] == 0) {
+      conditionsIds.push(condition.id);
+      conditionPositionByIdHash[idHash] = conditionsIds.length;
+    }
+    delete conditionByIdHash[idHash];
+    Condition storage storedCondition = conditionByIdHash[idHash];
+    storedCondition.id = condition.id;
+    storedCondition.implementationId = condition.implementationId;
+    storedCondition.methodName = condition.methodName;
+    for (uint256 paramIdx; paramIdx < condition.paramTypes.length; paramIdx++) {
+      storedCondition.paramTypes.push(condition.paramTypes[paramIdx]);
+    }
+    for (
+      uint256 requirementIdx;
+      requirementIdx < condition.requirements.length;
+      requirementIdx++
+    ) {
+      storedCondition.requirements.push();
+      string[] memory requirement = condition.requirements[requirementIdx];
+      for (uint256 partIdx; partIdx < requirement.length; partIdx++) {
+        storedCondition.requirements[requirementIdx].push(requirement[partIdx]);
+      }
+    }
+  }
+
+  function addConditions(Condition[] memory conditions) public onlyOwner {
+    for (uint256 conditionIdx; conditionIdx < conditions.length; conditionIdx++) {
+      addCondition(conditions[conditionIdx]);
+    }
+  }
+
+  function updateCondition(Condition memory condition) public onlyOwner {
+    require(
+      conditionPositionByIdHash[keccak256(bytes(condition.id))] != 0,
+      "Condition does not exist"
+    );
+    addCondition(condition);
+  }
+
+  function deleteCondition(string memory id) public onlyOwner {
+    bytes32 idHash = keccak256(bytes(id));
+    uint256 position = conditionPositionByIdHash[idHash];
+    require(position != 0, "Condition does not exist");
+    uint256 lastIdx = conditionsIds.length - 1;
+    if (position - 1 != lastIdx) {
+      string memory lastId = conditionsIds[lastIdx];
+      conditionsIds[position - 1] = lastId;
+      conditionPositionByIdHash[keccak256(bytes(lastId))] = position;
+    }
+    conditionsIds.pop();
+    delete conditionPositionByIdHash[idHash];
+    delete conditionByIdHash[idHash];
+  }
+
+  function deleteConditions(string[] memory ids) public onlyOwner {
+    for (uint256 idIdx; idIdx < ids.length; idIdx++) {
+      deleteCondition(ids[idIdx]);
+    }
+  }
+
+  /*******************************************************
+   *                   Condition reads
+   *******************************************************/
+  function conditionsLength() public view returns (uint256) {
+    return conditionsIds.length;
+  }
+
+  function conditionById(string memory id)
+    public
+    view
+    returns (Condition memory)
+  {
+    return conditionByIdHash[keccak256(bytes(id))];
+  }
+
+  function conditionsList() public view returns (Condition[] memory) {
+    Condition[] memory conditions = new Condition[](conditionsIds.length);
+    for (uint256 conditionIdx; conditionIdx < conditionsIds.length; conditionIdx++) {
+      conditions[conditionIdx] = conditionById(conditionsIds[conditionIdx]);
+    }
+    return conditions;
+  }
+
+  function conditionsJson() public view returns (string memory) {
+    bytes memory json = "[";
+    for (uint256 conditionIdx; conditionIdx < conditionsIds.length; conditionIdx++) {
+      if (conditionIdx > 0) {
+        json = abi.encodePacked(json, ",");
+      }
+      json = abi.encodePacked(
+        json,
+        conditionJson(conditionByIdHash[keccak256(bytes(conditionsIds[conditionIdx]))])
+      );
+    }
+    return string(abi.encodePacked(json, "]"));
+  }
+
+  function conditionJson(Condition storage condition)
+    internal
+    view
+    returns (bytes memory)
+  {
+    bytes memory requirementsJson = "[";
+    for (
+      uint256 requirementIdx;
+      requirementIdx < condition.requirements.length;
+      requirementIdx++
+    ) {
+      if (requirementIdx > 0) {
+        requirementsJson = abi.encodePacked(requirementsJson, ",");
+      }
+      requirementsJson = abi.encodePacked(
+        requirementsJson,
+        stringsJson(condition.requirements[requirementIdx])
+      );
+    }
+    return
+      abi.encodePacked(
+        '{"id":"',
+        condition.id,
+        '","implementationId":"',
+        condition.implementationId,
+        '","methodName":"',
+        condition.methodName,
+        '","paramTypes":',
+        stringsJson(condition.paramTypes),
+        ',"requirements":',
+        requirementsJson,
+        "]}"
+      );
+  }
+
+  function stringsJson(string[] storage values)
+    internal
+    view
+    returns (bytes memory)
+  {
+    bytes memory json = "[";
+    for (uint256 valueIdx; valueIdx < values.length; valueIdx++) {
+      if (valueIdx > 0) {
+        json = abi.encodePacked(json, ",");
+      }
+      json = abi.encodePacked(json, '"', values[valueIdx], '"');
+    }
+    return abi.encodePacked(json, "]");
+  }
+
+  /*******************************************************
+   *                   Validation
+   *******************************************************/
+  function validateCalldata(address targetAddress, bytes calldata data)
+    public
+    view
+    returns (bool)
+  {
+    if (data.length < 4) {
+      return false;
+    }
+    bytes4 selector = bytes4(data[:4]);
+    for (uint256 conditionIdx; conditionIdx < conditionsIds.length; conditionIdx++) {
+      Condition storage condition = conditionByIdHash[
+        keccak256(bytes(conditionsIds[conditionIdx]))
+      ];
+      if (
+        methodSelector(condition) == selector &&
+        conditionPasses(condition, targetAddress, data)
+      ) {
+        return true;
+      }
+    }
+    return false;
+  }
+
+  function methodSelector(Condition storage condition)
+    internal
+    view
+    returns (bytes4)
+  {
+    bytes memory signature = abi.encodePacked(condition.methodName, "(");
+    for (uint256 paramIdx; paramIdx < condition.paramTypes.length; paramIdx++) {
+      if (paramIdx > 0) {
+        signature = abi.encodePacked(signature, ",");
+      }
+      signature = abi.encodePacked(signature, condition.paramTypes[paramIdx]);
+    }
+    return bytes4(keccak256(abi.encodePacked(signature, ")")));
+  }
+
+  function conditionPasses(
+    Condition storage condition,
+    address targetAddress,
+    bytes calldata data
+  ) internal view returns (bool) {
+    address implementationAddress = implementationById[
+      condition.implementationId
+    ];
+    if (implementationAddress == address(0)) {
+      return false;
+    }
+    for (
+      uint256 requirementIdx;
+      requirementIdx < condition.requirements.length;
+      requirementIdx++
+    ) {
+      string[] storage requirement = condition.requirements[requirementIdx];
+      (
+        bool decoded,
+        string memory paramType,
+        bytes memory argument
+      ) = requirementArgument(condition, requirement, targetAddress, data);
+      if (
+        !decoded ||
+        !requirementPasses(implementationAddress, requirement[1], paramType, argument)
+      ) {
+        return false;
+      }
+    }
+    return true;
+  }
+
+  /**
+   * @dev Find the argument forwarded to the implementation for a requirement
+   */
+  function requirementArgument(
+    Condition storage condition,
+    string[] storage requirement,
+    address targetAddress,
+    bytes calldata data
+  )
+    internal
+    view
+    returns (
+      bool,
+      string memory,
+      bytes memory
+    )
+  {
+    if (keccak256(bytes(requirement[0])) != keccak256("param")) {
+      return (true, "address", abi.encode(targetAddress));
+    }
+    uint256 paramIdx = parseUint(requirement[2]);
+    if (paramIdx >= condition.paramTypes.length) {
+      return (false, "", "");
+    }
+    string memory paramType = condition.paramTypes[paramIdx];
+    (bool decoded, bytes memory argument) = encodedParameter(
+      data,
+      paramType,
+      paramIdx
+    );
+    return (decoded, paramType, argument);
+  }
+
+  function requirementPasses(
+    address implementationAddress,
+    string storage methodName,
+    string memory paramType,
+    bytes memory argument
+  ) internal view returns (bool) {
+    bytes4 requirementSelector = bytes4(
+      keccak256(abi.encodePacked(methodName, "(", paramType, ")"))
+    );
+    (bool success, bytes memory result) = implementationAddress.staticcall(
+      abi.encodePacked(requirementSelector, argument)
+    );
+    return success && result.length >= 32 && abi.decode(result, (bool));
+  }
+
+  /**
+   * @dev Re-encode a single parameter as the sole argument of a call
+   */
+  function encodedParameter(
+    bytes calldata data,
+    string memory paramType,
+    uint256 paramIdx
+  ) internal pure returns (bool, bytes memory) {
+    uint256 headOffset = 4 + paramIdx * 32;
+    if (data.length < headOffset + 32) {
+      return (false, "");
+    }
+    if (!isDynamicType(paramType)) {
+      bytes memory word = data[headOffset:headOffset + 32];
+      return (true, word);
+    }
+    uint256 tailOffset = 4 + uint256(bytes32(data[headOffset:headOffset + 32]));
+    if (data.length < tailOffset + 32) {
+      return (false, "");
+    }
+    uint256 length = uint256(bytes32(data[tailOffset:tailOffset + 32]));
+    uint256 tailLength = isBytesType(paramType)
+      ? 32 + ((length + 31) / 32) * 32
+      : 32 + length * 32;
+    if (data.length < tailOffset + tailLength) {
+      return (false, "");
+    }
+    bytes memory tail = data[tailOffset:tailOffset + tailLength];
+    return (true, abi.encodePacked(uint256(32), tail));
+  }
+
+  function isBytesType(string memory paramType) internal pure returns (bool) {
+    bytes32 typeHash = keccak256(bytes(paramType));
+    return typeHash == keccak256("bytes") || typeHash == keccak256("string");
+  }
+
+  function isDynamicType(string memory paramType) internal pure returns (bool) {
+    bytes memory typeBytes = bytes(paramType);
+    return
+      isBytesType(paramType) ||
+      (typeBytes.length >= 2 &&
+        typeBytes[typeBytes.length - 2] == "[" &&
+        typeBytes[typeBytes.length - 1] == "]");
+  }
+
+  function parseUint(string memory value) internal pure returns (uint256 result) {
+    bytes memory valueBytes = bytes(value);
+    for (uint256 charIdx; charIdx < valueBytes.length; charIdx++) {
+      result = result * 10 + (uint8(valueBytes[charIdx]) - 48);
+    }
+  }
+}
+
+/*******************************************************
+ *                   Allowlist registry
+ *******************************************************/
+/**
+ * @notice Local stand-in for the eth-allowlist registry and factory
+ * @dev Protocol ownership (ENS domain ownership on a live network) is claimed with setProtocolOwnerAddress
+ */
+contract AllowlistRegistryMock {
+  mapping(string => address) public allowlistAddressByOriginName;
+  mapping(string => address) public protocolOwnerAddressByOriginName;
+
+  function factoryAddress() external view returns (address) {
+    return address(this);
+  }
+
+  function setProtocolOwnerAddress(string memory originName, address ownerAddress)
+    external
+  {
+    address currentOwnerAddress = protocolOwnerAddressByOriginName[originName];
+    require(
+      currentOwnerAddress == address(0) || msg.sender == currentOwnerAddress,
+      "Caller is not the protocol owner"
+    );
+    protocolOwnerAddressByOriginName[originName] = ownerAddress;
+  }
+
+  function registerProtocol(string memory originName) external {
+    require(
+      msg.sender == protocolOwnerAddressByOriginName[originName],
+      "Caller is not the protocol owner"
+    );
+    require(
+      allowlistAddressByOriginName[originName] == address(0),
+      "Protocol is already registered"
+    );
+    allowlistAddressByOriginName[originName] = address(
+      new AllowlistMock(originName, address(this))
+    );
+  }
+
+  function validateCalldataByOrigin(
+    string memory originName,
+    address targetAddress,
+    bytes calldata data
+  ) external view returns (bool) {
+    address allowlistAddress = allowlistAddressByOriginName[originName];
+    if (allowlistAddress == address(0)) {
+      return false;
+    }
+    return AllowlistMock(allowlistAddress).validateCalldata(targetAddress, data);
+  }
+}
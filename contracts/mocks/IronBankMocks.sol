@@ -0,0 +1,96 @@
+// SPDX-License-Identifier: MIT
+pragma solidity 0.8.11;
+
+/**
+ * @notice Local stand-in for an Iron Bank market (cyToken)
+ */
+contract MarketMock {
+  address public underlying;
+
+  constructor(address _underlying) {
+    underlying = _underlying;
+  }
+
+  function mint(uint256) external pure returns (uint256) {
+    return 0;
+  }
+
+  function redeem(uint256) external pure returns (uint256) {
+    return 0;
+  }
+
+  function redeemUnderlying(uint256) external pure returns (uint256) {
+    return 0;
+  }
+
+  function borrow(uint256) external pure returns (uint256) {
+    return 0;
+  }
+
+  function repayBorrow(uint256) external pure returns (uint256) {
+    return 0;
+  }
+}
+
+/**
+ * @notice Local stand-in for the Iron Bank comptroller (proxy and implementation)
+ */
+contract ComptrollerMock {
+  mapping(address => bool) public isMarketListed;
+  address[] internal allMarkets;
+
+  event MarketListed(address cToken);
+
+  function comptrollerImplementation() external view returns (address) {
+    return address(this);
+  }
+
+  function _supportMarket(address marketAddress) external returns (uint256) {
+    require(!isMarketListed[marketAddress], "Market is already listed");
+    isMarketListed[marketAddress] = true;
+    allMarkets.push(marketAddress);
+    emit MarketListed(marketAddress);
+    return 0;
+  }
+
+  function getAllMarkets() external view returns (address[] memory) {
+    return allMarkets;
+  }
+
+  function enterMarkets(address[] memory marketAddresses)
+    external
+    pure
+    returns (uint256[] memory)
+  {
+    return new uint256[](marketAddresses.length);
+  }
+
+  function exitMarket(address) external pure returns (uint256) {
+    return 0;
+  }
+}
+
+/**
+ * @notice Local stand-in for the Iron Bank registry adapter
+ */
+contract IronBankRegistryAdapterMock {
+  address public comptrollerAddress;
+
+  constructor(address _comptrollerAddress) {
+    comptrollerAddress = _comptrollerAddress;
+  }
+
+  function assetsAddresses() public view returns (address[] memory) {
+    return ComptrollerMock(comptrollerAddress).getAllMarkets();
+  }
+
+  function assetsTokensAddresses() external view returns (address[] memory) {
+    address[] memory marketAddresses = assetsAddresses();
+    address[] memory tokensAddresses = new address[](marketAddresses.length);
+    for (uint256 marketIdx; marketIdx < marketAddresses.length; marketIdx++) {
+      tokensAddresses[marketIdx] = MarketMock(marketAddresses[marketIdx])
+        .underlying();
+    }
+    return tokensAddresses;
+  }
+}
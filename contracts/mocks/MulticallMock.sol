@@ -0,0 +1,34 @@
+// SPDX-License-Identifier: MIT
+pragma solidity 0.8.11;
+
+/**
+ * @notice Local stand-in for Multicall2, used by MulticallBackend on development chains
+ */
+contract MulticallMock {
+  struct Call {
+    address target;
+    bytes callData;
+  }
+
+  struct Result {
+    bool success;
+    bytes returnData;
+  }
+
+  function tryAggregate(bool requireSuccess, Call[] memory calls)
+    public
+    view
+    returns (Result[] memory returnData)
+  {
+    returnData = new Result[](calls.length);
+    for (uint256 callIdx = 0; callIdx < calls.length; callIdx++) {
+      (bool success, bytes memory result) = calls[callIdx].target.staticcall(
+        calls[callIdx].callData
+      );
+      if (requireSuccess) {
+        require(success, "Multicall aggregate: call failed");
+      }
+      returnData[callIdx] = Result(success, result);
+    }
+  }
+}
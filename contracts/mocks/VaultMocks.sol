@@ -0,0 +1,155 @@
+// SPDX-License-Identifier: MIT
+pragma solidity 0.8.11;
+
+/*******************************************************
+ *                      Tokens and vaults
+ *******************************************************/
+contract TokenMock {
+  uint8 public constant decimals = 18;
+
+  function approve(address, uint256) external pure returns (bool) {
+    return true;
+  }
+}
+
+contract VaultMock is TokenMock {
+  address public token;
+
+  constructor(address _token) {
+    token = _token;
+  }
+
+  function deposit(uint256) external pure returns (uint256) {
+    return 0;
+  }
+
+  function withdraw(uint256) external pure returns (uint256) {
+    return 0;
+  }
+}
+
+/*******************************************************
+ *                      Registry
+ *******************************************************/
+/**
+ * @notice Local stand-in for the V2 vault registry
+ */
+contract V2RegistryMock {
+  address[] public tokens;
+  mapping(address => bool) public isRegistered;
+  mapping(address => uint256) public numVaults;
+  mapping(address => mapping(uint256 => address)) public vaults;
+  mapping(uint256 => address) public releases;
+  uint256 public numReleases;
+
+  event NewVault(
+    address indexed token,
+    uint256 indexed vault_id,
+    address vault,
+    string api_version
+  );
+
+  function numTokens() external view returns (uint256) {
+    return tokens.length;
+  }
+
+  function newVault(address vaultAddress) external {
+    address tokenAddress = VaultMock(vaultAddress).token();
+    if (!isRegistered[tokenAddress]) {
+      isRegistered[tokenAddress] = true;
+      tokens.push(tokenAddress);
+    }
+    uint256 vaultId = numVaults[tokenAddress];
+    vaults[tokenAddress][vaultId] = vaultAddress;
+    numVaults[tokenAddress] = vaultId + 1;
+    releases[numReleases] = vaultAddress;
+    numReleases++;
+    emit NewVault(tokenAddress, vaultId, vaultAddress, "0.4.3");
+  }
+}
+
+/**
+ * @notice Local stand-in for the V2 vaults registry adapter
+ */
+contract RegistryAdapterV2Mock {
+  address public registryAddress;
+
+  constructor(address _registryAddress) {
+    registryAddress = _registryAddress;
+  }
+}
+
+/*******************************************************
+ *                      Zaps and migrators
+ *******************************************************/
+contract ZapInMock {
+  function ZapIn(
+    address,
+    uint256,
+    address,
+    address,
+    bool,
+    uint256,
+    address,
+    address,
+    bytes calldata,
+    address,
+    bool
+  ) external payable returns (uint256) {
+    return 0;
+  }
+}
+
+contract PickleZapInMock {
+  function ZapIn(
+    address,
+    uint256,
+    address,
+    uint256,
+    address,
+    address,
+    bytes calldata,
+    address
+  ) external payable returns (uint256) {
+    return 0;
+  }
+}
+
+contract ZapOutMock {
+  function ZapOut(
+    address,
+    uint256,
+    address,
+    bool,
+    uint256,
+    address,
+    bytes calldata,
+    address,
+    bool
+  ) external returns (uint256) {
+    return 0;
+  }
+
+  function ZapOutWithPermit(
+    address,
+    uint256,
+    address,
+    bool,
+    uint256,
+    bytes calldata,
+    address,
+    bytes calldata,
+    address,
+    bool
+  ) external returns (uint256) {
+    return 0;
+  }
+}
+
+contract MigratorMock {
+  function migrateAll(address, address) external {}
+}
+
+contract TricryptoMigratorMock {
+  function migrate_to_new_vault() external {}
+}
@@ -0,0 +1,47 @@
+// SPDX-License-Identifier: MIT
+pragma solidity 0.8.11;
+
+/**
+ * @notice Local stand-in for veYFI
+ */
+contract VeYfiMock {
+  address public token;
+  address public reward_pool;
+
+  constructor(address _token, address _rewardPool) {
+    token = _token;
+    reward_pool = _rewardPool;
+  }
+
+  function modify_lock(
+    uint256,
+    uint256,
+    address
+  ) external {}
+
+  function withdraw() external {}
+}
+
+/**
+ * @notice Local stand-in for the veYFI gauge registry
+ */
+contract VeYfiRegistryMock {
+  mapping(address => bool) public isGauge;
+  mapping(address => address) public gauges; // Vault to gauge
+  address[] internal vaults;
+
+  event VaultAdded(address indexed vault, address indexed gauge);
+
+  function addVaultToRegistry(address vaultAddress, address gaugeAddress)
+    external
+  {
+    vaults.push(vaultAddress);
+    gauges[vaultAddress] = gaugeAddress;
+    isGauge[gaugeAddress] = true;
+    emit VaultAdded(vaultAddress, gaugeAddress);
+  }
+
+  function getVaults() external view returns (address[] memory) {
+    return vaults;
+  }
+}
@@ -1,13 +1,12 @@
 from brownie import Contract, chain, accounts, AllowlistImplementationYearnVaults, ZERO_ADDRESS
+from yearn_allowlist import load_protocol_config
 import json
 
 def main():
     # Setup
-    protocol_configuration = json.load(open('configuration/protocol.json', 'r'))
     allowlist_addresses = json.load(open('configuration/allowlist.json', 'r'))
-    origin_name = protocol_configuration["originName"]
+    origin_name = load_protocol_config().origin_name
     allowlist_addresses = allowlist_addresses["networkVariables"][str(chain.id)]
-    allowlist_addresses = protocol_configuration["networkVariables"][str(chain.id)]
     allowlist_factory_address = allowlist_addresses["allowlist_factory_address"]
     allowlist_factory = Contract(allowlist_factory_address)
     allowlist_address = allowlist_factory.allowlistAddressByOriginName(origin_name)
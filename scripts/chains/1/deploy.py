@@ -1,30 +1,57 @@
-from brownie import Contract, chain, accounts, ZERO_ADDRESS
-import json
+from brownie import chain, accounts, network, ZERO_ADDRESS
+from yearn_allowlist import load_chain_config, load_protocol_config
+from yearn_allowlist.deployment import write_summary
+from yearn_allowlist.journal import DeploymentJournal, verify_journal
+from yearn_allowlist.rpc_cache import cached_contract
 
 def main():
+    ##########################################
     # Setup
-    protocol_configuration = json.load(open('configuration/protocol.json', 'r'))
-    allowlist_addresses = json.load(open('configuration/allowlist.json', 'r'))
-    origin_name = protocol_configuration["originName"]
-    allowlist_addresses = allowlist_addresses["networkVariables"][str(chain.id)]
-    allowlist_factory_address = allowlist_addresses["allowlist_factory_address"]
-    allowlist_factory = Contract(allowlist_factory_address)
-    allowlist_address = allowlist_factory.allowlistAddressByOriginName(origin_name)
+    ##########################################
+    # Configuration is validated on load (raises ConfigurationError)
+    chain_config = load_chain_config(chain.id)
+
+    print()
+    print("Searching for allowlist registry...")
+    origin_name = load_protocol_config().origin_name
+    print("Found protocol origin:   ", origin_name)
+    allowlist_registry = cached_contract(chain_config.allowlist_registry_address)
+    print("Found allowlist registry:", allowlist_registry)
+
+    # Steps journaled by earlier runs are verified with one batched read
+    journal = DeploymentJournal.for_network(network.show_active(), chain.id)
+    stale_steps = verify_journal(journal, allowlist_registry, origin_name, cached_contract)
+    for step in stale_steps:
+        print("Journal step no longer holds (redoing):", step)
+
+    registration = journal.get("registration")
+    if registration is not None:
+        allowlist_address = registration["allowlist"]
+    else:
+        allowlist_address = allowlist_registry.allowlistAddressByOriginName(origin_name)
+    print()
+
+    ##########################################
+    # Registration
+    ##########################################
     print("Starting protocol registration...")
+    registration_started = False
     if (allowlist_address != ZERO_ADDRESS):
         print("Protocol has already started registration.")
         print("Allowlist:", allowlist_address)
-        return
-    owner_address = allowlist_factory.protocolOwnerAddressByOriginName(origin_name)
-    owner = accounts.at(owner_address, force=True)
-    
-    # Registration
-    allowlist_factory.startProtocolRegistration(origin_name, {"from": owner})
-    
-    # Testing
-    allowlist_address = allowlist_factory.allowlistAddressByOriginName(origin_name)
-    if (allowlist_address != ZERO_ADDRESS):
-        print("Protocol registration successfully started.")
-        print("To continue, add conditions to your allowlist:", allowlist_address)
     else:
-        print("Protocol registration was unsuccessful")
\ No newline at end of file
+        owner_address = allowlist_registry.protocolOwnerAddressByOriginName(origin_name)
+        owner = accounts.at(owner_address, force=True)
+        allowlist_registry.registerProtocol(origin_name, {"from": owner})
+
+        # Test registration
+        allowlist_address = allowlist_registry.allowlistAddressByOriginName(origin_name)
+        if (allowlist_address != ZERO_ADDRESS):
+            print("Protocol registration successfully started.")
+            print("To continue, add conditions to your allowlist:", allowlist_address)
+            registration_started = True
+        else:
+            print("Error: protocol registration was unsuccessful")
+            return
+    journal.record("registration", allowlist=str(allowlist_address))
+    write_summary({"allowlist": str(allowlist_address), "registration_started": registration_started})
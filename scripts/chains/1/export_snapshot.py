@@ -0,0 +1,5 @@
+from yearn_allowlist.snapshot import export_main
+
+def main(block=None):
+    # brownie run chains/<id>/export_snapshot main [block] --network <network>
+    export_main(block)
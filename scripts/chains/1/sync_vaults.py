@@ -0,0 +1,40 @@
+from brownie import Contract, chain, accounts, ZERO_ADDRESS
+from yearn_allowlist import load_chain_config, load_protocol_config
+
+def main():
+    ##########################################
+    # Setup
+    ##########################################
+    chain_config = load_chain_config(chain.id)
+    origin_name = load_protocol_config().origin_name
+    allowlist_registry = Contract(chain_config.allowlist_registry_address)
+    allowlist_address = allowlist_registry.allowlistAddressByOriginName(origin_name)
+    if allowlist_address == ZERO_ADDRESS:
+        print("Error: protocol is not registered")
+        return
+    allowlist = Contract(allowlist_address)
+    implementation = Contract(allowlist.implementationById("IMPLEMENTATION_YEARN_VAULTS"))
+    owner = accounts.at(allowlist_registry.protocolOwnerAddressByOriginName(origin_name), force=True)
+    registry = Contract(implementation.registryAddress())
+
+    ##########################################
+    # Find tokens with unsynced vaults
+    ##########################################
+    print("Searching for unsynced vaults...")
+    tokens_to_sync = []
+    for token_idx in range(registry.numTokens()):
+        token_address = registry.tokens(token_idx)
+        if implementation.syncedVaultsLength(token_address) < registry.numVaults(token_address):
+            tokens_to_sync.append(token_address)
+    if len(tokens_to_sync) == 0:
+        print("Vault cache is up to date")
+        return
+
+    ##########################################
+    # Sync
+    ##########################################
+    print("Syncing vaults for", len(tokens_to_sync), "tokens...")
+    implementation.syncVaultsForTokens(tokens_to_sync, {"from": owner})
+    for token_address in tokens_to_sync:
+        assert implementation.syncedVaultsLength(token_address) == registry.numVaults(token_address)
+    print("Success!!")
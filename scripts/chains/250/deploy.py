@@ -1,18 +1,9 @@
-from brownie import Contract, chain, accounts, ZERO_ADDRESS, AllowlistImplementationYearnVaults, AllowlistImplementationIronBank
-import json
-
-def format_conditions(conditions):
-    formatted_conditions = []
-    for condition in conditions:
-        current_condition = (
-            condition['id'],
-            condition['implementationId'],
-            condition['methodName'],
-            condition['paramTypes'],
-            condition['requirements'],
-        )
-        formatted_conditions.append(current_condition)
-    return formatted_conditions
+from brownie import chain, accounts, network, ZERO_ADDRESS, AllowlistImplementationYearnVaults, AllowlistImplementationIronBank
+from yearn_allowlist import load_chain_config, load_protocol_config
+from yearn_allowlist.deployment import write_summary
+from yearn_allowlist.journal import DeploymentJournal, conditions_digest, implementation_step, verify_journal
+from yearn_allowlist.rpc_cache import cached_contract
+from yearn_allowlist.sync import sync_conditions
 
 def deploy_implementation_yearn_vaults(args):
     addresses_provider = args[0]
@@ -29,30 +20,18 @@ def main():
     ##########################################
     # Setup
     ##########################################
-    protocol_configuration = json.load(open('configuration/protocol.json', 'r'))
-    allowlist_addresses = json.load(open('configuration/chains/' + str(chain.id) + '/addresses.json', 'r'))
-    allowlist_configuration = json.load(open('configuration/chains/' + str(chain.id) + '/allowlist.json', 'r'))
-    conditions_configuration = json.load(open('configuration/chains/' + str(chain.id) + '/conditions.json', 'r'))
+    # Configuration is validated on load (raises ConfigurationError)
+    chain_config = load_chain_config(chain.id)
+    allowlist_addresses = chain_config.addresses
+    conditions = chain_config.conditions
     
     print()
     print("Searching for allowlist registry...")
-    key = "originName"
-    if key in protocol_configuration:
-        origin_name = protocol_configuration["originName"]
-        print("Found protocol origin:   ", origin_name)
-    else:
-        print("Error: Protocol origin not set (check configuration/protocol.json)")
-        return
-    origin_name = protocol_configuration["originName"]
-    
-    key = "allowlist_registry_address"
-    if key in allowlist_configuration:
-        allowlist_registry = Contract(allowlist_configuration[key])
-        print("Found allowlist registry:", allowlist_registry)
-    else:
-        print("Error: Allowlist registry does not exist (check configuration/chains/<id>/allowlist.json)")
-        return
-    allowlist_factory = Contract(allowlist_registry.factoryAddress())
+    origin_name = load_protocol_config().origin_name
+    print("Found protocol origin:   ", origin_name)
+    allowlist_registry = cached_contract(chain_config.allowlist_registry_address)
+    print("Found allowlist registry:", allowlist_registry)
+    allowlist_factory = cached_contract(allowlist_registry.factoryAddress())
 
     if allowlist_factory != ZERO_ADDRESS:
         print("Found allowlist factory: ", allowlist_factory)
@@ -60,7 +39,17 @@ def main():
         print("Error: Allowlist factory does not exist on registry:", allowlist_registry)
         return
 
-    allowlist_address = allowlist_registry.allowlistAddressByOriginName(origin_name)
+    # Steps journaled by earlier runs are verified with one batched read
+    journal = DeploymentJournal.for_network(network.show_active(), chain.id)
+    stale_steps = verify_journal(journal, allowlist_registry, origin_name, cached_contract)
+    for step in stale_steps:
+        print("Journal step no longer holds (redoing):", step)
+
+    registration = journal.get("registration")
+    if registration is not None:
+        allowlist_address = registration["allowlist"]
+    else:
+        allowlist_address = allowlist_registry.allowlistAddressByOriginName(origin_name)
     if allowlist_address != ZERO_ADDRESS:
         print("Found allowlist:         ", allowlist_address)
     owner_address = allowlist_registry.protocolOwnerAddressByOriginName(origin_name)
@@ -85,7 +74,8 @@ def main():
         else:
             print("Error: protocol registration was unsuccessful")
             return
-    allowlist = Contract(allowlist_address)
+    journal.record("registration", allowlist=str(allowlist_address))
+    allowlist = cached_contract(allowlist_address)
     assert allowlist != ZERO_ADDRESS
     print()
             
@@ -95,7 +85,7 @@ def main():
     # Gather arguments
     key = "addresses_provider_address"
     if key in allowlist_addresses:
-        addresses_provider = Contract(allowlist_addresses[key])    
+        addresses_provider = cached_contract(allowlist_addresses[key])    
     else:
         "Error: cannot find addresses provider"
         return
@@ -118,37 +108,68 @@ def main():
 
     # Deploy implementations
     print("Deploying implementations...")
+    deployed_implementations = []
     for implementation in implementations:
         implementation_id = implementation['id']
         implementation_deployment_method = implementation['deployment_method']
         implementation_arguments = implementation['arguments']
+        step = implementation_step(implementation_id)
         
-        implementation_address = allowlist.implementationById(implementation_id)
-        if implementation_address == ZERO_ADDRESS:
-            print("Deploying:               ", implementation_id, "...")
-            deployment_address = implementation_deployment_method(implementation_arguments)
-            print("Setting implementation:  ", implementation_id, deployment_address)
-            allowlist.setImplementation(implementation_id, deployment_address, {"from": owner})
-            assert allowlist.implementationById(implementation_id) != ZERO_ADDRESS
+        journaled = journal.get(step)
+        if journaled is not None and journaled["set"]:
+            print("Deployment journaled (skipping):", implementation_id, journaled["address"])
             print()
-        else:
+            continue
+        implementation_address = journaled["address"] if journaled is not None else allowlist.implementationById(implementation_id)
+        if journaled is None and implementation_address != ZERO_ADDRESS:
             print("Deployment exists (skipping):", implementation_id, implementation_address)
+            journal.record(step, address=str(implementation_address), set=True)
             print()
+            continue
+        if journaled is None:
+            print("Deploying:               ", implementation_id, "...")
+            implementation_address = implementation_deployment_method(implementation_arguments).address
+            journal.record(step, address=str(implementation_address), set=False)
+            deployed_implementations.append(implementation_id)
+        print("Setting implementation:  ", implementation_id, implementation_address)
+        allowlist.setImplementation(implementation_id, implementation_address, {"from": owner})
+        journal.record(step, set=True)
+        assert allowlist.implementationById(implementation_id) != ZERO_ADDRESS
+        print()
         
 
     ##########################################
     # Conditions
     ##########################################
-    # Set conditions
-    print("Adding conditions...")
-    conditions = format_conditions(conditions_configuration)
-    allowlist.addConditions(conditions, {"from": owner})
-    
-    # Validate results
-    print("Validating results...")
-    conditions_json = allowlist.conditionsJson()
-    assert len(conditions_json) > 0
-    # print(conditions_json)
+    digest = conditions_digest(conditions)
+    journaled = journal.get("conditions")
+    if journaled is not None and journaled.get("digest") == digest:
+        print("Conditions journaled (skipping):", journaled["count"])
+        plan = None
+    else:
+        # Sync conditions, journaling every confirmed batch
+        print("Syncing conditions...")
+        journal.forget("conditions")
+        def record_batch(action, ids, receipt):
+            batches = (journal.get("conditions") or {}).get("batches", [])
+            journal.record("conditions", batches=batches + [{"action": action, "ids": ids, "tx": receipt.txid}])
+        plan = sync_conditions(allowlist, conditions, owner, on_batch=record_batch)
+        print("Added:                   ", len(plan.adds))
+        print("Updated:                 ", len(plan.updates))
+        print("Removed:                 ", len(plan.removes))
+        print("Unchanged:               ", plan.unchanged)
+
+        # Validate results
+        print("Validating results...")
+        assert allowlist.conditionsLength() == len(conditions)
+        journal.record("conditions", digest=digest, count=len(conditions))
     
     print("Success!!")
+    write_summary({
+        "allowlist": str(allowlist.address),
+        "implementations_deployed": len(deployed_implementations),
+        "conditions_added": len(plan.adds) if plan else 0,
+        "conditions_updated": len(plan.updates) if plan else 0,
+        "conditions_removed": len(plan.removes) if plan else 0,
+    })
     
\ No newline at end of file
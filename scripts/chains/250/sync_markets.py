@@ -0,0 +1,38 @@
+from brownie import Contract, chain, accounts, ZERO_ADDRESS
+from yearn_allowlist import load_chain_config, load_protocol_config
+
+def main():
+    ##########################################
+    # Setup
+    ##########################################
+    chain_config = load_chain_config(chain.id)
+    origin_name = load_protocol_config().origin_name
+    allowlist_registry = Contract(chain_config.allowlist_registry_address)
+    allowlist_address = allowlist_registry.allowlistAddressByOriginName(origin_name)
+    if allowlist_address == ZERO_ADDRESS:
+        print("Error: protocol is not registered")
+        return
+    allowlist = Contract(allowlist_address)
+    implementation = Contract(allowlist.implementationById("IMPLEMENTATION_IRON_BANK"))
+    owner = accounts.at(allowlist_registry.protocolOwnerAddressByOriginName(origin_name), force=True)
+    registry_adapter = Contract(implementation.registryAdapterAddress())
+
+    ##########################################
+    # Compare index with registry adapter
+    ##########################################
+    print("Comparing market underlying token index...")
+    adapter_tokens = set(token.lower() for token in registry_adapter.assetsTokensAddresses())
+    indexed_tokens = set(token.lower() for token in implementation.indexedUnderlyingTokensList())
+    if adapter_tokens == indexed_tokens:
+        print("Market index is up to date (" + str(len(indexed_tokens)) + " tokens)")
+        return
+    print("Tokens to add:   ", len(adapter_tokens - indexed_tokens))
+    print("Tokens to remove:", len(indexed_tokens - adapter_tokens))
+
+    ##########################################
+    # Refresh
+    ##########################################
+    implementation.refreshMarketUnderlyingTokens({"from": owner})
+    indexed_tokens = set(token.lower() for token in implementation.indexedUnderlyingTokensList())
+    assert indexed_tokens == adapter_tokens
+    print("Success!!")
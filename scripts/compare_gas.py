@@ -0,0 +1,141 @@
+from brownie import (
+    Contract,
+    chain,
+    accounts,
+    web3,
+    ZERO_ADDRESS,
+    AllowlistImplementationIronBank,
+    AllowlistImplementationPartnerTracker,
+    AllowlistImplementationVeYFI,
+    AllowlistImplementationYearnVaults,
+    AllowlistImplementationYveCRV,
+)
+from yearn_allowlist import StaticBackend, Validator, load_chain_config, load_protocol_config
+from yearn_allowlist.backends import requirement_calldata
+from yearn_allowlist.benchmarks import intrinsic_gas
+from yearn_allowlist.samples import brownie_samples, condition_calldata, missing_samples
+import json
+
+##########################################
+# Deployment
+##########################################
+def deploy_implementation(implementation_id, old_implementation, addresses_provider, allowlist_registry, owner):
+    if implementation_id == "IMPLEMENTATION_YEARN_VAULTS":
+        return AllowlistImplementationYearnVaults.deploy(addresses_provider, allowlist_registry, {"from": owner})
+    if implementation_id == "IMPLEMENTATION_IRON_BANK":
+        return AllowlistImplementationIronBank.deploy(addresses_provider, {"from": owner})
+    if implementation_id == "IMPLEMENTATION_PARTNER_TRACKER":
+        return AllowlistImplementationPartnerTracker.deploy(addresses_provider, {"from": owner})
+    if implementation_id == "IMPLEMENTATION_YEARN_YVE_CRV":
+        return AllowlistImplementationYveCRV.deploy({"from": owner})
+    if implementation_id == "IMPLEMENTATION_VEYFI" and old_implementation is not None:
+        implementation = AllowlistImplementationVeYFI.deploy(addresses_provider, allowlist_registry, old_implementation.snapshotDelegateRegistry(), {"from": owner})
+        implementation.setVeYfiId(old_implementation.veYfiId(), {"from": owner})
+        return implementation
+    return None
+
+def prepare_implementation(implementation_id, implementation, samples, owner, is_new):
+    """Make sure requirements with owner managed data pass for the sample values"""
+    if implementation_id == "IMPLEMENTATION_YEARN_VAULTS":
+        flags = [
+            ("isZapInContract", "setIsZapInContract"),
+            ("isZapOutContract", "setIsZapOutContract"),
+            ("isMigratorContract", "setIsMigratorContract"),
+            ("isPickleJarContract", "setIsPickleJarContract"),
+        ]
+        for method_name, setter_name in flags:
+            if method_name in samples and not getattr(implementation, method_name)(samples[method_name]):
+                getattr(implementation, setter_name)(samples[method_name], True, {"from": owner})
+        if is_new and "isVaultUnderlyingToken" in samples:
+            implementation.syncVaults(samples["isVaultUnderlyingToken"], {"from": owner})
+    if implementation_id == "IMPLEMENTATION_IRON_BANK" and is_new:
+        implementation.refreshMarketUnderlyingTokens({"from": owner})
+    if implementation_id == "IMPLEMENTATION_VEYFI":
+        samples["isDelegateRegistry"] = implementation.snapshotDelegateRegistry()
+        samples["isVeYfiSpaceId"] = implementation.veYfiId()
+
+##########################################
+# Measurement
+##########################################
+def condition_gas(validator, condition, target, data, implementation_address):
+    """
+    Sum of the gas used by every requirement call of a condition
+
+    Each call is estimated as its own transaction, so the intrinsic gas of that
+    transaction is subtracted to count only the requirement's execution.
+    """
+    gas = 0
+    for requirement in condition.requirements:
+        call = validator.requirement_call(condition, requirement, target, data)
+        calldata = requirement_calldata(call)
+        gas += web3.eth.estimate_gas({"to": implementation_address, "data": "0x" + calldata.hex()}) - intrinsic_gas(calldata)
+    return gas
+
+def main(output_path=None):
+    ##########################################
+    # Setup
+    ##########################################
+    chain_config = load_chain_config(chain.id)
+    allowlist_addresses = chain_config.addresses
+    conditions = chain_config.conditions
+    origin_name = load_protocol_config().origin_name
+    allowlist_registry = Contract(chain_config.allowlist_registry_address)
+    allowlist = Contract(allowlist_registry.allowlistAddressByOriginName(origin_name))
+    owner = accounts.at(allowlist_registry.protocolOwnerAddressByOriginName(origin_name), force=True)
+    addresses_provider = Contract(allowlist_addresses["addresses_provider_address"])
+    samples = brownie_samples(allowlist_addresses)
+    validator = Validator(conditions, StaticBackend({}))
+
+    chain.snapshot()
+
+    ##########################################
+    # Deploy new implementations next to the current ones
+    ##########################################
+    print("Deploying implementations...")
+    versions = {}
+    for implementation_id in sorted(set(condition.implementation_id for condition in conditions)):
+        old_address = allowlist.implementationById(implementation_id)
+        old_implementation = Contract(old_address) if old_address != ZERO_ADDRESS else None
+        new_implementation = deploy_implementation(implementation_id, old_implementation, addresses_provider, allowlist_registry, owner)
+        versions[implementation_id] = {"old": old_implementation, "new": new_implementation}
+        for version, implementation in versions[implementation_id].items():
+            if implementation is not None:
+                prepare_implementation(implementation_id, implementation, samples, owner, version == "new")
+        print("  ", implementation_id, "old:", old_implementation, "new:", new_implementation)
+    print()
+
+    ##########################################
+    # Compare
+    ##########################################
+    results = {}
+    unsampled = {}
+    print("{:<40}{:>12}{:>12}{:>12}".format("Condition", "Old", "New", "Delta"))
+    for condition in conditions:
+        missing = missing_samples(condition, samples)
+        if missing:
+            unsampled[condition.id] = missing
+            print("{:<40}{:>12}".format(condition.id, "no samples"))
+            continue
+        target, data = condition_calldata(condition, samples)
+        result = {}
+        for version, implementation in versions[condition.implementation_id].items():
+            if implementation is not None:
+                result[version] = condition_gas(validator, condition, target, data, implementation.address)
+        results[condition.id] = result
+        delta = result["new"] - result["old"] if "old" in result and "new" in result else ""
+        print("{:<40}{:>12}{:>12}{:>12}".format(condition.id, result.get("old", "-"), result.get("new", "-"), delta))
+
+    chain.revert()
+
+    if unsampled:
+        print()
+        print("Not measured, no samples for:")
+        for condition_id, missing in unsampled.items():
+            print("  ", condition_id, ", ".join(missing))
+
+    if output_path is not None:
+        with open(output_path, "w") as output_file:
+            json.dump({str(chain.id): results, "unsampled": {str(chain.id): unsampled}}, output_file, indent=2, sort_keys=True)
+        print()
+        print("Results written to", output_path)
+    return results
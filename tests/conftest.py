@@ -1,55 +1,222 @@
 import pytest
-from brownie import Contract, ZERO_ADDRESS, accounts, chain
-import json
+from brownie import ZERO_ADDRESS, accounts, chain, network
+from types import SimpleNamespace
+from yearn_allowlist import ChainConfig, load_chain_config, load_protocol_config
+from yearn_allowlist.config import available_chain_ids
+from yearn_allowlist.rpc_cache import cached_contract
 
 ##############################################################
-# Setup and configuration
+# Isolation
+##############################################################
+
+# module_isolation resets the chain when a module starts, so everything deployed
+# or registered (mocks, the protocol registration, implementations) is module
+# scoped and set up after the reset. Every test is reverted when it finishes.
+@pytest.fixture(scope="module", autouse=True)
+def shared_setup(module_isolation):
+    pass
+
+@pytest.fixture(autouse=True)
+def isolation(fn_isolation):
+    pass
+
+##############################################################
+# Mock ecosystem
+#
+# On the development network (`brownie test --network development`) the suite
+# runs against locally deployed mocks instead of a mainnet fork. Modules that
+# depend on live contracts are marked with `pytestmark = pytest.mark.fork_only`.
 ##############################################################
 
-@pytest.fixture
-def conditions():
-    return json.load(open('configuration/chains/' + str(chain.id) + '/conditions.json', 'r'))
+MOCK_NETWORK = "development"
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "fork_only: test requires live contracts on a forked network")
+
+def selected_network(config):
+    """Network brownie connects to once collection is done"""
+    from brownie._config import CONFIG
+
+    network_option = config.getoption("--network")
+    return network_option[0] if network_option else CONFIG.settings["networks"]["default"]
+
+def pytest_collection_modifyitems(config, items):
+    # Skipped when collected, so the module fixtures of fork_only modules never
+    # run against the mocks
+    if selected_network(config) != MOCK_NETWORK:
+        return
+    skip = pytest.mark.skip(reason="requires a forked network")
+    for item in items:
+        if item.get_closest_marker("fork_only"):
+            item.add_marker(skip)
+
+@pytest.fixture(scope="session")
+def mock_mode():
+    return network.show_active() == MOCK_NETWORK
+
+@pytest.fixture(scope="module")
+def mocks(
+    shared_setup,
+    mock_mode,
+    origin_name,
+    AddressesProviderMock,
+    AllowlistMock,
+    AllowlistRegistryMock,
+    ComptrollerMock,
+    IronBankRegistryAdapterMock,
+    MarketMock,
+    MigratorMock,
+    PickleZapInMock,
+    RegistryAdapterV2Mock,
+    TokenMock,
+    TricryptoMigratorMock,
+    V2RegistryMock,
+    VaultMock,
+    VeYfiMock,
+    VeYfiRegistryMock,
+    ZapInMock,
+    ZapOutMock,
+):
+    if not mock_mode:
+        return None
+    deployer = accounts[0]
+    tx = {"from": deployer}
+    mocks = SimpleNamespace(contracts={})
+    def register(contract):
+        mocks.contracts[contract.address.lower()] = contract
+        return contract
+
+    # Addresses provider
+    mocks.addresses_provider = AddressesProviderMock.deploy(tx)
 
-@pytest.fixture
-def allowlist_configuration():
-    return json.load(open('configuration/chains/' + str(chain.id) + '/allowlist.json', 'r'))
+    # V2 vaults
+    mocks.registry = V2RegistryMock.deploy(tx)
+    mocks.registry_adapter = RegistryAdapterV2Mock.deploy(mocks.registry, tx)
+    mocks.addresses_provider.setAddress("REGISTRY_ADAPTER_V2_VAULTS", mocks.registry_adapter, tx)
+    def add_vault(token=None):
+        token = token or TokenMock.deploy(tx)
+        vault = VaultMock.deploy(token, tx)
+        mocks.registry.newVault(vault, tx)
+        register(TokenMock.at(vault.token()))
+        return register(vault)
+    mocks.add_vault = add_vault
+    mocks.vault = add_vault()
+    mocks.vault_token = TokenMock.at(mocks.vault.token())
 
-@pytest.fixture
-def allowlist_addresses():
-    return json.load(open('configuration/chains/' + str(chain.id) + '/addresses.json', 'r'))
+    # Iron Bank
+    mocks.comptroller = ComptrollerMock.deploy(tx)
+    mocks.iron_bank_registry_adapter = IronBankRegistryAdapterMock.deploy(mocks.comptroller, tx)
+    mocks.addresses_provider.setAddress("REGISTRY_ADAPTER_IRON_BANK", mocks.iron_bank_registry_adapter, tx)
+    def add_market(underlying=None):
+        underlying = underlying or TokenMock.deploy(tx)
+        market = MarketMock.deploy(underlying, tx)
+        mocks.comptroller._supportMarket(market, tx)
+        register(TokenMock.at(market.underlying()))
+        return register(market)
+    mocks.add_market = add_market
+    mocks.market = add_market()
+    mocks.market_token = TokenMock.at(mocks.market.underlying())
 
-@pytest.fixture
-def protocol_configuration():
-    return json.load(open('configuration/protocol.json', 'r'))
+    # veYFI
+    mocks.ve_yfi = VeYfiMock.deploy(TokenMock.deploy(tx), TokenMock.deploy(tx), tx)
+    mocks.ve_yfi_registry = VeYfiRegistryMock.deploy(tx)
+    mocks.addresses_provider.setAddress("VEYFI", mocks.ve_yfi, tx)
+    mocks.addresses_provider.setAddress("VEYFI_REGISTRY", mocks.ve_yfi_registry, tx)
 
-@pytest.fixture
-def origin_name(protocol_configuration):
-    return protocol_configuration["originName"]
+    # Zaps and migrators
+    mocks.zap_in = ZapInMock.deploy(tx)
+    mocks.pickle_zap_in = PickleZapInMock.deploy(tx)
+    mocks.zap_out = ZapOutMock.deploy(tx)
+    mocks.migrator = MigratorMock.deploy(tx)
+    mocks.tricrypto_migrator = TricryptoMigratorMock.deploy(tx)
+    mocks.pickle_jar = TokenMock.deploy(tx)
 
-@pytest.fixture
-def allowlist_registry(allowlist_configuration):
-    allowlist_registry_address = allowlist_configuration["allowlist_registry_address"]
-    return Contract(allowlist_registry_address)
+    # Allowlist registry (registration is owned by the deployer)
+    mocks.allowlist_registry = AllowlistRegistryMock.deploy(tx)
+    mocks.allowlist_registry.setProtocolOwnerAddress(origin_name, deployer, tx)
+    mocks.allowlist_registry.registerProtocol(origin_name, tx)
+    mocks.allowlist = AllowlistMock.at(mocks.allowlist_registry.allowlistAddressByOriginName(origin_name))
 
-@pytest.fixture
-def allowlist_factory(allowlist_registry):
+    # Same keys as configuration/chains/<id>/addresses.json
+    mocks.addresses = {
+        "addresses_provider_address": mocks.addresses_provider.address,
+        "zap_out_of_vault_address": mocks.zap_out.address,
+        "zap_in_to_vault_address": mocks.zap_in.address,
+        "zap_in_to_pickle_address": mocks.pickle_zap_in.address,
+        "migrator_address_standard": mocks.migrator.address,
+        "migrator_address_tricrypto": mocks.tricrypto_migrator.address,
+        "pickle_jar_address": mocks.pickle_jar.address,
+    }
+    for contract in list(vars(mocks).values()):
+        if hasattr(contract, "address"):
+            register(contract)
+    return mocks
+
+@pytest.fixture(scope="module")
+def contract_at(mocks):
+    """
+    Contract lookup that resolves mocks on the development network
+
+    On forks ABIs go through the RPC cache (see RPC_CACHE in the README).
+    """
+    def make_contract(address):
+        if mocks is not None:
+            return mocks.contracts[str(address).lower()]
+        return cached_contract(address)
+    return make_contract
+
+##############################################################
+# Setup and configuration
+##############################################################
+
+@pytest.fixture(scope="module")
+def chain_config(mocks):
+    if mocks is not None:
+        # Mocks cover every implementation, so conditions from all chains apply
+        conditions_by_id = {}
+        for chain_id in available_chain_ids():
+            for condition in load_chain_config(chain_id).conditions:
+                conditions_by_id.setdefault(condition.id, condition)
+        return ChainConfig.from_conditions(
+            chain.id, mocks.allowlist_registry.address, mocks.addresses, conditions_by_id.values()
+        )
+    return load_chain_config(chain.id)
+
+@pytest.fixture(scope="module")
+def conditions(chain_config):
+    return chain_config.conditions
+
+@pytest.fixture(scope="module")
+def allowlist_addresses(chain_config):
+    return chain_config.addresses
+
+@pytest.fixture(scope="session")
+def origin_name():
+    return load_protocol_config().origin_name
+
+@pytest.fixture(scope="module")
+def allowlist_registry(chain_config, contract_at):
+    return contract_at(chain_config.allowlist_registry_address)
+
+@pytest.fixture(scope="module")
+def allowlist_factory(allowlist_registry, contract_at):
     allowlist_factory_address = allowlist_registry.factoryAddress()
-    return Contract(allowlist_factory_address)
+    return contract_at(allowlist_factory_address)
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def owner(allowlist_registry, origin_name):
     owner_address = allowlist_registry.protocolOwnerAddressByOriginName(origin_name)
     return accounts.at(owner_address, force=True)
 
-@pytest.fixture
-def address_provider(allowlist_addresses):
-    return Contract(allowlist_addresses["addresses_provider_address"])
+@pytest.fixture(scope="module")
+def address_provider(allowlist_addresses, contract_at):
+    return contract_at(allowlist_addresses["addresses_provider_address"])
     
 ##############################################################
 #  Protocol registration and condition management
 ##############################################################
-@pytest.fixture(autouse=True)
-def allowlist(allowlist_registry, owner, origin_name):
+@pytest.fixture(scope="module", autouse=True)
+def allowlist(shared_setup, allowlist_registry, owner, origin_name, contract_at):
     # Register protocol
     allowlist_address = allowlist_registry.allowlistAddressByOriginName(origin_name)
     registration_started = allowlist_address != ZERO_ADDRESS
@@ -59,22 +226,14 @@ def allowlist(allowlist_registry, owner, origin_name):
     # Make sure a new allowlist was generated
     allowlist_address = allowlist_registry.allowlistAddressByOriginName(origin_name)
     assert allowlist_address != ZERO_ADDRESS
-    allowlist = Contract(allowlist_address)
+    allowlist = contract_at(allowlist_address)
     assert allowlist.name() == origin_name
     
     # Return allowlist
-    return Contract(allowlist_address)
+    return allowlist
 
-@pytest.fixture
-def condition_by_id(conditions):
+@pytest.fixture(scope="module")
+def condition_by_id(chain_config):
     def make_condition_by_id(id):
-        for condition in conditions:
-            if condition['id'] == id:
-                return (
-                    condition['id'],
-                    condition['implementationId'],
-                    condition['methodName'],
-                    condition['paramTypes'],
-                    condition['requirements'],
-                )
+        return chain_config.condition(id).to_tuple()
     return make_condition_by_id
@@ -0,0 +1,86 @@
+import pytest
+from yearn_allowlist import Validator, load_conditions
+from yearn_allowlist.abi import encode_call
+from yearn_allowlist.address_sets import AddressSetFormatError, AddressSets, map_snapshot, write_address_sets, write_snapshot_address_sets
+from yearn_allowlist.snapshot import SNAPSHOT_VERSION, snapshot_backend
+
+MAX_UINT256 = 2**256-1
+
+vault_address = "0x5c0a86a32c129538d62c106eb8115a8b02358d57"
+vault_token_address = "0x6b175474e89094c44da98b954eedeac495271d0f"
+zap_in_address = "0x8E52522E6a77578904ddd7f528A22521DC4154F5"
+comptroller_address = "0xab1c342c7bf5ec5f02adea1c2270670bca144cbb"
+
+snapshot = {
+    "version": SNAPSHOT_VERSION,
+    "chain_id": 1,
+    "block": 15000000,
+    "implementations": {
+        "IMPLEMENTATION_YEARN_VAULTS": {
+            "contract": "AllowlistImplementationYearnVaults",
+            "state": {
+                "registered_tokens": [vault_token_address],
+                "vaults_by_token": {vault_token_address: [vault_address]},
+                "zap_in_contracts": [zap_in_address],
+            },
+        },
+        "IMPLEMENTATION_IRON_BANK": {
+            "contract": "AllowlistImplementationIronBank",
+            "state": {"comptroller": comptroller_address, "listed_markets": [], "indexed_underlying_tokens": [vault_token_address]},
+        },
+    },
+}
+
+def addresses(count, step=7919):
+    return ["0x" + "%040x" % (idx * step) for idx in range(count)]
+
+# Description: Membership is a binary search over the mapped file
+def test_address_sets(tmp_path):
+    path = str(tmp_path / "sets.addresses")
+    members = addresses(1000)
+    write_address_sets(path, {"vaults": reversed(members), "empty": [], "flags": [zap_in_address]}, chain_id=250, block=42)
+    with AddressSets(path) as address_sets:
+        assert (address_sets.chain_id, address_sets.block) == (250, 42)
+        vaults = address_sets["vaults"]
+        assert len(vaults) == 1000
+        assert list(vaults) == sorted(members)
+        assert all(member in vaults for member in members)
+        assert all(address not in vaults for address in addresses(100, step=7919 * 1000 + 1)[1:])
+        assert zap_in_address.lower() in address_sets["flags"]
+        assert bytes.fromhex(zap_in_address[2:]) in address_sets["flags"]
+        assert "0x1234" not in address_sets["flags"]
+        assert vault_address not in address_sets["empty"]
+        with pytest.raises(KeyError):
+            address_sets["gauges"]
+
+def test_invalid_files(tmp_path):
+    with pytest.raises(ValueError, match="Invalid address"):
+        write_address_sets(str(tmp_path / "invalid"), {"vaults": ["0x1234"]})
+    path = tmp_path / "garbage"
+    path.write_bytes(b"\x00" * 64)
+    with pytest.raises(AddressSetFormatError, match="version"):
+        AddressSets(str(path))
+    path.write_bytes(b"")
+    with pytest.raises(AddressSetFormatError, match="Empty"):
+        AddressSets(str(path))
+
+# Description: Simulators answer from mapped snapshots like from the JSON snapshot
+def test_mapped_snapshot(tmp_path):
+    path = str(tmp_path / "1.addresses")
+    write_snapshot_address_sets(path, snapshot)
+    with AddressSets(path) as address_sets:
+        mapped = map_snapshot(snapshot, address_sets)
+        state = mapped["implementations"]["IMPLEMENTATION_YEARN_VAULTS"]["state"]
+        assert "vaults_by_token" not in state
+        assert vault_address in state["vaults"]
+
+        conditions = load_conditions(1)
+        data = encode_call("approve", ["address", "uint256"], [zap_in_address, MAX_UINT256])
+        for backend in (snapshot_backend(snapshot), snapshot_backend(mapped)):
+            validator = Validator(conditions, backend)
+            assert validator.matching_condition(vault_token_address, data).id == "TOKEN_APPROVE_ZAP"
+            assert validator.validate(vault_address, encode_call("deposit", ["uint256"], [MAX_UINT256])) == True
+            assert validator.validate(vault_token_address, encode_call("deposit", ["uint256"], [MAX_UINT256])) == False
+
+        with pytest.raises(AddressSetFormatError, match="snapshot"):
+            map_snapshot(dict(snapshot, block=1), address_sets)
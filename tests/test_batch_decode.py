@@ -0,0 +1,108 @@
+import pytest
+from yearn_allowlist import StaticBackend, Validator, load_conditions
+from yearn_allowlist.abi import encode_call
+from yearn_allowlist.address_sets import AddressSets, write_address_sets
+
+np = pytest.importorskip("numpy")
+from yearn_allowlist.batch_decode import TransactionBatch, condition_mask, is_member, member_array, validate_batch
+
+MAX_UINT256 = 2**256-1
+ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
+
+vault_address = "0x5c0a86a32c129538d62c106eb8115a8b02358d57"
+vault_token_address = "0x6b175474e89094c44da98b954eedeac495271d0f"
+zap_in_address = "0x8e52522e6a77578904ddd7f528a22521dc4154f5"
+partner_tracker_address = "0x8ee392a4787397126c163cb9844d7c447da419d8"
+
+answers = {
+    ("IMPLEMENTATION_YEARN_VAULTS", "isVault"): {vault_address},
+    ("IMPLEMENTATION_YEARN_VAULTS", "isVaultUnderlyingToken"): {vault_token_address},
+    ("IMPLEMENTATION_YEARN_VAULTS", "isZapInContract"): {zap_in_address},
+    ("IMPLEMENTATION_PARTNER_TRACKER", "isPartnerTracker"): {partner_tracker_address},
+    ("IMPLEMENTATION_PARTNER_TRACKER", "isVault"): {vault_address},
+}
+
+def transactions():
+    approve = lambda spender: encode_call("approve", ["address", "uint256"], [spender, MAX_UINT256])
+    deposit = encode_call("deposit", ["uint256"], [MAX_UINT256])
+    dirty_approve = bytearray(approve(vault_address))
+    dirty_approve[4] = 1  # Non-zero upper bytes in the address word
+    return [
+        (vault_token_address, approve(vault_address)),
+        (vault_token_address, approve(zap_in_address)),
+        (vault_token_address, approve(ZERO_ADDRESS)),
+        (vault_address, approve(vault_address)),
+        (vault_address, deposit),
+        (vault_token_address, deposit),
+        (vault_address, deposit[:20]),
+        (vault_address, b""),
+        (vault_token_address, bytes(dirty_approve)),
+        (partner_tracker_address, encode_call("deposit", ["address", "address"], [vault_address, ZERO_ADDRESS])),
+    ]
+
+##############################################################
+# Decoding
+##############################################################
+
+def test_columns():
+    batch = TransactionBatch.from_transactions(transactions())
+    assert len(batch) == 10
+    selectors, present = batch.selectors()
+    assert hex(selectors[0]) == "0x95ea7b3"
+    assert present.tolist() == [True] * 7 + [False] + [True] * 2
+
+    spenders, valid = batch.address_column(0)
+    assert spenders[0] == bytes.fromhex(vault_address[2:])
+    assert valid.tolist() == [True, True, True, True, False, False, False, False, False, True]
+    amounts, present = batch.uint256_column(1)
+    assert (amounts[0] == np.iinfo(np.uint64).max).all()
+    assert not present[4]
+    assert batch.targets[4] == bytes.fromhex(vault_address[2:])
+
+def test_membership():
+    members = member_array([vault_address, zap_in_address, ZERO_ADDRESS])
+    column = member_array([]).astype("S20")
+    assert is_member(column, members).tolist() == []
+    column = np.array([bytes.fromhex(address[2:]) for address in [zap_in_address, vault_token_address, ZERO_ADDRESS]], dtype="S20")
+    assert is_member(column, members).tolist() == [True, False, True]
+    assert is_member(column, member_array([])).tolist() == [False, False, False]
+
+##############################################################
+# Validation
+##############################################################
+
+# Description: Batch validation agrees with the Validator
+def test_validate_batch():
+    conditions = [condition for condition in load_conditions(1) if condition.id in (
+        "TOKEN_APPROVE_VAULT", "TOKEN_APPROVE_ZAP", "VAULT_DEPOST", "PARTNER_TRACKER_DEPOSIT",
+    )]
+    batch = TransactionBatch.from_transactions(transactions())
+    member_answers = {key: member_array(addresses) for key, addresses in answers.items()}
+    allowed = validate_batch(batch, conditions, member_answers)
+    assert allowed.tolist() == [True, True, False, False, True, False, True, False, False, True]
+
+    validator = Validator(conditions, StaticBackend(answers))
+    assert allowed.tolist() == validator.validate_many(transactions())
+    assert allowed.tolist() == [validator.validate(target, data) for target, data in transactions()]
+
+    deposit = next(condition for condition in conditions if condition.id == "VAULT_DEPOST")
+    assert condition_mask(batch, deposit, {}).sum() == 0
+
+def test_unsupported_condition():
+    enter_markets = next(condition for condition in load_conditions(250) if condition.id == "COMPTROLLER_ENTER_MARKETS")
+    batch = TransactionBatch.from_transactions(transactions())
+    assert validate_batch(batch, [enter_markets], {}).sum() == 0
+    batch = TransactionBatch.from_transactions([(ZERO_ADDRESS, encode_call("enterMarkets", ["address[]"], [[vault_address]]))])
+    with pytest.raises(ValueError, match="not supported"):
+        validate_batch(batch, [enter_markets], {})
+
+# Description: Mapped address sets are checked without copying them
+def test_mapped_members(tmp_path):
+    path = str(tmp_path / "sets.addresses")
+    write_address_sets(path, {"vaults": [vault_address, zap_in_address]})
+    with AddressSets(path) as address_sets:
+        members = member_array(address_sets["vaults"])
+        batch = TransactionBatch.from_transactions(transactions())
+        spenders, valid = batch.address_column(0)
+        assert (valid & is_member(spenders, members)).tolist()[:3] == [True, True, False]
+        del members
@@ -0,0 +1,59 @@
+from yearn_allowlist import Backend, Validator, load_conditions
+from yearn_allowlist.abi import encode_call, function_selector
+from yearn_allowlist.dispatch import DispatchTable
+
+MAX_UINT256 = 2**256-1
+vault_address = "0x5c0a86a32c129538d62c106eb8115a8b02358d57"
+
+class CountingBackend(Backend):
+    def __init__(self):
+        self.calls = []
+
+    def check(self, call):
+        self.calls.append(call)
+        return False
+
+def test_approve_routes():
+    dispatch_table = DispatchTable(load_conditions(1))
+    routes = dispatch_table.routes(function_selector("approve", ["address", "uint256"]))
+    assert {route.condition.id for route in routes} == {
+        "TOKEN_APPROVE_VAULT",
+        "TOKEN_APPROVE_ZAP",
+        "VAULT_APPROVE_ZAP",
+        "VAULT_APPROVE_MIGRATOR",
+        "CRV_APPROVE_YVE_CRV",
+        "TOKEN_APPROVE_VEYFI",
+    }
+
+    # Routes are ordered cheapest first
+    costs = [route.cost for route in routes]
+    assert costs == sorted(costs)
+    assert {route.condition.id for route in routes[:2]} == {"TOKEN_APPROVE_ZAP", "CRV_APPROVE_YVE_CRV"}
+    assert routes[-1].condition.id == "TOKEN_APPROVE_VAULT"
+
+def test_requirements_ordered_by_cost():
+    dispatch_table = DispatchTable(load_conditions(1))
+    routes = dispatch_table.routes(function_selector("approve", ["address", "uint256"]))
+    route = [route for route in routes if route.condition.id == "VAULT_APPROVE_ZAP"][0]
+    assert [requirement.method_name for requirement in route.requirements] == ["isZapOutContract", "isVault"]
+
+def test_custom_requirement_costs():
+    dispatch_table = DispatchTable(load_conditions(1), {"isVault": 0})
+    routes = dispatch_table.routes(function_selector("deposit", ["uint256"]))
+    assert routes[0].cost == 0
+
+def test_unknown_selector_rejected_without_requirements():
+    backend = CountingBackend()
+    validator = Validator(load_conditions(1), backend)
+    assert function_selector("decimals", []) not in validator.dispatch_table
+    assert validator.validate(vault_address, encode_call("decimals", [], [])) == False
+    assert backend.calls == []
+
+def test_short_circuit_on_first_failed_requirement():
+    backend = CountingBackend()
+    validator = Validator(load_conditions(1), backend)
+    data = encode_call("approve", ["address", "uint256"], [vault_address, MAX_UINT256])
+    assert validator.validate(vault_address, data) == False
+
+    # One failed requirement per candidate condition
+    assert len(backend.calls) == 6
@@ -0,0 +1,55 @@
+import dataclasses
+import pytest
+from yearn_allowlist import Condition, load_conditions
+from yearn_allowlist.sync import chunk, plan_sync
+
+# Description: Only added, changed and removed conditions are part of the plan
+def test_plan_sync():
+    configured = load_conditions(1)
+    assert plan_sync(configured, configured) == ([], [], [], len(configured))
+
+    onchain = [Condition.from_tuple(condition.to_tuple()) for condition in configured]
+    changed = dataclasses.replace(onchain[1], method_name="other")
+    stale = dataclasses.replace(onchain[0], id="STALE_CONDITION")
+    onchain = [stale, changed] + onchain[3:]
+
+    plan = plan_sync(onchain, configured)
+    assert [condition.id for condition in plan.adds] == [configured[0].id, configured[2].id]
+    assert plan.updates == [configured[1]]
+    assert plan.removes == ["STALE_CONDITION"]
+    assert plan.unchanged == len(configured) - 3
+
+# Description: Chunks stay under the gas budget and keep their order
+def test_chunk():
+    estimates = []
+    def estimate_gas(items):
+        estimates.append(len(items))
+        return 21000 + 100000 * len(items)
+
+    items = list(range(10))
+    assert chunk(items, estimate_gas, 10**7) == [items]
+    assert estimates == [10]
+
+    chunks = chunk(items, estimate_gas, 350000)
+    assert [item for current in chunks for item in current] == items
+    assert all(estimate_gas(current) <= 350000 for current in chunks)
+    assert chunk([], estimate_gas, 350000) == []
+    with pytest.raises(ValueError):
+        chunk(items, estimate_gas, 100000)
+
+# Description: Estimates rejected by the node split the chunk
+def test_chunk_rejected_estimate():
+    def estimate_gas(items):
+        if len(items) > 2:
+            raise ValueError("exceeds block gas limit")
+        return 1
+    assert chunk(list(range(5)), estimate_gas, 10) == [[0, 1], [2], [3, 4]]
+
+# Description: An item that does not fit on its own is named in the error
+def test_chunk_oversized_item():
+    def estimate_gas(items):
+        if "LARGE" in items:
+            raise ValueError("exceeds block gas limit")
+        return 1
+    with pytest.raises(ValueError, match="condition LARGE"):
+        chunk(["SMALL", "LARGE"], estimate_gas, 10, lambda id: "condition " + id)
@@ -0,0 +1,74 @@
+import json
+import pytest
+from yearn_allowlist import ConfigurationError, load_chain_config, load_conditions, load_protocol_config
+from yearn_allowlist.abi import function_selector
+from yearn_allowlist.config import available_chain_ids
+
+vault_address = "0x5c0A86A32c129538D62C106Eb8115a8b02358d57"
+
+def write_chain(path, addresses=None, allowlist=None, conditions=None):
+    chain_path = path / "chains" / "1"
+    chain_path.mkdir(parents=True)
+    (chain_path / "addresses.json").write_text(json.dumps(addresses or {}))
+    if allowlist is None:
+        allowlist = {"allowlist_registry_address": vault_address}
+    (chain_path / "allowlist.json").write_text(json.dumps(allowlist))
+    (chain_path / "conditions.json").write_text(json.dumps(conditions or []))
+    return str(path)
+
+def condition(id, requirements=None):
+    return {
+        "id": id,
+        "implementationId": "IMPLEMENTATION_YEARN_VAULTS",
+        "methodName": "deposit",
+        "paramTypes": ["uint256"],
+        "requirements": requirements or [["target", "isVault"]],
+    }
+
+# Description: Configured chains load once and are indexed by id and selector
+def test_load_chain_config():
+    assert available_chain_ids() == [1, 250]
+    chain_config = load_chain_config(1)
+    assert load_chain_config("1") is chain_config
+    assert load_protocol_config().origin_name == "yearn.finance"
+
+    deposit = chain_config.condition("VAULT_DEPOST")
+    assert deposit.signature == "deposit(uint256)"
+    assert deposit in chain_config.conditions_for_selector(function_selector("deposit", ["uint256"]))
+    assert chain_config.conditions_for_selector(b"\x00" * 4) == ()
+    assert len(chain_config.conditions_by_id) == len(chain_config.conditions)
+    assert chain_config.addresses["addresses_provider_address"].startswith("0x")
+    with pytest.raises(TypeError):
+        chain_config.addresses["addresses_provider_address"] = vault_address
+
+    # The chain is always explicit
+    assert load_conditions(1) == list(chain_config.conditions)
+    with pytest.raises(TypeError):
+        load_conditions()
+
+# Description: Invalid configuration is rejected on load
+def test_invalid_chain_config(tmp_path):
+    path = write_chain(tmp_path / "duplicate", conditions=[condition("A"), condition("A")])
+    with pytest.raises(ConfigurationError, match="Duplicate"):
+        load_chain_config(1, path)
+
+    path = write_chain(tmp_path / "address", addresses={"zap_in_to_vault_address": "0x1234"})
+    with pytest.raises(ConfigurationError, match="zap_in_to_vault_address"):
+        load_chain_config(1, path)
+
+    path = write_chain(tmp_path / "registry", allowlist={})
+    with pytest.raises(ConfigurationError, match="allowlist_registry_address"):
+        load_chain_config(1, path)
+
+    path = write_chain(tmp_path / "param", conditions=[condition("A", [["param", "isVault", "1"]])])
+    with pytest.raises(ConfigurationError, match="checks param 1"):
+        load_chain_config(1, path)
+
+    path = write_chain(tmp_path / "kind", conditions=[condition("A", [["value", "isVault"]])])
+    with pytest.raises(ConfigurationError, match="Invalid condition"):
+        load_chain_config(1, path)
+
+    (tmp_path / "protocol").mkdir()
+    (tmp_path / "protocol" / "protocol.json").write_text("{}")
+    with pytest.raises(ConfigurationError, match="originName"):
+        load_protocol_config(str(tmp_path / "protocol"))
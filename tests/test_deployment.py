@@ -0,0 +1,63 @@
+import io
+import sys
+import time
+import pytest
+from yearn_allowlist.deployment import ChainDeployment, deployment_command, format_summary, plan_deployments, run_deployments
+
+# Description: Every chain with a deploy script gets a worker on its network
+def test_plan_deployments():
+    deployments = plan_deployments()
+    assert [deployment.chain_id for deployment in deployments] == ["1", "250"]
+    assert [deployment.network for deployment in deployments] == ["mainnet", "ftm-main"]
+    assert deployment_command(deployments[1]) == ["brownie", "run", "chains/250/deploy", "--network", "ftm-main"]
+
+    deployments = plan_deployments(["250"], {"250": "ftm-test"})
+    assert deployments == [ChainDeployment("250", "ftm-test", "scripts/chains/250/deploy.py")]
+    assert plan_deployments(["250"], fork=True)[0].network == "ftm-main-fork"
+
+# Description: Workers run concurrently and report their summaries
+def test_run_deployments(tmp_path):
+    script = (
+        "import json, os, sys, time\n"
+        "time.sleep(0.5)\n"
+        "print('deployed')\n"
+        "if sys.argv[1] != 'fail':\n"
+        "    json.dump({'chain': sys.argv[1]}, open(os.environ['DEPLOY_SUMMARY_PATH'], 'w'))\n"
+        "sys.exit(sys.argv[1] == 'fail')\n"
+    )
+    deployments = [
+        ChainDeployment("1", "a", ""),
+        ChainDeployment("250", "b", ""),
+        ChainDeployment("fail", "c", ""),
+    ]
+    output = io.StringIO()
+    start = time.time()
+    results = run_deployments(
+        deployments,
+        command=lambda deployment: [sys.executable, "-c", script, deployment.chain_id],
+        project_path=str(tmp_path),
+        output=output,
+    )
+    assert time.time() - start < 1.4
+    assert [result.summary for result in results] == [{"chain": "1"}, {"chain": "250"}, {}]
+    assert [result.returncode for result in results] == [0, 0, 1]
+    assert "[250] deployed" in output.getvalue()
+
+    summary = format_summary(results)
+    assert "chain=250" in summary
+    assert summary.splitlines()[3].split()[2] == "failed"
+
+# Description: A chain whose script cannot be started fails without aborting the others
+def test_run_deployments_start_failure(tmp_path):
+    deployments = [ChainDeployment("1", "a", ""), ChainDeployment("250", "b", "")]
+    def command(deployment):
+        if deployment.chain_id == "1":
+            return [str(tmp_path / "missing")]
+        return [sys.executable, "-c", "import json, os; json.dump({'ok': 1}, open(os.environ['DEPLOY_SUMMARY_PATH'], 'w'))"]
+    results = run_deployments(deployments, command=command, project_path=str(tmp_path), output=io.StringIO())
+    assert results[0].error is not None and results[0].summary == {}
+    assert results[1].summary == {"ok": 1} and results[1].error is None
+
+    summary = format_summary(results).splitlines()
+    assert summary[1].split()[2] == "failed" and "error=" in summary[1]
+    assert summary[2].split()[2] == "ok"
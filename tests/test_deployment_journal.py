@@ -0,0 +1,25 @@
+from yearn_allowlist import load_conditions
+from yearn_allowlist.journal import DeploymentJournal, conditions_digest, implementation_step
+
+# Description: Steps are persisted as soon as they are recorded
+def test_journal_persistence(tmp_path):
+    journal = DeploymentJournal.for_network("ftm-main", 250, str(tmp_path))
+    journal.record("registration", allowlist="0x01")
+    journal.record(implementation_step("IMPLEMENTATION_IRON_BANK"), address="0x02", set=False)
+    journal.record(implementation_step("IMPLEMENTATION_IRON_BANK"), set=True)
+
+    reloaded = DeploymentJournal.for_network("ftm-main", 250, str(tmp_path))
+    assert reloaded.get("registration") == {"allowlist": "0x01"}
+    assert reloaded.get("implementation:IMPLEMENTATION_IRON_BANK") == {"address": "0x02", "set": True}
+
+    reloaded.forget("registration")
+    assert DeploymentJournal.for_network("ftm-main", 250, str(tmp_path)).get("registration") is None
+
+    # Journals of another chain are ignored
+    assert DeploymentJournal.for_network("ftm-main", 1, str(tmp_path)).steps == {}
+
+# Description: The conditions digest only changes with the condition set
+def test_conditions_digest():
+    conditions = load_conditions(250)
+    assert conditions_digest(conditions) == conditions_digest(list(reversed(conditions)))
+    assert conditions_digest(conditions) != conditions_digest(conditions[1:])
@@ -0,0 +1,90 @@
+import os
+import pytest
+from brownie import ZERO_ADDRESS, accounts, chain
+from scripts.compare_gas import deploy_implementation, prepare_implementation
+from yearn_allowlist.benchmarks import DEFAULT_THRESHOLD, find_regressions, intrinsic_gas, load_baseline, missing_baselines, save_baseline
+from yearn_allowlist.samples import brownie_samples, condition_calldata, has_samples, invalid_condition_calldata
+
+##############################################################
+# Benchmarks
+#
+# Set UPDATE_GAS_BASELINE=1 to write the measured gas to tests/gas_baseline.json
+# Set GAS_REGRESSION_THRESHOLD to override the allowed relative increase (default 0.05)
+##############################################################
+
+MOCK_VE_YFI_ID = b"veyfi.eth".ljust(32, b"\x00")
+
+def measure_conditions(allowlist_registry, origin_name, conditions, samples):
+    unsampled = [condition.id for condition in conditions if not has_samples(condition, samples)]
+    if unsampled:
+        pytest.fail("No samples for conditions: " + ", ".join(unsampled))
+    results = {}
+    for condition in conditions:
+        target, data = condition_calldata(condition, samples)
+        valid_gas = allowlist_registry.validateCalldataByOrigin.estimate_gas(origin_name, target, data)
+        invalid_gas = max(
+            allowlist_registry.validateCalldataByOrigin.estimate_gas(origin_name, target, data)
+            for requirement, target, data in invalid_condition_calldata(condition, samples)
+        )
+        results[condition.id] = {"valid": valid_gas, "invalid": invalid_gas}
+    return results
+
+def deploy_mock_ve_yfi(AllowlistImplementationVeYFI, addresses_provider, allowlist_registry, owner):
+    """veYFI implementation for the mocks, which have no previous implementation to copy settings from"""
+    implementation = AllowlistImplementationVeYFI.deploy(addresses_provider, allowlist_registry, accounts[1], {"from": owner})
+    implementation.setVeYfiId(MOCK_VE_YFI_ID, {"from": owner})
+    return implementation
+
+# Description: Gas for validateCalldataByOrigin must not regress for any configured condition
+def test_condition_gas(allowlist_registry, allowlist, owner, origin_name, allowlist_addresses, conditions, contract_at, mocks, AllowlistImplementationVeYFI):
+    baseline = load_baseline()
+    chain_id = str(chain.id)
+    update = os.environ.get("UPDATE_GAS_BASELINE") == "1"
+    if not update and chain_id not in baseline:
+        pytest.skip("No gas baseline recorded for chain " + chain_id + ", record one with UPDATE_GAS_BASELINE=1")
+    samples = brownie_samples(allowlist_addresses)
+    addresses_provider = contract_at(allowlist_addresses["addresses_provider_address"])
+
+    # Use implementations built from the current sources
+    for implementation_id in sorted(set(condition.implementation_id for condition in conditions)):
+        old_address = allowlist.implementationById(implementation_id)
+        old_implementation = contract_at(old_address) if old_address != ZERO_ADDRESS else None
+        implementation = deploy_implementation(implementation_id, old_implementation, addresses_provider, allowlist_registry, owner)
+        if implementation is None and mocks is not None and implementation_id == "IMPLEMENTATION_VEYFI":
+            implementation = deploy_mock_ve_yfi(AllowlistImplementationVeYFI, addresses_provider, allowlist_registry, owner)
+        if implementation is None:
+            continue
+        prepare_implementation(implementation_id, implementation, samples, owner, True)
+        allowlist.setImplementation(implementation_id, implementation, {"from": owner})
+    allowlist.addConditions([condition.to_tuple() for condition in conditions], {"from": owner})
+
+    results = measure_conditions(allowlist_registry, origin_name, conditions, samples)
+
+    # Compare with baseline
+    if update:
+        baseline[chain_id] = results
+        save_baseline(baseline)
+        return
+    threshold = float(os.environ.get("GAS_REGRESSION_THRESHOLD", DEFAULT_THRESHOLD))
+    missing = missing_baselines(baseline.get(chain_id, {}), results)
+    assert missing == [], "No gas baseline (condition, case), record one with UPDATE_GAS_BASELINE=1: " + str(missing)
+    regressions = find_regressions(baseline.get(chain_id, {}), results, threshold)
+    assert regressions == [], "Gas regressions (condition, case, baseline, measured): " + str(regressions)
+
+##############################################################
+# Baseline comparison
+##############################################################
+
+def test_find_regressions():
+    baseline = {"VAULT_DEPOST": {"valid": 10000, "invalid": 8000}}
+    results = {
+        "VAULT_DEPOST": {"valid": 10400, "invalid": 9000},
+        "VAULT_WITHDRAW": {"valid": 50000, "invalid": 50000},
+    }
+    assert find_regressions(baseline, results, 0.05) == [("VAULT_DEPOST", "invalid", 8000, 9000)]
+    assert find_regressions(baseline, results, 0.2) == []
+    assert missing_baselines(baseline, results) == [("VAULT_WITHDRAW", "invalid"), ("VAULT_WITHDRAW", "valid")]
+
+def test_intrinsic_gas():
+    assert intrinsic_gas(b"") == 21000
+    assert intrinsic_gas(bytes.fromhex("3e5f0e6b") + b"\x00" * 12 + b"\x01" * 20) == 21000 + 4 * 16 + 12 * 4 + 20 * 16
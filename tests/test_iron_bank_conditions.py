@@ -1,46 +1,68 @@
 import pytest
-from brownie import Contract, ZERO_ADDRESS, chain
+from brownie import ZERO_ADDRESS, accounts, chain
 MAX_UINT256 = 2**256-1
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def implementation_id():
     return "IMPLEMENTATION_IRON_BANK"
 
-@pytest.fixture(autouse=True)
-def implementation(owner, AllowlistImplementationIronBank, address_provider, allowlist, implementation_id, allowlist_addresses):
+@pytest.fixture(scope="module", autouse=True)
+def implementation(owner, AllowlistImplementationIronBank, address_provider, allowlist, implementation_id, allowlist_addresses, contract_at):
     use_live_contract = True
 
     _implementation = None
     if use_live_contract:
         key = "implementation_iron_bank_address"
         if key in allowlist_addresses:
-            _implementation = Contract(allowlist_addresses[key])
+            _implementation = contract_at(allowlist_addresses[key])
     if _implementation == None:
-        address_provider = Contract(allowlist_addresses["addresses_provider_address"])
         _implementation = AllowlistImplementationIronBank.deploy(address_provider, {"from": owner})
 
     allowlist.setImplementation(implementation_id, _implementation, {"from": owner})
     return _implementation
 
-@pytest.fixture
-def market(registry_adapter):
-    return Contract(registry_adapter.assetsAddresses()[0])
+@pytest.fixture(scope="module")
+def market(registry_adapter, contract_at):
+    return contract_at(registry_adapter.assetsAddresses()[0])
 
-@pytest.fixture
-def registry_adapter(address_provider):
-    return Contract(address_provider.addressById("REGISTRY_ADAPTER_IRON_BANK"))
+@pytest.fixture(scope="module")
+def registry_adapter(address_provider, contract_at):
+    return contract_at(address_provider.addressById("REGISTRY_ADAPTER_IRON_BANK"))
 
-@pytest.fixture
-def comptroller_proxy(registry_adapter):
-    return Contract(registry_adapter.comptrollerAddress())
+@pytest.fixture(scope="module")
+def comptroller_proxy(registry_adapter, contract_at):
+    return contract_at(registry_adapter.comptrollerAddress())
 
-@pytest.fixture
-def comptroller_implementation(comptroller_proxy):
-    return Contract(comptroller_proxy.comptrollerImplementation())
+@pytest.fixture(scope="module")
+def comptroller_implementation(comptroller_proxy, contract_at):
+    return contract_at(comptroller_proxy.comptrollerImplementation())
 
-@pytest.fixture
-def market_token(market):
-    return Contract(market.underlying())
+@pytest.fixture(scope="module")
+def market_token(market, contract_at):
+    return contract_at(market.underlying())
+
+##############################################################
+# Market index
+##############################################################
+
+# Description: Underlying tokens are answered from the index after a refresh
+def test_market_underlying_token_index(owner, AllowlistImplementationIronBank, address_provider, registry_adapter, market_token):
+    implementation = AllowlistImplementationIronBank.deploy(address_provider, {"from": owner})
+
+    # Index misses fall back to the registry adapter
+    assert implementation.isIndexedUnderlyingToken(market_token) == False
+    assert implementation.isMarketUnderlyingToken(market_token) == True
+    assert implementation.isMarketUnderlyingToken(ZERO_ADDRESS) == False
+
+    # Refreshing is permissionless
+    implementation.refreshMarketUnderlyingTokens({"from": accounts[0]})
+    assert implementation.isIndexedUnderlyingToken(market_token) == True
+    assert implementation.indexedUnderlyingTokensList() == registry_adapter.assetsTokensAddresses()
+    assert implementation.isMarketUnderlyingToken(market_token) == True
+
+    # Refreshing again rebuilds the same index
+    implementation.refreshMarketUnderlyingTokens({"from": accounts[0]})
+    assert implementation.indexedUnderlyingTokensList() == registry_adapter.assetsTokensAddresses()
 
 ##############################################################
 # Target: Tokens
@@ -1,9 +1,11 @@
 import pytest
-from brownie import Contract, ZERO_ADDRESS, chain
+from brownie import ZERO_ADDRESS, chain
+
+pytestmark = pytest.mark.fork_only
 
 MAX_UINT256 = 2**256-1
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def implementation(owner, YearnLabsAllowlistImplementation):
     return YearnLabsAllowlistImplementation.deploy({"from": owner})
 
@@ -16,14 +18,14 @@ def implementation(owner, YearnLabsAllowlistImplementation):
 # Description: Pickle jar deposit
 # Signature: "pickle_jar.deposit(uint256)"
 # Target: Must be the yveCRV/ETH SLP pickle jar
-def test_pickle_jar_deposit(allowlist_registry, allowlist, owner, origin_name, implementation, allowlist_addresses):
+def test_pickle_jar_deposit(allowlist_registry, allowlist, owner, origin_name, implementation, allowlist_addresses, contract_at):
     # This test is not supported on all networks
     test_supported = chain.id == 1
     if (test_supported == False):
         return
 
     # Fetch pickle jar
-    pickle_jar = Contract(allowlist_addresses["pickle_jar_address"])
+    pickle_jar = contract_at(allowlist_addresses["pickle_jar_address"])
 
     # Test valid calldata before adding condition - pickle_jar.deposit(UINT256_MAX)
     data = pickle_jar.deposit.encode_input(MAX_UINT256)
@@ -56,14 +58,14 @@ def test_pickle_jar_deposit(allowlist_registry, allowlist, owner, origin_name, i
 # Description: Pickle jar deposit
 # Signature: "pickle_jar.deposit(uint256)"
 # Target: Must be the yveCRV/ETH SLP pickle jar
-def test_pickle_gauge_stake(allowlist_registry, allowlist, owner, origin_name, implementation, allowlist_addresses):
+def test_pickle_gauge_stake(allowlist_registry, allowlist, owner, origin_name, implementation, allowlist_addresses, contract_at):
     # This test is not supported on all networks
     test_supported = chain.id == 1
     if (test_supported == False):
         return
 
     # Fetch pickle gauge
-    pickle_gauge = Contract(allowlist_addresses["pickle_gauge_address"])
+    pickle_gauge = contract_at(allowlist_addresses["pickle_gauge_address"])
 
     # Test valid calldata before adding condition - pickle_gauge.deposit(UINT256_MAX)
     data = pickle_gauge.deposit.encode_input(MAX_UINT256)
@@ -96,14 +98,14 @@ def test_pickle_gauge_stake(allowlist_registry, allowlist, owner, origin_name, i
 # Description: yveCRV vault lock
 # Signature: "yvecrv.deposit(uint256)"
 # Target: Must be yveCRV-DAO yVault
-def test_yvecrv_lock(allowlist_registry, allowlist, owner, origin_name, implementation, allowlist_addresses):
+def test_yvecrv_lock(allowlist_registry, allowlist, owner, origin_name, implementation, allowlist_addresses, contract_at):
     # This test is not supported on all networks
     test_supported = chain.id == 1
     if (test_supported == False):
         return
 
     # Fetch yveCRV-DAO vault
-    yvecrv_vault = Contract(allowlist_addresses["yvecrv_vault_address"])
+    yvecrv_vault = contract_at(allowlist_addresses["yvecrv_vault_address"])
 
     # Test valid calldata before adding condition - yveCrv.deposit(UINT256_MAX)
     data = yvecrv_vault.deposit.encode_input(MAX_UINT256)
@@ -132,14 +134,14 @@ def test_yvecrv_lock(allowlist_registry, allowlist, owner, origin_name, implemen
 # Description: yveCRV vault claim
 # Signature: "yvecrv.claim()"
 # Target: Must be yveCRV-DAO yVault
-def test_yvecrv_claim(allowlist_registry, allowlist, owner, origin_name, implementation, allowlist_addresses):
+def test_yvecrv_claim(allowlist_registry, allowlist, owner, origin_name, implementation, allowlist_addresses, contract_at):
     # This test is not supported on all networks
     test_supported = chain.id == 1
     if (test_supported == False):
         return
 
     # Fetch yveCRV-DAO vault
-    yvecrv_vault = Contract(allowlist_addresses["yvecrv_vault_address"])
+    yvecrv_vault = contract_at(allowlist_addresses["yvecrv_vault_address"])
 
     # Test valid calldata before adding condition - yveCrv.claim()
     data = yvecrv_vault.claim.encode_input()
@@ -172,14 +174,14 @@ def test_yvecrv_claim(allowlist_registry, allowlist, owner, origin_name, impleme
 # Description: Reinvest 3CRV into yveCRV-DAO vault
 # Signature: "threecrv_zap.zap()"
 # Target: Must be yearn 3CRV yveCRV-DAO zap contract
-def test_threecrv_yvecrv_zap(allowlist_registry, allowlist, owner, origin_name, implementation, allowlist_addresses):
+def test_threecrv_yvecrv_zap(allowlist_registry, allowlist, owner, origin_name, implementation, allowlist_addresses, contract_at):
     # This test is not supported on all networks
     test_supported = chain.id == 1
     if (test_supported == False):
         return
 
     # Fetch 3CRV zap contract
-    threecrv_zap = Contract(allowlist_addresses["threecrv_zap_address"])
+    threecrv_zap = contract_at(allowlist_addresses["threecrv_zap_address"])
 
     # Test valid calldata before adding condition - yveCrv.deposit(UINT256_MAX)
     data = threecrv_zap.zap.encode_input()
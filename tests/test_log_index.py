@@ -0,0 +1,273 @@
+import copy
+
+import pytest
+from yearn_allowlist import RequirementCall, SimulatorBackend
+from yearn_allowlist.abi import encode_word, function_selector
+from yearn_allowlist.log_index import (
+    MARKET_LISTED, NEW_VAULT, VAULT_ADDED, ZAP_IN_CONTRACT_SET, LogIndexer, LogIndexError, OverlaySet, event_topic,
+)
+from yearn_allowlist.snapshot import load_snapshot
+
+vaults_implementation_address = "0x4894d98442f5bea884cd6fa958954f73f58ae9b0"
+ve_yfi_implementation_address = "0x6d5a6a2b5d1b9e0c8a6b1c6f4e3d2c1b0a998877"
+registry_address = "0x50c1a2ea0a861a967d9d0ffe2ae4012c2e053804"
+ve_yfi_registry_address = "0x1a5ebfd5e2b1b3b2c2a3bb9c1d8d0e0f6d1a2b3c"
+comptroller_address = "0xab1c342c7bf5ec5f02adea1c2270670bca144cbb"
+vault_address = "0x5c0a86a32c129538d62c106eb8115a8b02358d57"
+new_vault_address = "0xa258c4606ca8206d8aa700ce2143d7db854d168c"
+vault_token_address = "0x6b175474e89094c44da98b954eedeac495271d0f"
+new_token_address = "0xa0b86991c6218b36c1d19d4a2e9eb0ce3606eb48"
+market_address = "0x8e595470ed749b85c6f7669de83eae304c2ec68f"
+market_token_address = "0xdac17f958d2ee523a2206206994597c13d831ec7"
+gauge_address = "0x7fd8af959b54a677a1d8f92265bd0714274c56a3"
+zap_in_address = "0x8e52522e6a77578904ddd7f528a22521dc4154f5"
+ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
+
+snapshot = {
+    "version": 1,
+    "chain_id": 1,
+    "block": 100,
+    "block_hash": "0x" + b"0:100".hex().ljust(64, "0"),
+    "implementations": {
+        "IMPLEMENTATION_YEARN_VAULTS": {
+            "contract": "AllowlistImplementationYearnVaults",
+            "address": vaults_implementation_address,
+            "state": {
+                "registry": registry_address,
+                "registered_tokens": [vault_token_address],
+                "vaults_by_token": {vault_token_address: [vault_address]},
+                "zap_in_contracts": [],
+            },
+        },
+        "IMPLEMENTATION_IRON_BANK": {
+            "contract": "AllowlistImplementationIronBank",
+            "address": "0x1b2bcbd6fd5b5e1d7a4b1e3c9c7e2c0d8f1a9b10",
+            "state": {"comptroller": comptroller_address, "listed_markets": [], "underlying_tokens": []},
+        },
+        "IMPLEMENTATION_VEYFI": {
+            "contract": "AllowlistImplementationVeYFI",
+            "address": ve_yfi_implementation_address,
+            "state": {"registry": ve_yfi_registry_address, "vaults": [], "gauges": []},
+        },
+    },
+}
+
+def topic(address):
+    return "0x" + encode_word("address", address).hex()
+
+def log(address, block, log_index, topics, data=b"", removed=False):
+    return {
+        "address": address, "blockNumber": hex(block), "logIndex": hex(log_index),
+        "topics": topics, "data": "0x" + data.hex(), "removed": removed,
+    }
+
+def new_vault_log(block, log_index, token, vault):
+    data = encode_word("address", vault) + encode_word("uint256", 128) + encode_word("uint256", 5) + b"0.4.3".ljust(32, b"\x00")
+    return log(registry_address, block, log_index, [NEW_VAULT, topic(token), "0x" + encode_word("uint256", 1).hex()], data)
+
+def zap_in_log(block, log_index, address, allowed):
+    return log(vaults_implementation_address, block, log_index, [ZAP_IN_CONTRACT_SET, topic(address)], encode_word("bool", allowed))
+
+class LocalChain:
+    """Block hashes and logs served like a node would for eth_getLogs"""
+    def __init__(self, head):
+        self.logs = []
+        self.hashes = {}
+        self.fork = 0
+        self.underlying = {market_address: market_token_address}
+        self.requests = []
+        self.on_get_logs = None  # Called once the logs of a query are read
+        self.mine(head)
+
+    def mine(self, head, fork_from=None):
+        if fork_from is not None:
+            self.fork += 1
+            self.logs = [log for log in self.logs if int(log["blockNumber"], 16) < fork_from]
+        for block in range(fork_from if fork_from is not None else 0, head + 1):
+            self.hashes[block] = "0x" + (str(self.fork) + ":" + str(block)).encode().hex().ljust(64, "0")
+        self.head = head
+
+    def request(self, method, params):
+        self.requests.append(method)
+        if method == "eth_blockNumber":
+            return hex(self.head)
+        if method == "eth_getBlockByNumber":
+            block = int(params[0], 16)
+            return {"hash": self.hashes[block]} if block <= self.head else None
+        if method == "eth_call":
+            assert params[0]["data"] == "0x" + function_selector("underlying", []).hex()
+            return "0x" + encode_word("address", self.underlying[params[0]["to"]]).hex()
+        assert method == "eth_getLogs"
+        query, = params
+        from_block, to_block = int(query["fromBlock"], 16), int(query["toBlock"], 16)
+        logs = [
+            log for log in reversed(self.logs)
+            if from_block <= int(log["blockNumber"], 16) <= to_block
+            and log["address"] in query["address"] and log["topics"][0] in query["topics"][0]
+        ]
+        if self.on_get_logs is not None:
+            self.on_get_logs()
+        return logs
+
+@pytest.fixture
+def chain():
+    return LocalChain(100)
+
+@pytest.fixture
+def indexer(chain):
+    return LogIndexer(copy.deepcopy(snapshot), chain.request, max_block_range=10)
+
+def is_vault(backend, address):
+    return backend.check(RequirementCall("IMPLEMENTATION_YEARN_VAULTS", "isVault", "address", encode_word("address", address)))
+
+##############################################################
+# Deltas
+##############################################################
+
+def test_overlay_set():
+    addresses = OverlaySet(frozenset([vault_address]))
+    addresses.add(new_vault_address)
+    addresses.discard(vault_address)
+    assert new_vault_address in addresses and vault_address not in addresses
+    assert list(addresses) == [new_vault_address] and len(addresses) == 1
+    addresses.add(vault_address)
+    assert sorted(addresses) == sorted([vault_address, new_vault_address])
+
+def test_registry_logs(chain, indexer):
+    backend = SimulatorBackend(indexer.simulators)
+    assert is_vault(backend, new_vault_address) == False
+    chain.logs += [
+        new_vault_log(103, 0, new_token_address, new_vault_address),
+        log(comptroller_address, 104, 0, [MARKET_LISTED], encode_word("address", market_address)),
+        log(ve_yfi_registry_address, 104, 1, [VAULT_ADDED, topic(vault_address), topic(gauge_address)]),
+        # Vaults added without a gauge do not make the zero address a gauge
+        log(ve_yfi_registry_address, 104, 2, [VAULT_ADDED, topic(new_vault_address), topic(ZERO_ADDRESS)]),
+        # Experimental vaults and logs of a dropped block change nothing
+        log(registry_address, 105, 0, [event_topic("NewExperimentalVault(address,address,address,string)"), topic(new_token_address)]),
+        dict(new_vault_log(106, 0, new_token_address, vault_token_address), removed=True),
+    ]
+    chain.mine(125)
+    update = indexer.poll()
+    assert update.block == 125 and update.rolled_back == []
+    assert [(delta.key, delta.address) for delta in update.applied] == [
+        ("vaults_by_token", new_vault_address),
+        ("registered_tokens", new_token_address),
+        ("underlying_tokens", market_token_address),
+        ("listed_markets", market_address),
+        ("vaults", vault_address),
+        ("gauges", gauge_address),
+        ("vaults", new_vault_address),
+    ]
+    assert chain.requests.count("eth_getLogs") == 3
+
+    assert is_vault(backend, new_vault_address) == True
+    assert is_vault(backend, vault_token_address) == False
+    state = indexer.snapshot["implementations"]["IMPLEMENTATION_YEARN_VAULTS"]["state"]
+    assert state["vaults_by_token"][new_token_address] == [new_vault_address]
+    assert state["registered_tokens"] == [vault_token_address, new_token_address]
+    state = indexer.snapshot["implementations"]["IMPLEMENTATION_IRON_BANK"]["state"]
+    assert (state["listed_markets"], state["underlying_tokens"]) == ([market_address], [market_token_address])
+    assert indexer.snapshot["block"] == 125
+
+    # Nothing new: only the head and the newest checkpoint are read
+    chain.requests.clear()
+    assert indexer.poll().applied == []
+    assert chain.requests == ["eth_getBlockByNumber", "eth_blockNumber"]
+
+# Description: Owner setters add and remove flagged contracts in log order
+def test_setter_logs(chain, indexer, tmp_path):
+    chain.logs += [zap_in_log(102, 1, zap_in_address, False), zap_in_log(102, 0, zap_in_address, True)]
+    chain.mine(102)
+    update = indexer.poll()
+    assert [(delta.address, delta.added) for delta in update.applied] == [(zap_in_address, True), (zap_in_address, False)]
+    chain.logs.append(zap_in_log(103, 0, zap_in_address, True))
+    chain.logs.append(zap_in_log(103, 1, zap_in_address, True))
+    chain.mine(103)
+    assert len(indexer.poll().applied) == 1
+
+    path = str(tmp_path / "1.json")
+    indexer.save(path)
+    saved = load_snapshot(path, 1)
+    assert saved["block"] == 103 and saved["block_hash"] == chain.hashes[103]
+    assert saved["implementations"]["IMPLEMENTATION_YEARN_VAULTS"]["state"]["zap_in_contracts"] == [zap_in_address]
+
+##############################################################
+# Reorgs
+##############################################################
+
+# Description: Deltas of reorged blocks are undone and the new branch is applied
+def test_reorg_rollback(chain, indexer):
+    backend = SimulatorBackend(indexer.simulators)
+    chain.logs.append(new_vault_log(104, 0, vault_token_address, new_vault_address))
+    chain.mine(115)
+    indexer.poll()
+    assert is_vault(backend, new_vault_address) == True
+
+    # The vault moves to block 112 on the new branch, the zap is only added there
+    chain.mine(118, fork_from=104)
+    chain.logs += [new_vault_log(112, 0, vault_token_address, new_vault_address), zap_in_log(116, 0, zap_in_address, True)]
+    update = indexer.poll()
+    assert [delta.address for delta in update.rolled_back] == [new_vault_address]
+    assert [delta.address for delta in update.applied] == [new_vault_address, zap_in_address]
+    assert [checkpoint.block for checkpoint in indexer.checkpoints] == [100, 110, 118]
+    state = indexer.snapshot["implementations"]["IMPLEMENTATION_YEARN_VAULTS"]["state"]
+    assert state["vaults_by_token"][vault_token_address] == [vault_address, new_vault_address]
+
+    # A reorg below every checkpoint needs a new snapshot
+    chain.mine(130, fork_from=50)
+    with pytest.raises(LogIndexError):
+        indexer.poll()
+
+# Description: Logs read while their blocks are reorged are not applied
+def test_reorg_while_reading(chain, indexer):
+    backend = SimulatorBackend(indexer.simulators)
+    chain.logs.append(new_vault_log(104, 0, vault_token_address, new_vault_address))
+    chain.mine(108)
+    def reorg():
+        chain.on_get_logs = None
+        chain.mine(108, fork_from=102)
+    chain.on_get_logs = reorg
+    update = indexer.poll()
+    assert (update.block, update.applied) == (100, [])
+    assert is_vault(backend, new_vault_address) == False
+
+    # The next poll reads the new branch, which dropped the vault
+    update = indexer.poll()
+    assert (update.block, update.applied) == (108, [])
+    assert is_vault(backend, new_vault_address) == False
+
+# Description: The snapshot block is checked against the hash it was exported at
+def test_reorged_snapshot_block(chain, indexer):
+    chain.mine(110, fork_from=100)
+    with pytest.raises(LogIndexError):
+        indexer.poll()
+
+# Description: A range that fails midway applies nothing, and is undone as a whole after a reorg
+def test_failed_range(chain, indexer):
+    backend = SimulatorBackend(indexer.simulators)
+    chain.logs += [
+        new_vault_log(103, 0, vault_token_address, new_vault_address),
+        log(comptroller_address, 104, 0, [MARKET_LISTED], encode_word("address", market_address)),
+    ]
+    chain.mine(108)
+    underlying = chain.underlying
+    chain.underlying = {}
+    with pytest.raises(KeyError):
+        indexer.poll()
+    assert is_vault(backend, new_vault_address) == False
+    assert indexer.block == 100 and len(indexer.checkpoints) == 1
+
+    chain.underlying = underlying
+    assert [delta.address for delta in indexer.poll().applied] == [new_vault_address, market_token_address, market_address]
+    chain.mine(108, fork_from=102)
+    update = indexer.poll()
+    assert [delta.address for delta in update.rolled_back] == [market_address, market_token_address, new_vault_address]
+    assert is_vault(backend, new_vault_address) == False
+
+def test_unwatched_sources(chain):
+    exported = copy.deepcopy(snapshot)
+    del exported["implementations"]["IMPLEMENTATION_YEARN_VAULTS"]["state"]["registry"]
+    with pytest.warns(UserWarning, match="no registry for IMPLEMENTATION_YEARN_VAULTS"):
+        indexer = LogIndexer(exported, chain.request)
+    assert (registry_address, NEW_VAULT) not in indexer.decoders
+    assert (vaults_implementation_address, ZAP_IN_CONTRACT_SET) in indexer.decoders
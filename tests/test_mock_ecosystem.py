@@ -0,0 +1,270 @@
+import dataclasses
+import os
+import pytest
+from brownie import ZERO_ADDRESS, accounts, chain
+from yearn_allowlist import Condition, DifferentialBackend, EthCallBackend, MulticallBackend, RequirementCall, SimulatorBackend, Validator, brownie_eth_call
+from yearn_allowlist.abi import encode_tail, encode_word
+from yearn_allowlist.journal import DeploymentJournal, conditions_digest, implementation_step, verify_journal
+from yearn_allowlist.log_index import LogIndexer, brownie_request
+from yearn_allowlist.snapshot import export_snapshot, snapshot_backend
+from yearn_allowlist.sync import sync_conditions
+
+MAX_UINT256 = 2**256-1
+
+# Number of vaults and markets registered in scaled scenarios
+SCENARIO_SIZE = int(os.environ.get("MOCK_SCENARIO_SIZE", "20"))
+
+@pytest.fixture(scope="module", autouse=True)
+def mock_only(mock_mode):
+    if not mock_mode:
+        pytest.skip("requires the development network")
+
+@pytest.fixture(scope="module")
+def vaults(mocks):
+    return [mocks.vault] + [mocks.add_vault() for _ in range(SCENARIO_SIZE - 1)]
+
+@pytest.fixture(scope="module")
+def markets(mocks):
+    return [mocks.market] + [mocks.add_market() for _ in range(SCENARIO_SIZE - 1)]
+
+@pytest.fixture(scope="module")
+def vaults_implementation(owner, AllowlistImplementationYearnVaults, address_provider, allowlist_registry, allowlist):
+    implementation = AllowlistImplementationYearnVaults.deploy(address_provider, allowlist_registry, {"from": owner})
+    allowlist.setImplementation("IMPLEMENTATION_YEARN_VAULTS", implementation, {"from": owner})
+    return implementation
+
+@pytest.fixture(scope="module")
+def iron_bank_implementation(owner, AllowlistImplementationIronBank, address_provider, allowlist):
+    implementation = AllowlistImplementationIronBank.deploy(address_provider, {"from": owner})
+    allowlist.setImplementation("IMPLEMENTATION_IRON_BANK", implementation, {"from": owner})
+    return implementation
+
+##############################################################
+# Scaled scenarios
+##############################################################
+
+# Description: Every registered vault accepts deposits and its token approvals
+def test_many_vaults(allowlist_registry, allowlist, owner, origin_name, condition_by_id, vaults_implementation, vaults, contract_at):
+    allowlist.addCondition(condition_by_id("VAULT_DEPOST"), {"from": owner})
+    allowlist.addCondition(condition_by_id("TOKEN_APPROVE_VAULT"), {"from": owner})
+
+    for vault in vaults:
+        vault_token = contract_at(vault.token())
+        data = vault.deposit.encode_input(MAX_UINT256)
+        assert allowlist_registry.validateCalldataByOrigin(origin_name, vault, data) == True
+        data = vault_token.approve.encode_input(vault, MAX_UINT256)
+        assert allowlist_registry.validateCalldataByOrigin(origin_name, vault_token, data) == True
+
+        # Approving a non-vault is rejected
+        data = vault_token.approve.encode_input(ZERO_ADDRESS, MAX_UINT256)
+        assert allowlist_registry.validateCalldataByOrigin(origin_name, vault_token, data) == False
+
+    # Syncing every token fills the cache
+    tokens = [vault.token() for vault in vaults]
+    vaults_implementation.syncVaultsForTokens(tokens, {"from": accounts[0]})
+    for vault in vaults:
+        assert vaults_implementation.isCachedVault(vault) == True
+
+# Description: Every listed market accepts mints and can be entered in one call
+def test_many_markets(allowlist_registry, allowlist, owner, origin_name, condition_by_id, iron_bank_implementation, markets, mocks):
+    allowlist.addCondition(condition_by_id("MARKET_SUPPLY"), {"from": owner})
+    allowlist.addCondition(condition_by_id("COMPTROLLER_ENTER_MARKETS"), {"from": owner})
+    iron_bank_implementation.refreshMarketUnderlyingTokens({"from": accounts[0]})
+
+    for market in markets:
+        data = market.mint.encode_input(MAX_UINT256)
+        assert allowlist_registry.validateCalldataByOrigin(origin_name, market, data) == True
+        assert iron_bank_implementation.isMarketUnderlyingToken(market.underlying()) == True
+
+    data = mocks.comptroller.enterMarkets.encode_input(markets)
+    assert allowlist_registry.validateCalldataByOrigin(origin_name, mocks.comptroller, data) == True
+    data = mocks.comptroller.enterMarkets.encode_input(markets + [ZERO_ADDRESS])
+    assert allowlist_registry.validateCalldataByOrigin(origin_name, mocks.comptroller, data) == False
+
+# Description: The market index is kept per registry adapter, so replacing the adapter drops its tokens
+def test_market_index_per_registry_adapter(owner, mocks, iron_bank_implementation, ComptrollerMock, IronBankRegistryAdapterMock):
+    iron_bank_implementation.refreshMarketUnderlyingTokens({"from": accounts[0]})
+    assert iron_bank_implementation.isIndexedUnderlyingToken(mocks.market_token) == True
+
+    registry_adapter = IronBankRegistryAdapterMock.deploy(ComptrollerMock.deploy({"from": owner}), {"from": owner})
+    mocks.addresses_provider.setAddress("REGISTRY_ADAPTER_IRON_BANK", registry_adapter, {"from": owner})
+    assert iron_bank_implementation.isIndexedUnderlyingToken(mocks.market_token) == False
+    assert iron_bank_implementation.isMarketUnderlyingToken(mocks.market_token) == False
+    assert iron_bank_implementation.indexedUnderlyingTokensList() == []
+
+    # The previous adapter's index is answered again once it is restored
+    mocks.addresses_provider.setAddress("REGISTRY_ADAPTER_IRON_BANK", mocks.iron_bank_registry_adapter, {"from": owner})
+    assert iron_bank_implementation.isMarketUnderlyingToken(mocks.market_token) == True
+
+##############################################################
+# Condition sync
+##############################################################
+
+# Description: Syncing twice sends nothing the second time, and only the diff afterwards
+def test_sync_conditions(allowlist, owner, conditions):
+    configured = list(conditions)
+    plan = sync_conditions(allowlist, configured, owner)
+    assert len(plan.adds) == len(configured)
+    assert allowlist.conditionsLength() == len(configured)
+
+    plan = sync_conditions(allowlist, configured, owner)
+    assert plan == ([], [], [], len(configured))
+
+    # Tight gas budgets split the diff into several transactions
+    plan = sync_conditions(allowlist, configured[1:], owner, max_gas=2000000)
+    assert plan.removes == [configured[0].id]
+    plan = sync_conditions(allowlist, configured, owner, max_gas=2000000)
+    assert plan.adds == [configured[0]]
+    onchain = [Condition.from_tuple(condition) for condition in allowlist.conditionsList()]
+    assert sorted(onchain, key=lambda condition: condition.id) == sorted(configured, key=lambda condition: condition.id)
+
+    # Changed conditions are replaced in place and removed ones deleted last
+    changed = dataclasses.replace(configured[1], method_name="other")
+    batches = []
+    plan = sync_conditions(allowlist, [changed] + configured[2:], owner, on_batch=lambda action, ids, receipt: batches.append((action, ids)))
+    assert plan.updates == [changed] and plan.removes == [configured[0].id]
+    assert batches == [("add", [changed.id]), ("delete", [configured[0].id])]
+    assert Condition.from_tuple(allowlist.conditionById(changed.id)) == changed
+
+##############################################################
+# Deployment journal
+##############################################################
+
+# Description: Journaled steps that no longer hold on chain are forgotten
+def test_verify_journal(tmp_path, allowlist, allowlist_registry, owner, origin_name, vaults_implementation, contract_at):
+    journal = DeploymentJournal.for_network("development", 1, str(tmp_path))
+    journal.record("registration", allowlist=str(allowlist.address))
+    journal.record(implementation_step("IMPLEMENTATION_YEARN_VAULTS"), address=str(vaults_implementation.address), set=True)
+    journal.record(implementation_step("IMPLEMENTATION_IRON_BANK"), address=str(vaults_implementation.address), set=True)
+    # Deployed but not set: only steps whose address still has code hold
+    journal.record(implementation_step("IMPLEMENTATION_VEYFI"), address=str(accounts[1]), set=False)
+    journal.record(implementation_step("IMPLEMENTATION_PARTNER_TRACKER"), address=str(vaults_implementation.address), set=False)
+    # Same number of conditions, other contents
+    onchain = [Condition.from_tuple(condition) for condition in allowlist.conditionsList()]
+    journal.record("conditions", digest=conditions_digest(onchain + [Condition("STALE", "", "", (), ())]), count=len(onchain))
+
+    stale = verify_journal(journal, allowlist_registry, origin_name, contract_at)
+    assert sorted(stale) == ["conditions", "implementation:IMPLEMENTATION_IRON_BANK", "implementation:IMPLEMENTATION_VEYFI"]
+    assert sorted(journal.steps) == [
+        "implementation:IMPLEMENTATION_PARTNER_TRACKER", "implementation:IMPLEMENTATION_YEARN_VAULTS", "registration",
+    ]
+    journal.record("conditions", digest=conditions_digest(onchain), count=len(onchain))
+    assert verify_journal(journal, allowlist_registry, origin_name, contract_at) == []
+
+##############################################################
+# Batch validation
+##############################################################
+
+# Description: Batched off-chain validation agrees with the allowlist, in one aggregated call
+def test_validate_many(allowlist_registry, allowlist, owner, origin_name, condition_by_id, vaults_implementation, vaults, MulticallMock, contract_at):
+    for id in ("VAULT_DEPOST", "TOKEN_APPROVE_VAULT"):
+        if allowlist.conditionById(id)[0] == "":
+            allowlist.addCondition(condition_by_id(id), {"from": owner})
+    onchain = [Condition.from_tuple(condition) for condition in allowlist.conditionsList()]
+    implementation_addresses = {
+        condition.implementation_id: str(allowlist.implementationById(condition.implementation_id))
+        for condition in onchain
+    }
+    multicall = MulticallMock.deploy({"from": accounts[0]})
+    requests = []
+    def eth_call(to_address, calldata):
+        requests.append(calldata)
+        return brownie_eth_call(to_address, calldata)
+    validator = Validator(onchain, MulticallBackend(eth_call, multicall.address, implementation_addresses))
+
+    transactions = []
+    for vault in vaults:
+        vault_token = contract_at(vault.token())
+        transactions.append((vault_token.address, vault_token.approve.encode_input(vault, MAX_UINT256)))
+        transactions.append((vault.address, vault.deposit.encode_input(MAX_UINT256)))
+        transactions.append((vault_token.address, vault_token.approve.encode_input(ZERO_ADDRESS, MAX_UINT256)))
+    results = validator.validate_many(transactions)
+    assert len(requests) == 1
+    assert results == [
+        allowlist_registry.validateCalldataByOrigin(origin_name, target, data) for target, data in transactions
+    ]
+    assert results.count(True) >= 2 * len(vaults)
+
+##############################################################
+# Simulators
+##############################################################
+
+# Description: Simulators answer every requirement like the deployed implementations
+def test_simulator_differential(owner, mocks, allowlist, chain_config, vaults, markets, vaults_implementation, iron_bank_implementation, contract_at):
+    vaults_implementation.setIsZapInContract(mocks.zap_in, True, {"from": owner})
+    vaults_implementation.setIsMigratorContract(mocks.migrator, True, {"from": owner})
+    for implementation in (vaults_implementation, iron_bank_implementation):
+        mocks.contracts[implementation.address.lower()] = implementation
+    snapshot = export_snapshot(
+        chain.id, allowlist, ["IMPLEMENTATION_YEARN_VAULTS", "IMPLEMENTATION_IRON_BANK"], contract_at, chain.height,
+        candidates=chain_config.addresses.values(), batch_size=7,
+    )
+    state = snapshot["implementations"]["IMPLEMENTATION_YEARN_VAULTS"]["state"]
+    assert sum(len(vault_addresses) for vault_addresses in state["vaults_by_token"].values()) == len(vaults)
+    assert state["zap_in_contracts"] == [mocks.zap_in.address.lower()]
+    state = snapshot["implementations"]["IMPLEMENTATION_IRON_BANK"]["state"]
+    assert len(state["listed_markets"]) == len(markets)
+
+    reference = EthCallBackend(brownie_eth_call, {
+        "IMPLEMENTATION_YEARN_VAULTS": vaults_implementation.address,
+        "IMPLEMENTATION_IRON_BANK": iron_bank_implementation.address,
+    })
+    backend = DifferentialBackend(snapshot_backend(snapshot), reference)
+
+    addresses = [ZERO_ADDRESS, mocks.comptroller.address, mocks.zap_in.address, mocks.migrator.address]
+    addresses += [vault.address for vault in vaults[:3]] + [vault.token() for vault in vaults[:3]]
+    addresses += [market.address for market in markets[:3]] + [market.underlying() for market in markets[:3]]
+    calls = [
+        RequirementCall(implementation_id, method_name, "address", encode_word("address", address))
+        for implementation_id, methods in [
+            ("IMPLEMENTATION_YEARN_VAULTS", ["isVault", "isVaultUnderlyingToken", "isZapInContract", "isZapOutContract", "isMigratorContract"]),
+            ("IMPLEMENTATION_IRON_BANK", ["isMarket", "isComptroller", "isMarketUnderlyingToken"]),
+        ]
+        for method_name in methods
+        for address in addresses
+    ]
+    market_lists = [[market.address for market in markets], [markets[0].address, ZERO_ADDRESS], []]
+    calls += [
+        RequirementCall("IMPLEMENTATION_IRON_BANK", "areMarkets", "address[]", encode_word("uint256", 32) + encode_tail("address[]", market_list))
+        for market_list in market_lists
+    ]
+    backend.check_many(calls)
+    assert backend.mismatches == []
+
+# Description: Registry and setter logs keep an exported snapshot in step with the contracts
+def test_log_index(owner, mocks, allowlist, vaults, markets, vaults_implementation, iron_bank_implementation, contract_at):
+    for implementation in (vaults_implementation, iron_bank_implementation):
+        mocks.contracts[implementation.address.lower()] = implementation
+    implementation_ids = ["IMPLEMENTATION_YEARN_VAULTS", "IMPLEMENTATION_IRON_BANK"]
+    snapshot = export_snapshot(chain.id, allowlist, implementation_ids, contract_at, chain.height, candidates=[mocks.zap_in])
+    indexer = LogIndexer(snapshot, brownie_request)
+
+    new_vault = mocks.add_vault()
+    new_market = mocks.add_market()
+    vaults_implementation.setIsZapInContract(mocks.zap_in, False, {"from": owner})
+    vaults_implementation.setIsZapOutContract(mocks.zap_out, True, {"from": owner})
+    update = indexer.poll()
+    assert update.block == chain.height
+    assert {(delta.key, delta.address, delta.added) for delta in update.applied} >= {
+        ("vaults_by_token", new_vault.address.lower(), True),
+        ("listed_markets", new_market.address.lower(), True),
+        ("underlying_tokens", new_market.underlying().lower(), True),
+        ("zap_out_contracts", mocks.zap_out.address.lower(), True),
+    }
+
+    reference = EthCallBackend(brownie_eth_call, {
+        "IMPLEMENTATION_YEARN_VAULTS": vaults_implementation.address,
+        "IMPLEMENTATION_IRON_BANK": iron_bank_implementation.address,
+    })
+    backend = DifferentialBackend(SimulatorBackend(indexer.simulators), reference)
+    addresses = [mocks.zap_in.address, mocks.zap_out.address, new_vault.address, new_vault.token(), new_market.address, new_market.underlying()]
+    backend.check_many([
+        RequirementCall(implementation_id, method_name, "address", encode_word("address", address))
+        for implementation_id, methods in [
+            ("IMPLEMENTATION_YEARN_VAULTS", ["isVault", "isVaultUnderlyingToken", "isZapInContract", "isZapOutContract"]),
+            ("IMPLEMENTATION_IRON_BANK", ["isMarket", "isMarketUnderlyingToken"]),
+        ]
+        for method_name in methods
+        for address in addresses
+    ])
+    assert backend.mismatches == []
@@ -0,0 +1,145 @@
+import pytest
+from yearn_allowlist import MulticallBackend, RequirementCall, StaticBackend, Validator, load_conditions
+from yearn_allowlist.abi import WORD_SIZE, encode_call, encode_tail, encode_word, function_selector
+from yearn_allowlist.backends import ProviderError
+from yearn_allowlist.multicall import TRY_AGGREGATE_SELECTOR, decode_try_aggregate, encode_try_aggregate, encode_words_with_offsets
+
+MAX_UINT256 = 2**256-1
+ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
+
+multicall_address = "0x5ba1e12693dc8f9c48aad8770482f4739beed696"
+implementation_address = "0x4894d98442f5bea884cd6fa958954f73f58ae9b0"
+vault_address = "0x5c0a86a32c129538d62c106eb8115a8b02358d57"
+other_vault_address = "0xa258c4606ca8206d8aa700ce2143d7db854d168c"
+vault_token_address = "0x6b175474e89094c44da98b954eedeac495271d0f"
+
+def read_uint(data, offset):
+    return int.from_bytes(data[offset:offset + WORD_SIZE], "big")
+
+def encode_results(results):
+    encoded_results = [
+        encode_word("bool", success) + (2 * WORD_SIZE).to_bytes(WORD_SIZE, "big") + encode_tail("bytes", return_data)
+        for success, return_data in results
+    ]
+    return WORD_SIZE.to_bytes(WORD_SIZE, "big") + encode_words_with_offsets(encoded_results)
+
+class LocalMulticall:
+    """Stand-in for Multicall2.tryAggregate answering requirement calls from a StaticBackend"""
+    def __init__(self, backend, selectors):
+        self.backend = backend
+        self.selectors = selectors  # Requirement selector to (method_name, param_type)
+        self.requests = []
+
+    def __call__(self, to_address, calldata):
+        assert to_address == multicall_address
+        assert calldata[:4] == TRY_AGGREGATE_SELECTOR
+        self.requests.append(calldata)
+        args = calldata[4:]
+        array_offset = read_uint(args, WORD_SIZE)
+        length = read_uint(args, array_offset)
+        results = []
+        for idx in range(length):
+            element_offset = array_offset + WORD_SIZE + read_uint(args, array_offset + WORD_SIZE * (idx + 1))
+            target = "0x" + args[element_offset + 12:element_offset + WORD_SIZE].hex()
+            data_offset = element_offset + read_uint(args, element_offset + WORD_SIZE)
+            data = args[data_offset + WORD_SIZE:data_offset + WORD_SIZE + read_uint(args, data_offset)]
+            if target != implementation_address or data[:4] not in self.selectors:
+                results.append((False, b""))
+                continue
+            method_name, param_type = self.selectors[data[:4]]
+            call = RequirementCall("IMPLEMENTATION_YEARN_VAULTS", method_name, param_type, data[4:])
+            results.append((True, encode_word("bool", self.backend.check(call))))
+        return encode_results(results)
+
+@pytest.fixture
+def local_multicall():
+    backend = StaticBackend({
+        ("IMPLEMENTATION_YEARN_VAULTS", "isVault"): {vault_address, other_vault_address},
+        ("IMPLEMENTATION_YEARN_VAULTS", "isVaultUnderlyingToken"): {vault_token_address},
+    })
+    selectors = {
+        function_selector("isVault", ["address"]): ("isVault", "address"),
+        function_selector("isVaultUnderlyingToken", ["address"]): ("isVaultUnderlyingToken", "address"),
+    }
+    return LocalMulticall(backend, selectors)
+
+@pytest.fixture
+def validator(local_multicall):
+    backend = MulticallBackend(local_multicall, multicall_address, {"IMPLEMENTATION_YEARN_VAULTS": implementation_address})
+    return Validator(load_conditions(1), backend)
+
+##############################################################
+# Encoding
+##############################################################
+
+def test_try_aggregate_round_trip():
+    calldata = encode_try_aggregate([(vault_address, b"\x01\x02"), (vault_token_address, b"")])
+    assert calldata[:4].hex() == "bce38bd7"
+    assert len(calldata[4:]) % WORD_SIZE == 0
+    results = [(True, encode_word("bool", True)), (False, b"revert")]
+    assert decode_try_aggregate(encode_results(results)) == results
+
+##############################################################
+# Batch validation
+##############################################################
+
+# Description: Approve + deposit pairs against the same vaults take one aggregated call
+def test_validate_many(validator, local_multicall):
+    approve = lambda vault: encode_call("approve", ["address", "uint256"], [vault, MAX_UINT256])
+    deposit = encode_call("deposit", ["uint256"], [MAX_UINT256])
+    transactions = [
+        (vault_token_address, approve(vault_address)),
+        (vault_address, deposit),
+        (vault_token_address, approve(other_vault_address)),
+        (other_vault_address, deposit),
+        (vault_token_address, approve(ZERO_ADDRESS)),
+        (ZERO_ADDRESS, deposit),
+        (vault_address, b"\x00"),
+    ]
+    assert validator.validate_many(transactions) == [True, True, True, True, False, False, False]
+    assert len(local_multicall.requests) == 1
+
+    # Same answers as one transaction at a time
+    assert [validator.validate(target, data) for target, data in transactions] == validator.validate_many(transactions)
+
+# Description: Duplicate requirement calls are only sent once, large batches are split
+def test_check_many_deduplicates(local_multicall):
+    backend = MulticallBackend(local_multicall, multicall_address, {"IMPLEMENTATION_YEARN_VAULTS": implementation_address}, batch_size=2)
+    calls = [
+        RequirementCall("IMPLEMENTATION_YEARN_VAULTS", "isVault", "address", encode_word("address", address))
+        for address in [vault_address, vault_address, ZERO_ADDRESS, other_vault_address, vault_address]
+    ]
+    unknown_implementation_call = RequirementCall("IMPLEMENTATION_IRON_BANK", "isMarket", "address", encode_word("address", vault_address))
+    assert backend.check_many(calls + [unknown_implementation_call]) == [True, True, False, True, True, False]
+    assert len(local_multicall.requests) == 2
+
+# Description: Malformed aggregate responses fail every call in the batch
+def test_malformed_response():
+    backend = MulticallBackend(lambda to_address, calldata: b"\x00", multicall_address, {"IMPLEMENTATION_YEARN_VAULTS": implementation_address})
+    call = RequirementCall("IMPLEMENTATION_YEARN_VAULTS", "isVault", "address", encode_word("address", vault_address))
+    assert backend.check_many([call, call]) == [False, False]
+
+# Description: A failed aggregated call falls back to one eth_call per requirement
+def test_failed_aggregate_falls_back():
+    requests = []
+    def eth_call(to_address, calldata):
+        requests.append(to_address)
+        if to_address == multicall_address:
+            raise ValueError("execution reverted: out of gas")
+        return encode_word("bool", calldata[4:] == encode_word("address", vault_address))
+    backend = MulticallBackend(eth_call, multicall_address, {"IMPLEMENTATION_YEARN_VAULTS": implementation_address})
+    calls = [
+        RequirementCall("IMPLEMENTATION_YEARN_VAULTS", "isVault", "address", encode_word("address", address))
+        for address in [vault_address, other_vault_address]
+    ]
+    assert backend.check_many(calls) == [True, False]
+    assert requests == [multicall_address, implementation_address, implementation_address]
+
+# Description: Provider failures propagate instead of failing the batch or falling back
+def test_provider_failure_propagates():
+    def eth_call(to_address, calldata):
+        raise ProviderError("rate limit exceeded")
+    backend = MulticallBackend(eth_call, multicall_address, {"IMPLEMENTATION_YEARN_VAULTS": implementation_address})
+    call = RequirementCall("IMPLEMENTATION_YEARN_VAULTS", "isVault", "address", encode_word("address", vault_address))
+    with pytest.raises(ProviderError):
+        backend.check_many([call])
@@ -1,5 +1,7 @@
 import pytest
-from brownie import Contract, chain
+from brownie import chain
+
+pytestmark = pytest.mark.fork_only
 
 MAX_UINT256 = 2**256-1
 
@@ -8,17 +10,17 @@ random_address = "0x83C8F28c26bF6aaca652Df1DbBE0e1b56F8baBa2"
 vault_address = "0x5c0A86A32c129538D62C106Eb8115a8b02358d57"
 partner_id_address = "0x3CE37278de6388532C3949ce4e886F365B14fB56"
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def implementation_id():
     return "IMPLEMENTATION_PARTNER_TRACKER"
 
-@pytest.fixture
-def partner_tracker():
-    return Contract(partner_tracker_address)
+@pytest.fixture(scope="module")
+def partner_tracker(contract_at):
+    return contract_at(partner_tracker_address)
 
-@pytest.fixture(autouse=True)
-def implementation(owner, AllowlistImplementationPartnerTracker, allowlist_addresses, allowlist, implementation_id):
-    address_provider = Contract(allowlist_addresses["addresses_provider_address"])
+@pytest.fixture(scope="module", autouse=True)
+def implementation(owner, AllowlistImplementationPartnerTracker, allowlist_addresses, allowlist, implementation_id, contract_at):
+    address_provider = contract_at(allowlist_addresses["addresses_provider_address"])
     _implementation = AllowlistImplementationPartnerTracker.deploy(address_provider, {"from": owner})
 
     allowlist.setImplementation(implementation_id, _implementation, {"from": owner})
@@ -33,8 +35,6 @@ def test_is_vault(implementation):
     assert implementation.isVault(vault_address)
 
 def test_deposit(allowlist, owner, partner_tracker, origin_name, allowlist_registry, implementation_id):
-    chain.snapshot()
-
     encoded_data = partner_tracker.deposit.encode_input(vault_address, partner_id_address)
     allowed = allowlist_registry.validateCalldataByOrigin(origin_name, partner_tracker.address, encoded_data)
     assert allowed == False
@@ -55,11 +55,7 @@ def test_deposit(allowlist, owner, partner_tracker, origin_name, allowlist_regis
     allowed = allowlist_registry.validateCalldataByOrigin(origin_name, partner_tracker.address, encoded_data)
     assert allowed
 
-    chain.revert()
-
 def test_deposit_with_amount(allowlist, owner, partner_tracker, origin_name, allowlist_registry, implementation_id):
-    chain.snapshot()
-
     encoded_data = partner_tracker.deposit.encode_input(vault_address, partner_id_address, MAX_UINT256)
     allowed = allowlist_registry.validateCalldataByOrigin(origin_name, partner_tracker.address, encoded_data)
     assert allowed == False
@@ -80,11 +76,7 @@ def test_deposit_with_amount(allowlist, owner, partner_tracker, origin_name, all
     allowed = allowlist_registry.validateCalldataByOrigin(origin_name, partner_tracker.address, encoded_data)
     assert allowed
 
-    chain.revert()
-
-def test_invalid_deposits(allowlist, owner, partner_tracker, origin_name, allowlist_registry, implementation_id):
-    chain.snapshot()
-
+def test_invalid_deposits(allowlist, owner, partner_tracker, origin_name, allowlist_registry, implementation_id, contract_at):
     # Add condition
     condition = (
         "PARTNER_TRACKER_DEPOSIT",
@@ -104,8 +96,6 @@ def test_invalid_deposits(allowlist, owner, partner_tracker, origin_name, allowl
     assert allowed == False
 
     # target address is not the parter tracker
-    encoded_data = Contract(vault_address).deposit.encode_input(vault_address, partner_id_address)
+    encoded_data = contract_at(vault_address).deposit.encode_input(vault_address, partner_id_address)
     allowed = allowlist_registry.validateCalldataByOrigin(origin_name, partner_tracker.address, encoded_data)
-    assert allowed == False
-
-    chain.revert()
\ No newline at end of file
+    assert allowed == False
\ No newline at end of file
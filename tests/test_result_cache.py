@@ -0,0 +1,110 @@
+import pytest
+from yearn_allowlist import CachedBackend, RequirementCall, StaticBackend, Validator, load_conditions
+from yearn_allowlist.abi import encode_call, encode_word
+from yearn_allowlist.result_cache import ENTRY_OVERHEAD
+
+MAX_UINT256 = 2**256-1
+
+implementation_address = "0x4894D98442f5BeA884cD6fa958954F73f58AE9B0"
+vault_address = "0x5c0a86a32c129538d62c106eb8115a8b02358d57"
+vault_token_address = "0x6b175474e89094c44da98b954eedeac495271d0f"
+
+class CountingBackend(StaticBackend):
+    def __init__(self, answers):
+        super().__init__(answers)
+        self.calls = []
+
+    def check(self, call):
+        self.calls.append(call)
+        return super().check(call)
+
+class Clock:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def counting_backend():
+    return CountingBackend({
+        ("IMPLEMENTATION_YEARN_VAULTS", "isVault"): {vault_address},
+        ("IMPLEMENTATION_YEARN_VAULTS", "isVaultUnderlyingToken"): {vault_token_address},
+    })
+
+def is_vault(address):
+    return RequirementCall("IMPLEMENTATION_YEARN_VAULTS", "isVault", "address", encode_word("address", address))
+
+# Description: Repeated validations only reach the backend once per question
+def test_cached_validation(counting_backend):
+    backend = CachedBackend(counting_backend, {"IMPLEMENTATION_YEARN_VAULTS": implementation_address})
+    validator = Validator(load_conditions(1), backend)
+    data = encode_call("approve", ["address", "uint256"], [vault_address, MAX_UINT256])
+    assert validator.validate(vault_token_address, data) == True
+    lookups = len(counting_backend.calls)
+    for _ in range(99):
+        assert validator.validate(vault_token_address, data) == True
+    assert len(counting_backend.calls) == lookups
+    assert backend.stats.misses == lookups
+    assert backend.stats.hits == 99 * lookups
+    assert backend.stats.hit_rate == 0.99
+
+    # Batches share the cache and send duplicates once
+    assert backend.check_many([is_vault(vault_address), is_vault(vault_token_address), is_vault(vault_token_address)]) == [True, False, False]
+    assert len(counting_backend.calls) == lookups + 1
+
+# Description: A new block or an expired ttl drops cached answers
+def test_invalidation(counting_backend):
+    clock = Clock()
+    backend = CachedBackend(counting_backend, ttl=12, clock=clock)
+    backend.set_block(100)
+    assert backend.check(is_vault(vault_address)) == True
+    assert backend.check(is_vault(vault_address)) == True
+    assert len(counting_backend.calls) == 1
+
+    backend.set_block(100)
+    assert backend.check(is_vault(vault_address)) == True
+    assert len(counting_backend.calls) == 1
+    backend.set_block(101)
+    assert backend.check(is_vault(vault_address)) == True
+    assert len(counting_backend.calls) == 2
+    assert backend.stats.invalidations == 1
+
+    clock.now = 12
+    assert backend.check(is_vault(vault_address)) == True
+    assert len(counting_backend.calls) == 3
+
+# Description: Answers read while the block moved are returned but not cached
+def test_block_change_during_check(counting_backend):
+    backend = CachedBackend(counting_backend)
+    backend.set_block(100)
+    check = counting_backend.check
+    def check_across_blocks(call):
+        backend.set_block(101)
+        return check(call)
+    counting_backend.check = check_across_blocks
+    assert backend.check(is_vault(vault_address)) == True
+    assert backend.entries == {}
+
+    counting_backend.check = check
+    assert backend.check(is_vault(vault_address)) == True
+    assert len(counting_backend.calls) == 2 and len(backend.entries) == 1
+
+# Description: The least recently used answers are evicted past the memory budget
+def test_memory_bound(counting_backend):
+    backend = CachedBackend(counting_backend, max_bytes=3 * (ENTRY_OVERHEAD + 32))
+    addresses = ["0x" + "%040x" % idx for idx in range(4)]
+    for address in addresses[:3]:
+        backend.check(is_vault(address))
+    backend.check(is_vault(addresses[0]))
+    backend.check(is_vault(addresses[3]))
+    assert len(backend.entries) == 3
+    assert backend.size <= backend.max_bytes
+    assert backend.stats.evictions == 1
+
+    # addresses[1] was the least recently used
+    calls = len(counting_backend.calls)
+    backend.check(is_vault(addresses[0]))
+    assert len(counting_backend.calls) == calls
+    backend.check(is_vault(addresses[1]))
+    assert len(counting_backend.calls) == calls + 1
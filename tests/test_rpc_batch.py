@@ -0,0 +1,139 @@
+import json
+
+import pytest
+from yearn_allowlist import RequirementCall
+from yearn_allowlist.abi import encode_word
+from yearn_allowlist.backends import ProviderError
+from yearn_allowlist.result_cache import CachedBackend
+from yearn_allowlist.rpc_batch import BatchController, BatchEthCallBackend, RpcBatchTransport, RpcError
+
+implementation_address = "0x4894d98442f5bea884cd6fa958954f73f58ae9b0"
+vault_address = "0x5c0a86a32c129538d62c106eb8115a8b02358d57"
+
+class LocalProvider:
+    """Answers batches with `answer(request)`; `failures` lists what to do with the next batches"""
+    def __init__(self, answer, failures=()):
+        self.answer = answer
+        self.failures = list(failures)
+        self.batches = []
+
+    def __call__(self, payload):
+        batch = json.loads(payload)
+        self.batches.append([request["params"][0] for request in batch])
+        failure = self.failures.pop(0) if self.failures else None
+        if failure == "http":
+            raise OSError("HTTP Error 503")
+        if failure == "reject":
+            return {"jsonrpc": "2.0", "id": None, "error": {"code": -32600, "message": "batch too large"}}
+        if failure == "rate_limit":
+            # First half answered, second half rate limited
+            return [
+                self.answer(request) if idx < len(batch) // 2
+                else {"jsonrpc": "2.0", "id": request["id"], "error": {"code": -32005, "message": "rate limit exceeded"}}
+                for idx, request in enumerate(batch)
+            ]
+        if failure == "drop":
+            return [self.answer(request) for request in batch[1:]]
+        return [self.answer(request) for request in batch]
+
+def echo(request):
+    if request["params"][0] < 0:
+        return {"jsonrpc": "2.0", "id": request["id"], "error": {"code": 3, "message": "execution reverted"}}
+    return {"jsonrpc": "2.0", "id": request["id"], "result": request["params"][0] * 2}
+
+def calls(values):
+    return [("test_double", [value]) for value in values]
+
+##############################################################
+# Batching
+##############################################################
+
+def test_calls_are_batched():
+    provider = LocalProvider(echo)
+    transport = RpcBatchTransport(provider, BatchController(batch_size=4))
+    assert transport.call_many(calls(range(10))) == [value * 2 for value in range(10)]
+    assert [len(batch) for batch in provider.batches] == [4, 5, 1]
+    assert [timing.size for timing in transport.controller.timings] == [4, 5, 1]
+    assert transport.controller.batch_size == 6
+
+def test_errors_are_returned_in_place():
+    results = RpcBatchTransport(LocalProvider(echo)).call_many(calls([1, -1, 2]))
+    assert results[0] == 2 and results[2] == 4
+    assert isinstance(results[1], RpcError) and "execution reverted" in str(results[1])
+    with pytest.raises(RpcError):
+        RpcBatchTransport(LocalProvider(echo)).call("test_double", [-1])
+
+##############################################################
+# Adaptive sizing and retries
+##############################################################
+
+# Description: Rate limited calls are retried in a later batch, which is halved
+def test_partial_failures_are_retried():
+    provider = LocalProvider(echo, failures=["rate_limit"])
+    transport = RpcBatchTransport(provider, BatchController(batch_size=8))
+    assert transport.call_many(calls(range(8))) == [value * 2 for value in range(8)]
+    assert provider.batches == [list(range(8)), [4, 5, 6, 7]]
+    assert transport.controller.timings[0].retried == 4
+    assert transport.controller.batch_size == 5
+
+def test_missing_responses_are_retried():
+    provider = LocalProvider(echo, failures=["drop"])
+    transport = RpcBatchTransport(provider, BatchController(batch_size=4))
+    assert transport.call_many(calls(range(4))) == [0, 2, 4, 6]
+    assert provider.batches[1] == [0]
+
+def test_rejected_batches_shrink():
+    provider = LocalProvider(echo, failures=["reject", "http"])
+    transport = RpcBatchTransport(provider, BatchController(batch_size=8))
+    assert transport.call_many(calls(range(8))) == [value * 2 for value in range(8)]
+    assert [len(batch) for batch in provider.batches] == [8, 4, 2, 3, 3]
+    assert [timing.failed for timing in transport.controller.timings] == [True, True, False, False, False]
+
+def test_slow_batches_shrink():
+    clock = iter([0, 5, 5, 5.1]).__next__
+    transport = RpcBatchTransport(LocalProvider(echo), BatchController(batch_size=8, target_latency=1), clock)
+    transport.call_many(calls(range(8)))
+    assert transport.controller.batch_size == 6
+
+def test_retries_run_out():
+    provider = LocalProvider(echo, failures=["http"] * 4)
+    transport = RpcBatchTransport(provider, BatchController(max_retries=3))
+    with pytest.raises(ProviderError, match="503"):
+        transport.call_many(calls(range(3)))
+    assert len(provider.batches) == 4
+
+def test_final_errors_other_than_reverts():
+    def invalid(request):
+        return {"jsonrpc": "2.0", "id": request["id"], "error": {"code": -32602, "message": "invalid argument"}}
+    results = RpcBatchTransport(LocalProvider(invalid)).call_many(calls([1]))
+    assert isinstance(results[0], ProviderError) and not isinstance(results[0], RpcError)
+
+##############################################################
+# Backend
+##############################################################
+
+def test_batch_eth_call_backend():
+    def eth_call(request):
+        transaction, block = request["params"]
+        assert (transaction["to"], block) == (implementation_address, "latest")
+        passed = transaction["data"].endswith(vault_address[2:])
+        return {"jsonrpc": "2.0", "id": request["id"], "result": "0x" + encode_word("bool", passed).hex()}
+    provider = LocalProvider(eth_call)
+    backend = BatchEthCallBackend(RpcBatchTransport(provider), {"IMPLEMENTATION_YEARN_VAULTS": implementation_address})
+    checks = [
+        RequirementCall("IMPLEMENTATION_YEARN_VAULTS", "isVault", "address", encode_word("address", address))
+        for address in [vault_address, implementation_address, vault_address]
+    ] + [RequirementCall("IMPLEMENTATION_UNKNOWN", "isVault", "address", encode_word("address", vault_address))]
+    assert backend.check_many(checks) == [True, False, True, False]
+    assert [len(batch) for batch in provider.batches] == [2]
+
+# Description: Exhausted retries raise instead of failing the requirement, so nothing is cached
+def test_provider_failures_are_not_answers():
+    def eth_call(request):
+        return {"jsonrpc": "2.0", "id": request["id"], "result": "0x" + encode_word("bool", True).hex()}
+    provider = LocalProvider(eth_call, failures=["http"] * 4)
+    backend = CachedBackend(BatchEthCallBackend(RpcBatchTransport(provider, BatchController(max_retries=3)), {"IMPLEMENTATION_YEARN_VAULTS": implementation_address}))
+    check = RequirementCall("IMPLEMENTATION_YEARN_VAULTS", "isVault", "address", encode_word("address", vault_address))
+    with pytest.raises(ProviderError):
+        backend.check_many([check])
+    assert backend.check_many([check]) == [True]
@@ -0,0 +1,118 @@
+import json
+import threading
+import urllib.request
+import pytest
+from yearn_allowlist.rpc_cache import CacheMissError, ContentStore, RpcCache, handle_payload, make_server
+
+BLOCK = 15000000
+CHAIN_ID = 1
+
+class Upstream:
+    """Fake node recording the requests it receives"""
+    def __init__(self):
+        self.requests = []
+
+    def __call__(self, method, params):
+        self.requests.append((method, params))
+        if method == "eth_blockNumber":
+            return {"jsonrpc": "2.0", "result": hex(BLOCK)}
+        if method == "eth_chainId":
+            return {"jsonrpc": "2.0", "result": hex(CHAIN_ID)}
+        if method == "eth_getCode":
+            return {"jsonrpc": "2.0", "result": "0x6001"}
+        if method == "eth_sendRawTransaction":
+            return {"jsonrpc": "2.0", "result": "0x" + "00" * 32}
+        return {"jsonrpc": "2.0", "error": {"code": -32005, "message": "rate limited"}}
+
+def offline(method, params):
+    raise AssertionError("replay must not reach the network")
+
+##############################################################
+# Content store
+##############################################################
+
+# Description: Identical values are stored once and names resolve to them
+def test_content_store(tmp_path):
+    store = ContentStore(str(tmp_path))
+    assert store.put({"result": True}) == store.put({"result": True})
+    store.link(["a"], {"result": True})
+    store.link(["b"], {"result": True})
+    assert store.lookup(["a"]) == store.lookup(["b"]) == {"result": True}
+    assert len(list((tmp_path / "objects").rglob("*.json"))) == 1
+    with pytest.raises(CacheMissError):
+        store.lookup(["c"])
+
+##############################################################
+# Record/replay
+##############################################################
+
+# Description: Recorded responses replay at the pinned block without network access
+def test_record_replay(tmp_path):
+    store = ContentStore(str(tmp_path))
+    upstream = Upstream()
+    recorder = RpcCache(store, "record")
+    assert recorder.request("eth_getCode", ["0x01", "latest"], upstream)["result"] == "0x6001"
+    # "latest" is pinned to the upstream head before forwarding
+    assert upstream.requests[-1] == ("eth_getCode", ["0x01", hex(BLOCK)])
+    assert recorder.request("eth_blockNumber", [], upstream)["result"] == hex(BLOCK)
+
+    # Served from the cache the second time
+    request_count = len(upstream.requests)
+    recorder.request("eth_getCode", ["0x01", hex(BLOCK)], upstream)
+    assert len(upstream.requests) == request_count
+
+    replayer = RpcCache(store, "replay")
+    assert replayer.request("eth_getCode", ["0x01", "latest"], offline)["result"] == "0x6001"
+    assert replayer.request("eth_blockNumber", [], offline)["result"] == hex(BLOCK)
+    assert replayer.block == BLOCK and replayer.chain_id == CHAIN_ID
+    with pytest.raises(CacheMissError):
+        replayer.request("eth_getCode", ["0x02", "latest"], offline)
+    with pytest.raises(CacheMissError):
+        replayer.request("eth_sendRawTransaction", ["0x"], offline)
+
+# Description: Errors and non-cacheable methods are never stored
+def test_record_skips_errors(tmp_path):
+    store = ContentStore(str(tmp_path))
+    recorder = RpcCache(store, "record", block=BLOCK)
+    assert "error" in recorder.request("eth_getStorageAt", ["0x01", "0x0", "latest"], Upstream())
+    recorder.request("eth_sendRawTransaction", ["0x"], Upstream())
+    with pytest.raises(CacheMissError):
+        RpcCache(store, "replay").request("eth_getStorageAt", ["0x01", "0x0", "latest"], offline)
+
+##############################################################
+# Proxy
+##############################################################
+
+# Description: The proxy answers single and batched requests, and misses as JSON-RPC errors
+def test_proxy(tmp_path):
+    store = ContentStore(str(tmp_path))
+    RpcCache(store, "record").request("eth_getCode", ["0x01", "latest"], Upstream())
+    server = make_server(RpcCache(store, "replay"), offline, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        url = "http://127.0.0.1:" + str(server.server_address[1])
+        payload = [
+            {"jsonrpc": "2.0", "id": 1, "method": "eth_getCode", "params": ["0x01", "latest"]},
+            {"jsonrpc": "2.0", "id": 2, "method": "eth_getCode", "params": ["0x02", "latest"]},
+        ]
+        request = urllib.request.Request(url, data=json.dumps(payload).encode(), headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request) as response:
+            responses = json.load(response)
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert responses[0] == {"jsonrpc": "2.0", "id": 1, "result": "0x6001"}
+    assert responses[1]["id"] == 2 and "rpc cache miss" in responses[1]["error"]["message"]
+    assert handle_payload(RpcCache(store, "replay"), payload[0], offline)["result"] == "0x6001"
+
+# Description: Upstream failures while recording are answered as JSON-RPC errors
+def test_proxy_upstream_failure(tmp_path):
+    upstream = Upstream()
+    recorder = RpcCache(ContentStore(str(tmp_path)), "record")
+    recorder.request("eth_blockNumber", [], upstream)
+    def failing(method, params):
+        raise OSError("connection refused")
+    response = handle_payload(recorder, {"jsonrpc": "2.0", "id": 7, "method": "eth_getCode", "params": ["0x01", "latest"]}, failing)
+    assert response["id"] == 7 and "connection refused" in response["error"]["message"]
+    assert recorder.request("eth_getCode", ["0x01", "latest"], upstream)["result"] == "0x6001"
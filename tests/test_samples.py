@@ -0,0 +1,43 @@
+from yearn_allowlist import StaticBackend, Validator, load_conditions
+from yearn_allowlist.samples import condition_calldata, has_samples, invalid_condition_calldata, missing_samples
+
+vault_address = "0x5c0a86a32c129538d62c106eb8115a8b02358d57"
+token_address = "0x6b175474e89094c44da98b954eedeac495271d0f"
+market_address = "0x8e595470ed749b85c6f7669de83eae304c2ec68f"
+comptroller_address = "0xab1c342c7bf5ec5f02adea1c2270670bca144cbb"
+
+samples = {
+    "isVault": vault_address,
+    "isVaultUnderlyingToken": token_address,
+    "isMarket": market_address,
+    "isMarketUnderlyingToken": token_address,
+    "isComptroller": comptroller_address,
+}
+
+def sample_backend(conditions):
+    answers = {}
+    for condition in conditions:
+        for requirement in condition.requirements:
+            key = (condition.implementation_id, requirement.method_name)
+            if requirement.method_name == "areMarkets":
+                answers[key] = lambda markets: len(markets) > 0 and all(market == market_address for market in markets)
+            elif requirement.method_name in samples:
+                answers[key] = {samples[requirement.method_name]}
+    return StaticBackend(answers)
+
+# Description: Sample calldata passes its condition, each invalid variant fails it
+def test_sample_calldata():
+    conditions = load_conditions(250)
+    validator = Validator(conditions, sample_backend(conditions))
+    for condition in conditions:
+        assert has_samples(condition, samples)
+        target, data = condition_calldata(condition, samples)
+        assert validator.validate(target, data) == True
+        for requirement, target, data in invalid_condition_calldata(condition, samples):
+            assert validator.validate(target, data) == False
+
+def test_missing_samples():
+    conditions = {condition.id: condition for condition in load_conditions(1)}
+    assert has_samples(conditions["VAULT_DEPOST"], samples) == True
+    assert has_samples(conditions["TOKEN_APPROVE_ZAP"], samples) == False
+    assert missing_samples(conditions["TOKEN_APPROVE_ZAP"], samples) == ["isZapInContract"]
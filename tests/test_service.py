@@ -0,0 +1,364 @@
+import asyncio
+import json
+import threading
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from yearn_allowlist import RequirementCall, StaticBackend, load_chain_config
+from yearn_allowlist.abi import encode_call, encode_word, function_selector
+from yearn_allowlist.backends import ProviderError
+from yearn_allowlist.result_cache import result_key
+from yearn_allowlist.service import AsyncRpcClient, RpcError, ScreeningService
+from yearn_allowlist.warmup import WarmState
+
+MAX_UINT256 = 2**256-1
+ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
+
+allowlist_address = "0x1111111111111111111111111111111111111111"
+vault_implementation_address = "0x2222222222222222222222222222222222222222"
+iron_bank_implementation_address = "0x3333333333333333333333333333333333333333"
+vault_address = "0x5c0a86a32c129538d62c106eb8115a8b02358d57"
+vault_token_address = "0x6b175474e89094c44da98b954eedeac495271d0f"
+market_address = "0x8e595470ed749b85c6f7669de83eae304c2ec68f"
+comptroller_address = "0xab1c342c7bf5ec5f02adea1c2270670bca144cbb"
+
+implementations = {
+    "IMPLEMENTATION_YEARN_VAULTS": vault_implementation_address,
+    "IMPLEMENTATION_IRON_BANK": iron_bank_implementation_address,
+}
+
+class LocalNode:
+    """Stand-in for a node answering the registry, allowlist and implementation eth_calls"""
+    def __init__(self, backend):
+        self.backend = backend
+        self.registries = {load_chain_config(chain_id).allowlist_registry_address.lower() for chain_id in (1, 250)}
+        self.requirements = {}  # (implementation address, selector) to (implementation id, method, param type)
+        for chain_id in (1, 250):
+            for condition in load_chain_config(chain_id).conditions:
+                for requirement in condition.requirements:
+                    param_type = "address" if requirement.kind == "target" else condition.param_types[requirement.param_idx]
+                    key = (implementations.get(condition.implementation_id), function_selector(requirement.method_name, [param_type]))
+                    self.requirements[key] = (condition.implementation_id, requirement.method_name, param_type)
+        self.selectors = []
+        self.batches = []  # Size of each JSON-RPC batch received
+        self.block_number_released = threading.Event()
+        self.block_number_released.set()
+        self.block_number_failures = 0
+        self.errors = {}  # Selector to the JSON-RPC error, or "empty" for 0x return data
+
+    def eth_call(self, to_address, data):
+        self.selectors.append(data[:4])
+        selector, argument = data[:4], data[4:]
+        if to_address in self.registries and selector == function_selector("allowlistAddressByOriginName", ["string"]):
+            origin = argument[64:64 + int.from_bytes(argument[32:64], "big")].decode()
+            return encode_word("address", allowlist_address if origin == "yearn.finance" else ZERO_ADDRESS)
+        if to_address == allowlist_address and selector == function_selector("implementationById", ["string"]):
+            implementation_id = argument[64:64 + int.from_bytes(argument[32:64], "big")].decode()
+            return encode_word("address", implementations.get(implementation_id, ZERO_ADDRESS))
+        requirement = self.requirements.get((to_address, selector))
+        if requirement is None:
+            return None  # Revert
+        return encode_word("bool", self.backend.check(RequirementCall(*requirement, argument)))
+
+    def answer(self, request):
+        if request["method"] == "eth_blockNumber":
+            self.block_number_released.wait(10)
+            if self.block_number_failures:
+                self.block_number_failures -= 1
+                return {"jsonrpc": "2.0", "id": request["id"], "error": {"code": -32000, "message": "header not found"}}
+            return {"jsonrpc": "2.0", "id": request["id"], "result": hex(100)}
+        transaction, _ = request["params"]
+        error = self.errors.get(bytes.fromhex(transaction["data"][2:10]))
+        if error == "empty":
+            return {"jsonrpc": "2.0", "id": request["id"], "result": "0x"}
+        if error is not None:
+            return {"jsonrpc": "2.0", "id": request["id"], "error": error}
+        result = self.eth_call(transaction["to"].lower(), bytes.fromhex(transaction["data"][2:]))
+        if result is None:
+            return {"jsonrpc": "2.0", "id": request["id"], "error": {"code": 3, "message": "execution reverted"}}
+        return {"jsonrpc": "2.0", "id": request["id"], "result": "0x" + result.hex()}
+
+    def serve(self):
+        node = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                node.batches.append(len(payload))
+                body = json.dumps([node.answer(request) for request in payload]).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+@pytest.fixture
+def node():
+    node = LocalNode(StaticBackend({
+        ("IMPLEMENTATION_YEARN_VAULTS", "isVault"): {vault_address},
+        ("IMPLEMENTATION_YEARN_VAULTS", "isVaultUnderlyingToken"): {vault_token_address},
+        ("IMPLEMENTATION_IRON_BANK", "isComptroller"): {comptroller_address},
+        ("IMPLEMENTATION_IRON_BANK", "areMarkets"): lambda markets: all(market == market_address for market in markets),
+    }))
+    server = node.serve()
+    node.url = "http://127.0.0.1:" + str(server.server_address[1])
+    yield node
+    server.shutdown()
+
+def screen_request(chain_id, target, calldata, origin="yearn.finance"):
+    return {"chain_id": chain_id, "origin": origin, "target": target, "calldata": "0x" + calldata.hex()}
+
+def run_service(node, requests, warm_states=None, **options):
+    """
+    Start the service on a free port, send (path, body) requests over HTTP and
+    return (status, response) pairs; callables in `requests` are awaited with
+    the service instead
+    """
+    async def run():
+        service = ScreeningService(
+            {chain_id: AsyncRpcClient(node.url, max_connections=4) for chain_id in (1, 250)}, warm_states=warm_states,
+            **options
+        )
+        server = await service.start(port=0)
+        url = "http://127.0.0.1:" + str(server.sockets[0].getsockname()[1])
+        loop = asyncio.get_running_loop()
+        responses = []
+        for request in requests:
+            if callable(request):
+                await request(service)
+                continue
+            path, body = request
+            responses.append(await loop.run_in_executor(None, post, url + path, body))
+        server.close()
+        await server.wait_closed()
+        service.close()
+        return responses
+    return asyncio.run(run())
+
+def post(url, body):
+    data = body if isinstance(body, bytes) else json.dumps(body).encode() if body is not None else None
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, data=data)) as response:
+            return response.status, json.load(response)
+    except urllib.error.HTTPError as error:
+        return error.code, json.load(error)
+
+##############################################################
+# Screening
+##############################################################
+
+def test_screen(node):
+    approve_vault = encode_call("approve", ["address", "uint256"], [vault_address, MAX_UINT256])
+    approve_token = encode_call("approve", ["address", "uint256"], [vault_token_address, MAX_UINT256])
+    responses = run_service(node, [
+        ("/screen", screen_request(1, vault_token_address, approve_vault)),
+        ("/screen", screen_request(1, vault_token_address, approve_token)),
+    ])
+    assert responses == [
+        (200, {"allowed": True, "condition": "TOKEN_APPROVE_VAULT", "stale": False}),
+        (200, {"allowed": False, "condition": None, "stale": False}),
+    ]
+
+# Description: Batches span chains, and each (chain, origin) group is screened concurrently
+def test_screen_batch(node):
+    approve_vault = encode_call("approve", ["address", "uint256"], [vault_address, MAX_UINT256])
+    enter_markets = encode_call("enterMarkets", ["address[]"], [[market_address, market_address]])
+    enter_unknown = encode_call("enterMarkets", ["address[]"], [[market_address, ZERO_ADDRESS]])
+    requests = [
+        screen_request(250, comptroller_address, enter_markets),
+        screen_request(1, vault_token_address, approve_vault),
+        screen_request(250, comptroller_address, enter_unknown),
+        screen_request(1, vault_token_address, b"\x12\x34\x56\x78"),
+    ]
+    (status, response), = run_service(node, [("/screen/batch", {"requests": requests})])
+    assert status == 200
+    assert [result["allowed"] for result in response["results"]] == [True, True, False, False]
+    assert response["results"][0]["condition"] == "COMPTROLLER_ENTER_MARKETS"
+    assert len(node.batches) < len(node.selectors)
+
+def test_screen_errors(node):
+    approve_vault = encode_call("approve", ["address", "uint256"], [vault_address, MAX_UINT256])
+    responses = run_service(node, [
+        ("/screen", screen_request(1, vault_token_address, approve_vault, origin="unknown.finance")),
+        ("/screen", screen_request(10, vault_token_address, approve_vault)),
+        ("/screen", {"chain_id": 1, "origin": "yearn.finance", "target": "0x1234", "calldata": "0x"}),
+        ("/screen", b"{"),
+        ("/health", None),
+    ])
+    assert [status for status, _ in responses] == [404, 404, 400, 400, 200]
+    assert "Unknown origin" in responses[0][1]["error"]
+    health = responses[4][1]
+    assert (health["status"], health["chains"], health["origins"]) == ("ok", [1, 250], ["yearn.finance"])
+    assert set(health["rpc"]) == {"1", "250"}
+    assert health["rpc"]["1"]["batch_size"] > 0
+
+# Description: Only reverts and empty return data fail a requirement, other node failures are a 502
+def test_node_failures(node):
+    approve_vault = encode_call("approve", ["address", "uint256"], [vault_address, MAX_UINT256])
+    node.errors[function_selector("isVault", ["address"])] = {"code": -32005, "message": "rate limit exceeded"}
+    responses = run_service(node, [("/screen", screen_request(1, vault_token_address, approve_vault))])
+    assert responses[0][0] == 502 and "rate limit exceeded" in responses[0][1]["error"]
+    node.errors[function_selector("isVault", ["address"])] = "empty"
+    responses = run_service(node, [("/screen", screen_request(1, vault_token_address, approve_vault))])
+    assert responses == [(200, {"allowed": False, "condition": None, "stale": False})]
+
+# Description: An empty registry answer is a 502, unexpected errors a 500, and both are answered
+def test_unexpected_answers(node):
+    approve_vault = encode_call("approve", ["address", "uint256"], [vault_address, MAX_UINT256])
+    node.errors[function_selector("allowlistAddressByOriginName", ["string"])] = "empty"
+
+    async def broken(service):
+        async def screen_many(items):
+            raise KeyError("broken")
+        service.screen_many = screen_many
+
+    responses = run_service(node, [
+        ("/screen", screen_request(1, vault_token_address, approve_vault)),
+        broken,
+        ("/screen", screen_request(1, vault_token_address, approve_vault)),
+    ])
+    assert responses[0][0] == 502 and responses[0][1]["error"].startswith("RPC failure")
+    assert responses[1] == (500, {"error": "Internal error: 'broken'"})
+
+# Description: Implementation addresses are resolved once and reused across requests
+def test_implementations_resolved_once(node):
+    approve_vault = encode_call("approve", ["address", "uint256"], [vault_address, MAX_UINT256])
+    run_service(node, [("/screen", screen_request(1, vault_token_address, approve_vault))] * 3)
+    implementation_ids = {condition.implementation_id for condition in load_chain_config(1).conditions}
+    assert node.selectors.count(function_selector("allowlistAddressByOriginName", ["string"])) == 1
+    assert node.selectors.count(function_selector("implementationById", ["string"])) == len(implementation_ids)
+
+# Description: Warm answers are served flagged stale until revalidated at the current block
+def test_warm_start(node, tmp_path):
+    # The previous run saw the token itself answer isVault
+    is_vault = RequirementCall("IMPLEMENTATION_YEARN_VAULTS", "isVault", "address", encode_word("address", vault_token_address))
+    results = {result_key(is_vault, implementations): True}
+    state = WarmState(1, results, 90, implementation_addresses=implementations, directory=str(tmp_path))
+    approve_token = encode_call("approve", ["address", "uint256"], [vault_token_address, MAX_UINT256])
+    node.block_number_released.clear()
+
+    async def revalidated(service):
+        node.block_number_released.set()
+        await service.revalidations[(1, "yearn.finance")]
+
+    responses = run_service(node, [
+        ("/screen", screen_request(1, vault_token_address, approve_token)),
+        revalidated,
+        ("/screen", screen_request(1, vault_token_address, approve_token)),
+        ("/health", None),
+    ], warm_states={(1, "yearn.finance"): state})
+    assert responses[0] == (200, {"allowed": True, "condition": "TOKEN_APPROVE_VAULT", "stale": True})
+    assert responses[1] == (200, {"allowed": False, "condition": None, "stale": False})
+    assert responses[2][1]["warm"] == {"1/yearn.finance": {"stale": False, "block": 100, "changed": 1, "error": None}}
+
+    # Revalidated and live answers are persisted for the next start
+    restarted = WarmState.load(1, str(tmp_path), implementations)
+    assert restarted.block == 100 and restarted.stale
+    assert restarted.warm_answer(is_vault) == False
+
+# Description: Warm answers are dropped once every revalidation attempt failed
+def test_failed_revalidation(node, tmp_path):
+    is_vault = RequirementCall("IMPLEMENTATION_YEARN_VAULTS", "isVault", "address", encode_word("address", vault_token_address))
+    state = WarmState(1, {result_key(is_vault, implementations): True}, 90, implementation_addresses=implementations, directory=str(tmp_path))
+    approve_token = encode_call("approve", ["address", "uint256"], [vault_token_address, MAX_UINT256])
+    node.block_number_failures = 3
+
+    async def revalidated(service):
+        await service.revalidations[(1, "yearn.finance")]
+
+    responses = run_service(node, [
+        revalidated,
+        ("/screen", screen_request(1, vault_token_address, approve_token)),
+        ("/health", None),
+    ], warm_states={(1, "yearn.finance"): state}, revalidation_attempts=3, revalidation_backoff=0)
+    assert responses[0] == (200, {"allowed": False, "condition": None, "stale": False})
+    warm = responses[1][1]["warm"]["1/yearn.finance"]
+    assert warm["stale"] == False and "failed 3 times: eth_blockNumber: header not found" in warm["error"]
+
+# Description: Warm answers keyed by other implementations than the origin's are never served
+def test_warm_start_other_implementations(node, tmp_path):
+    is_vault = RequirementCall("IMPLEMENTATION_YEARN_VAULTS", "isVault", "address", encode_word("address", vault_token_address))
+    previous = dict(implementations, IMPLEMENTATION_YEARN_VAULTS="0x4444444444444444444444444444444444444444")
+    state = WarmState(1, {result_key(is_vault, previous): True}, 90, implementation_addresses=previous, directory=str(tmp_path))
+    approve_token = encode_call("approve", ["address", "uint256"], [vault_token_address, MAX_UINT256])
+    responses = run_service(node, [
+        ("/screen", screen_request(1, vault_token_address, approve_token)),
+        ("/health", None),
+    ], warm_states={(1, "yearn.finance"): state})
+    assert responses[0] == (200, {"allowed": False, "condition": None, "stale": False})
+    assert responses[1][1]["warm"]["1/yearn.finance"]["stale"] == False
+    assert state.observed == {}
+
+# Description: Identical eth_calls in flight together share one request to the node
+def test_coalesced_eth_calls(node):
+    calldata = encode_call("isVault", ["address"], [vault_address])
+    async def run():
+        client = AsyncRpcClient(node.url, max_connections=4)
+        results = await asyncio.gather(*[client.eth_call(vault_implementation_address, calldata) for _ in range(20)])
+        client.close()
+        return client, results
+    client, results = asyncio.run(run())
+    assert results == [encode_word("bool", True)] * 20
+    assert node.selectors == [function_selector("isVault", ["address"])]
+    assert (client.flights.stats.calls, client.flights.stats.coalesced) == (1, 19)
+
+# Description: A node closing the connection mid-response fails every waiter instead of leaving it hanging
+def test_connection_closed_mid_response():
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers["Content-Length"]))
+            self.send_response(200)
+            self.send_header("Content-Length", "100")
+            self.end_headers()
+            self.wfile.write(b"[{")
+            self.close_connection = True
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    calldata = encode_call("isVault", ["address"], [vault_address])
+    async def run():
+        client = AsyncRpcClient("http://127.0.0.1:" + str(server.server_address[1]), max_connections=2)
+        results = await asyncio.wait_for(asyncio.gather(
+            client.eth_call(vault_implementation_address, calldata),
+            client.eth_call(vault_implementation_address, calldata),
+            client.request("eth_blockNumber", []),
+            return_exceptions=True,
+        ), 10)
+        client.close()
+        return results
+    try:
+        results = asyncio.run(run())
+    finally:
+        server.shutdown()
+    assert all(isinstance(result, ProviderError) and isinstance(result.__cause__, ConnectionError) for result in results)
+
+# Description: Concurrent requests are sent to the node as JSON-RPC batches
+def test_batched_requests(node):
+    async def run():
+        client = AsyncRpcClient(node.url, max_connections=4)
+        results = await asyncio.gather(*[
+            client.eth_call(vault_implementation_address, encode_call(method_name, ["address"], [vault_address]))
+            for method_name in ("isVault", "isVaultUnderlyingToken", "isGauge")
+        ], return_exceptions=True)
+        client.close()
+        return results
+    is_vault, is_token, is_gauge = asyncio.run(run())
+    assert (is_vault, is_token) == (encode_word("bool", True), encode_word("bool", False))
+    assert isinstance(is_gauge, RpcError) and "execution reverted" in str(is_gauge)
+    assert node.batches == [3]
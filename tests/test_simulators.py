@@ -0,0 +1,111 @@
+import pytest
+from yearn_allowlist import DifferentialBackend, RequirementCall, SimulatorBackend, StaticBackend, Validator, load_conditions, simulators_from_snapshot
+from yearn_allowlist.abi import encode_call, encode_word
+from yearn_allowlist.simulators import SimulationMismatch
+
+MAX_UINT256 = 2**256-1
+ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
+
+vault_address = "0x5c0a86a32c129538d62c106eb8115a8b02358d57"
+vault_token_address = "0x6b175474e89094c44da98b954eedeac495271d0f"
+zap_in_address = "0x8e52522e6a77578904ddd7f528a22521dc4154f5"
+market_address = "0x8e595470ed749b85c6f7669de83eae304c2ec68f"
+comptroller_address = "0xab1c342c7bf5ec5f02adea1c2270670bca144cbb"
+ve_yfi_address = "0x90c1f9220d90d3966fbee24045edd73e1d588ad5"
+partner_tracker_address = "0x8ee392a4787397126C163Cb9844d7c447da419D8"
+space_id = "0x" + "7665796669".ljust(64, "0")
+
+snapshot = {
+    "IMPLEMENTATION_YEARN_VAULTS": {
+        "contract": "AllowlistImplementationYearnVaults",
+        "state": {
+            "vaults_by_token": {vault_token_address: [vault_address]},
+            "zap_in_contracts": [zap_in_address.upper().replace("0X", "0x")],
+        },
+    },
+    "IMPLEMENTATION_IRON_BANK": {
+        "contract": "AllowlistImplementationIronBank",
+        "state": {"comptroller": comptroller_address, "listed_markets": [market_address]},
+    },
+    "IMPLEMENTATION_VEYFI": {
+        "contract": "AllowlistImplementationVeYFI",
+        "state": {"voting_escrow": ve_yfi_address, "ve_yfi_id": space_id},
+    },
+    "IMPLEMENTATION_PARTNER_TRACKER": {
+        "contract": "AllowlistImplementationPartnerTracker",
+        "state": {"vaults_by_token": {vault_token_address: [vault_address]}},
+    },
+    "IMPLEMENTATION_YEARN_YVE_CRV": {"contract": "AllowlistImplementationYveCRV"},
+}
+
+@pytest.fixture
+def validator():
+    return Validator(load_conditions(1), SimulatorBackend(simulators_from_snapshot(snapshot)))
+
+def call(implementation_id, method_name, param_type, value):
+    if param_type.endswith("[]"):
+        argument = encode_word("uint256", 32) + encode_word("uint256", len(value)) + b"".join(encode_word("address", item) for item in value)
+    else:
+        argument = encode_word(param_type, value)
+    return RequirementCall(implementation_id, method_name, param_type, argument)
+
+##############################################################
+# Simulated requirements
+##############################################################
+
+def test_simulated_requirements():
+    backend = SimulatorBackend(simulators_from_snapshot(snapshot))
+    assert backend.check(call("IMPLEMENTATION_YEARN_VAULTS", "isVault", "address", vault_address)) == True
+    assert backend.check(call("IMPLEMENTATION_YEARN_VAULTS", "isVault", "address", vault_token_address)) == False
+    assert backend.check(call("IMPLEMENTATION_YEARN_VAULTS", "isVaultUnderlyingToken", "address", vault_token_address)) == True
+    assert backend.check(call("IMPLEMENTATION_YEARN_VAULTS", "isZapInContract", "address", zap_in_address)) == True
+    assert backend.check(call("IMPLEMENTATION_IRON_BANK", "areMarkets", "address[]", [market_address, market_address])) == True
+    assert backend.check(call("IMPLEMENTATION_IRON_BANK", "areMarkets", "address[]", [market_address, ZERO_ADDRESS])) == False
+    assert backend.check(call("IMPLEMENTATION_IRON_BANK", "areMarkets", "address[]", [])) == True
+    assert backend.check(call("IMPLEMENTATION_VEYFI", "isVeYfiSpaceId", "bytes32", space_id)) == True
+    assert backend.check(call("IMPLEMENTATION_VEYFI", "isVotingEscrow", "address", ve_yfi_address)) == True
+    assert backend.check(call("IMPLEMENTATION_YEARN_YVE_CRV", "isCRV", "address", "0xD533a949740bb3306d119CC777fa900bA034cd52")) == True
+
+    # Scalars missing from the snapshot match nothing, not the zero address
+    assert backend.check(call("IMPLEMENTATION_VEYFI", "isRewardPool", "address", ZERO_ADDRESS)) == False
+    assert backend.check(call("IMPLEMENTATION_VEYFI", "isUnderlying", "address", ZERO_ADDRESS)) == False
+
+    # Unknown methods and implementations behave like reverts
+    assert backend.check(call("IMPLEMENTATION_YEARN_VAULTS", "isGauge", "address", vault_address)) == False
+    assert backend.check(call("IMPLEMENTATION_UNKNOWN", "isVault", "address", vault_address)) == False
+
+def test_unknown_contract():
+    with pytest.raises(ValueError, match="No simulator"):
+        simulators_from_snapshot({"IMPLEMENTATION_YEARN_VAULTS": {"contract": "Unknown"}})
+
+# Description: Validation runs entirely on snapshot data
+def test_simulated_validation(validator):
+    data = encode_call("approve", ["address", "uint256"], [vault_address, MAX_UINT256])
+    assert validator.validate(vault_token_address, data) == True
+    data = encode_call("approve", ["address", "uint256"], [zap_in_address, MAX_UINT256])
+    assert validator.matching_condition(vault_token_address, data).id == "TOKEN_APPROVE_ZAP"
+    data = encode_call("deposit", ["address", "address"], [vault_address, ZERO_ADDRESS])
+    assert validator.validate(partner_tracker_address, data) == True
+    assert validator.validate(vault_address, data) == False
+
+    # Iron Bank conditions are configured on Fantom
+    validator = Validator(load_conditions(250), validator.backend)
+    data = encode_call("enterMarkets", ["address[]"], [[market_address]])
+    assert validator.validate(comptroller_address, data) == True
+    data = encode_call("enterMarkets", ["address[]"], [[market_address, ZERO_ADDRESS]])
+    assert validator.validate(comptroller_address, data) == False
+
+##############################################################
+# Differential mode
+##############################################################
+
+def test_differential_backend():
+    reference = StaticBackend({("IMPLEMENTATION_YEARN_VAULTS", "isVault"): {vault_address, vault_token_address}})
+    backend = DifferentialBackend(SimulatorBackend(simulators_from_snapshot(snapshot)), reference)
+    calls = [call("IMPLEMENTATION_YEARN_VAULTS", "isVault", "address", address) for address in [vault_address, vault_token_address]]
+    assert backend.check_many(calls) == [True, True]
+    assert backend.mismatches == [(calls[1], False, True)]
+
+    backend.strict = True
+    with pytest.raises(SimulationMismatch, match="isVault"):
+        backend.check(calls[1])
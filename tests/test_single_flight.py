@@ -0,0 +1,57 @@
+import asyncio
+
+from yearn_allowlist.single_flight import SingleFlight
+
+class Lookup:
+    """Counts calls and blocks them until released"""
+    def __init__(self):
+        self.calls = 0
+        self.release = None
+
+    async def __call__(self, value):
+        self.calls += 1
+        await self.release.wait()
+        if isinstance(value, Exception):
+            raise value
+        return value
+
+def run_concurrently(flights, lookup, keys_and_values, cancel=()):
+    async def run():
+        lookup.release = asyncio.Event()
+        tasks = [
+            asyncio.ensure_future(flights.run(key, lambda value=value: lookup(value)))
+            for key, value in keys_and_values
+        ]
+        await asyncio.sleep(0)
+        for idx in cancel:
+            tasks[idx].cancel()
+        await asyncio.sleep(0)
+        lookup.release.set()
+        return await asyncio.gather(*tasks, return_exceptions=True)
+    return asyncio.run(run())
+
+def test_identical_keys_share_one_call():
+    flights = SingleFlight()
+    lookup = Lookup()
+    results = run_concurrently(flights, lookup, [("a", 1)] * 10 + [("b", 2)])
+    assert results == [1] * 10 + [2]
+    assert lookup.calls == 2
+    assert (flights.stats.calls, flights.stats.coalesced) == (2, 9)
+    assert len(flights) == 0
+
+    # Finished calls are not reused
+    assert run_concurrently(flights, lookup, [("a", 3)]) == [3]
+    assert lookup.calls == 3
+
+def test_errors_fan_out():
+    error = ValueError("execution reverted")
+    results = run_concurrently(SingleFlight(), Lookup(), [("a", error)] * 3)
+    assert results == [error] * 3
+
+# Description: A cancelled waiter leaves the shared call running for the others
+def test_cancelled_waiter():
+    lookup = Lookup()
+    results = run_concurrently(SingleFlight(), lookup, [("a", 1)] * 3, cancel=[0])
+    assert isinstance(results[0], asyncio.CancelledError)
+    assert results[1:] == [1, 1]
+    assert lookup.calls == 1
@@ -0,0 +1,44 @@
+import pytest
+from yearn_allowlist import RequirementCall, Validator, load_conditions
+from yearn_allowlist.abi import encode_call, encode_word
+from yearn_allowlist.snapshot import SNAPSHOT_VERSION, SnapshotError, load_snapshot, snapshot_backend, snapshot_path, write_snapshot
+
+MAX_UINT256 = 2**256-1
+
+vault_address = "0x5c0a86a32c129538d62c106eb8115a8b02358d57"
+vault_token_address = "0x6b175474e89094c44da98b954eedeac495271d0f"
+
+snapshot = {
+    "version": SNAPSHOT_VERSION,
+    "chain_id": 1,
+    "block": 15000000,
+    "implementations": {
+        "IMPLEMENTATION_YEARN_VAULTS": {
+            "contract": "AllowlistImplementationYearnVaults",
+            "address": "0x4894d98442f5bea884cd6fa958954f73f58ae9b0",
+            "state": {"registered_tokens": [vault_token_address], "vaults_by_token": {vault_token_address: [vault_address]}},
+        },
+    },
+}
+
+# Description: Snapshots round trip through the versioned file format
+def test_snapshot_file(tmp_path):
+    path = snapshot_path(1, str(tmp_path))
+    write_snapshot(path, snapshot)
+    assert load_snapshot(path, 1) == snapshot
+    with pytest.raises(SnapshotError, match="chain 1"):
+        load_snapshot(path, 250)
+
+    write_snapshot(path, dict(snapshot, version=SNAPSHOT_VERSION + 1))
+    with pytest.raises(SnapshotError, match="version"):
+        load_snapshot(path)
+    with pytest.raises(SnapshotError, match="Cannot read"):
+        load_snapshot(str(tmp_path / "missing.json"))
+
+# Description: A loaded snapshot validates calldata without RPC
+def test_snapshot_backend():
+    validator = Validator(load_conditions(1), snapshot_backend(snapshot))
+    data = encode_call("approve", ["address", "uint256"], [vault_address, MAX_UINT256])
+    assert validator.validate(vault_token_address, data) == True
+    call = RequirementCall("IMPLEMENTATION_YEARN_VAULTS", "isVaultUnderlyingToken", "address", encode_word("address", vault_token_address))
+    assert validator.backend.check(call) == True
@@ -0,0 +1,194 @@
+import pytest
+from yearn_allowlist import EthCallBackend, StaticBackend, Validator, load_conditions
+from yearn_allowlist.abi import array_parameter, decode_address, encode_call, encode_word, function_selector
+
+MAX_UINT256 = 2**256-1
+ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
+
+vault_address = "0x5c0a86a32c129538d62c106eb8115a8b02358d57"
+vault_token_address = "0x6b175474e89094c44da98b954eedeac495271d0f"
+zap_in_address = "0x8e52522e6a77578904ddd7f528a22521dc4154f5"
+market_address = "0x8e595470ed749b85c6f7669de83eae304c2ec68f"
+comptroller_address = "0xab1c342c7bf5ec5f02adea1c2270670bca144cbb"
+
+@pytest.fixture
+def backend():
+    return StaticBackend({
+        ("IMPLEMENTATION_YEARN_VAULTS", "isVault"): {vault_address},
+        ("IMPLEMENTATION_YEARN_VAULTS", "isVaultUnderlyingToken"): {vault_token_address},
+        ("IMPLEMENTATION_YEARN_VAULTS", "isZapInContract"): {zap_in_address},
+        ("IMPLEMENTATION_IRON_BANK", "isMarket"): {market_address},
+        ("IMPLEMENTATION_IRON_BANK", "isComptroller"): {comptroller_address},
+        ("IMPLEMENTATION_IRON_BANK", "areMarkets"): lambda markets: all(market == market_address for market in markets),
+    })
+
+@pytest.fixture
+def validator(backend):
+    return Validator(load_conditions(1), backend)
+
+##############################################################
+# Conditions
+##############################################################
+
+def test_condition_selectors():
+    conditions = {condition.id: condition for condition in load_conditions(1)}
+    assert conditions["TOKEN_APPROVE_VAULT"].selector.hex() == "095ea7b3"
+    assert conditions["VAULT_DEPOST"].selector.hex() == "b6b55f25"
+    assert conditions["VAULT_DEPOST"].signature == "deposit(uint256)"
+    assert conditions["MIGRATE_VAULT_TRICRYPTO"].signature == "migrate_to_new_vault()"
+
+def test_condition_round_trip():
+    for condition in load_conditions(250):
+        id, implementation_id, method_name, param_types, requirements = condition.to_tuple()
+        assert id == condition.id
+        assert all(requirement[0] in ("target", "param") for requirement in requirements)
+
+##############################################################
+# Validation
+##############################################################
+
+# Description: Normal vault token approval
+# Signature: "token.approve(address,uint256)"
+def test_token_approval_for_vault(validator):
+    data = encode_call("approve", ["address", "uint256"], [vault_address, MAX_UINT256])
+    assert validator.validate(vault_token_address, data) == True
+    assert validator.matching_condition(vault_token_address, data).id == "TOKEN_APPROVE_VAULT"
+
+    # Invalid param
+    data = encode_call("approve", ["address", "uint256"], [ZERO_ADDRESS, MAX_UINT256])
+    assert validator.validate(vault_token_address, data) == False
+
+    # Invalid target
+    data = encode_call("approve", ["address", "uint256"], [vault_address, MAX_UINT256])
+    assert validator.validate(ZERO_ADDRESS, data) == False
+
+    # Hex string calldata is accepted too
+    assert validator.validate(vault_token_address, "0x" + data.hex()) == True
+
+# Description: Token approval for a zap, matched by the second approve condition
+def test_token_approval_for_zap(validator):
+    data = encode_call("approve", ["address", "uint256"], [zap_in_address, MAX_UINT256])
+    assert validator.matching_condition(vault_token_address, data).id == "TOKEN_APPROVE_ZAP"
+
+def test_vault_deposit(validator):
+    data = encode_call("deposit", ["uint256"], [MAX_UINT256])
+    assert validator.validate(vault_address, data) == True
+    assert validator.validate(vault_token_address, data) == False
+
+def test_unknown_method(validator):
+    data = encode_call("decimals", [], [])
+    assert validator.validate(vault_token_address, data) == False
+    assert validator.validate(vault_token_address, b"") == False
+
+def test_truncated_calldata(validator):
+    data = encode_call("approve", ["address", "uint256"], [vault_address, MAX_UINT256])
+    assert validator.validate(vault_token_address, data[:20]) == False
+
+# Description: Address words with non-zero upper bytes fail like the Solidity ABI decoder
+def test_dirty_address_word(validator):
+    data = bytearray(encode_call("approve", ["address", "uint256"], [vault_address, MAX_UINT256]))
+    data[4] = 1
+    assert validator.validate(vault_token_address, bytes(data)) == False
+    assert validator.validate_many([(vault_token_address, bytes(data))]) == [False]
+
+# Description: Param 2 of ZapIn must be a vault
+def test_zap_in_to_vault(validator):
+    param_types = ["address", "uint256", "address", "address", "bool", "uint256", "address", "address", "bytes", "address", "address"]
+    values = [ZERO_ADDRESS, MAX_UINT256, vault_address, ZERO_ADDRESS, False, MAX_UINT256, ZERO_ADDRESS, ZERO_ADDRESS, b"\x00", ZERO_ADDRESS, ZERO_ADDRESS]
+    data = encode_call("ZapIn", param_types, values)
+    assert validator.validate(zap_in_address, data) == True
+    values[2] = ZERO_ADDRESS
+    data = encode_call("ZapIn", param_types, values)
+    assert validator.validate(zap_in_address, data) == False
+
+# Description: Dynamic address[] params are forwarded with their offset and tail
+def test_enter_markets():
+    validator = Validator(load_conditions(250), StaticBackend({
+        ("IMPLEMENTATION_IRON_BANK", "isComptroller"): {comptroller_address},
+        ("IMPLEMENTATION_IRON_BANK", "areMarkets"): lambda markets: len(markets) > 0 and all(market == market_address for market in markets),
+    }))
+    data = encode_call("enterMarkets", ["address[]"], [[market_address, market_address]])
+    assert validator.validate(comptroller_address, data) == True
+    data = encode_call("enterMarkets", ["address[]"], [[market_address, ZERO_ADDRESS]])
+    assert validator.validate(comptroller_address, data) == False
+
+# Description: Collection answers for array params match arrays with the same elements
+def test_enter_markets_collection_answer():
+    validator = Validator(load_conditions(250), StaticBackend({
+        ("IMPLEMENTATION_IRON_BANK", "isComptroller"): {comptroller_address},
+        ("IMPLEMENTATION_IRON_BANK", "areMarkets"): {(market_address, market_address)},
+    }))
+    data = encode_call("enterMarkets", ["address[]"], [[market_address, market_address]])
+    assert validator.validate(comptroller_address, data) == True
+    data = encode_call("enterMarkets", ["address[]"], [[market_address]])
+    assert validator.validate(comptroller_address, data) == False
+
+# Description: Collection answers are compared with the lazy view without decoding all of it
+def test_collection_answer_stays_lazy():
+    decoded = []
+    def decode_element(word):
+        decoded.append(word)
+        return decode_address(word)
+    backend = StaticBackend({("IMPLEMENTATION_IRON_BANK", "areMarkets"): {(comptroller_address, market_address)}})
+    data = encode_call("enterMarkets", ["address[]"], [[market_address, market_address]])
+    assert backend.check_array("IMPLEMENTATION_IRON_BANK", "areMarkets", array_parameter(data, ["address[]"], 0, decode_element)) == False
+    assert len(decoded) == 1
+    decoded.clear()
+    data = encode_call("enterMarkets", ["address[]"], [[market_address] * 3])
+    assert backend.check_array("IMPLEMENTATION_IRON_BANK", "areMarkets", array_parameter(data, ["address[]"], 0, decode_element)) == False
+    assert decoded == []
+
+# Description: Array params are read in place and stop at the first failing element
+def test_lazy_array_decoding():
+    seen = []
+    def are_markets(markets):
+        for market in markets:
+            seen.append(market)
+            if market != market_address:
+                return False
+        return True
+    validator = Validator(load_conditions(250), StaticBackend({
+        ("IMPLEMENTATION_IRON_BANK", "isComptroller"): {comptroller_address},
+        ("IMPLEMENTATION_IRON_BANK", "areMarkets"): are_markets,
+    }))
+    data = encode_call("enterMarkets", ["address[]"], [[market_address] * 1000])
+    assert validator.validate(comptroller_address, data) == True
+    assert len(seen) == 1000
+
+    # A huge declared length with a bad first element fails without reading further
+    seen.clear()
+    data = encode_call("enterMarkets", ["address[]"], [[ZERO_ADDRESS, market_address]])
+    data = data[:4 + 32] + encode_word("uint256", 2**64) + data[4 + 64:]
+    assert validator.validate(comptroller_address, data) == False
+    assert seen == [ZERO_ADDRESS]
+
+    # Elements past the end of the calldata fail like the ABI decoder
+    seen.clear()
+    data = encode_call("enterMarkets", ["address[]"], [[market_address, market_address]])[:-32]
+    assert validator.validate(comptroller_address, data) == False
+    assert seen == [market_address]
+
+##############################################################
+# Backends
+##############################################################
+
+def test_eth_call_backend():
+    implementation_address = "0x4894d98442f5bea884cd6fa958954f73f58ae9b0"
+    calls = []
+    def eth_call(to_address, calldata):
+        calls.append((to_address, calldata))
+        allowed = calldata[-20:].hex() == vault_address[2:]
+        return encode_word("bool", allowed)
+
+    backend = EthCallBackend(eth_call, {"IMPLEMENTATION_YEARN_VAULTS": implementation_address})
+    validator = Validator(load_conditions(1), backend)
+    data = encode_call("deposit", ["uint256"], [1])
+    assert validator.validate(vault_address, data) == True
+    assert calls[0][0] == implementation_address
+    assert calls[0][1][:4] == function_selector("isVault", ["address"])
+
+    # Reverts count as failed requirements
+    def reverting_eth_call(to_address, calldata):
+        raise ValueError("execution reverted")
+    validator = Validator(load_conditions(1), EthCallBackend(reverting_eth_call, {"IMPLEMENTATION_YEARN_VAULTS": implementation_address}))
+    assert validator.validate(vault_address, data) == False
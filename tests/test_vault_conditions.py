@@ -1,41 +1,83 @@
 import pytest
-from brownie import Contract, ZERO_ADDRESS, chain, convert
+from brownie import ZERO_ADDRESS, accounts, chain, convert
 
 MAX_UINT256 = 2**256-1
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def implementation_id():
     return "IMPLEMENTATION_YEARN_VAULTS"
 
-@pytest.fixture(autouse=True)
-def implementation(owner, AllowlistImplementationYearnVaults, allowlist_addresses, allowlist_registry, allowlist, implementation_id):
+@pytest.fixture(scope="module", autouse=True)
+def implementation(owner, AllowlistImplementationYearnVaults, allowlist_addresses, allowlist_registry, allowlist, implementation_id, contract_at, address_provider):
     use_live_contract = True
 
     _implementation = None
     if use_live_contract:
         key = "implementation_yearn_vaults_address"
         if key in allowlist_addresses:
-            _implementation = Contract(allowlist_addresses[key])
+            _implementation = contract_at(allowlist_addresses[key])
     if _implementation == None:
-        address_provider = Contract(allowlist_addresses["addresses_provider_address"])
         _implementation = AllowlistImplementationYearnVaults.deploy(address_provider, allowlist_registry, {"from": owner})
 
     allowlist.setImplementation(implementation_id, _implementation, {"from": owner})
     return _implementation
 
-@pytest.fixture
-def registry_adapter(allowlist_addresses):
-    address_provider = Contract(allowlist_addresses["addresses_provider_address"])
-    return Contract(address_provider.addressById("REGISTRY_ADAPTER_V2_VAULTS"))
+@pytest.fixture(scope="module")
+def registry_adapter(address_provider, contract_at):
+    return contract_at(address_provider.addressById("REGISTRY_ADAPTER_V2_VAULTS"))
 
-@pytest.fixture
-def vault(registry_adapter):
-    registry = Contract(registry_adapter.registryAddress())
-    return Contract(registry.releases(0))
+@pytest.fixture(scope="module")
+def vault(registry_adapter, contract_at):
+    registry = contract_at(registry_adapter.registryAddress())
+    return contract_at(registry.releases(0))
 
-@pytest.fixture
-def vault_token(vault):
-    return Contract(vault.token())
+@pytest.fixture(scope="module")
+def vault_token(vault, contract_at):
+    return contract_at(vault.token())
+
+##############################################################
+# Vault cache
+##############################################################
+
+# Description: Vaults synced from the registry are answered from the cache
+def test_vault_cache(owner, AllowlistImplementationYearnVaults, allowlist_addresses, allowlist_registry, registry_adapter, vault, vault_token, contract_at, address_provider):
+    implementation = AllowlistImplementationYearnVaults.deploy(address_provider, allowlist_registry, {"from": owner})
+    registry = contract_at(registry_adapter.registryAddress())
+
+    # Cache misses fall back to the registry
+    assert implementation.isCachedVault(vault) == False
+    assert implementation.isVault(vault) == True
+    assert implementation.isVault(ZERO_ADDRESS) == False
+
+    # Syncing is permissionless
+    implementation.syncVaults(vault_token, {"from": accounts[0]})
+    assert implementation.isCachedVault(vault) == True
+    assert implementation.syncedVaultsLength(vault_token) == registry.numVaults(vault_token)
+    assert implementation.isVault(vault) == True
+
+    # Syncing again is a no-op
+    implementation.syncVaultsForTokens([vault_token], {"from": accounts[0]})
+    assert implementation.syncedVaultsLength(vault_token) == registry.numVaults(vault_token)
+
+# Description: Vaults cached from a replaced registry are no longer answered from the cache
+def test_vault_cache_registry_change(owner, AllowlistImplementationYearnVaults, AddressesProviderMock, V2RegistryMock, RegistryAdapterV2Mock, allowlist_registry, registry_adapter, vault, vault_token):
+    tx = {"from": accounts[0]}
+    addresses_provider = AddressesProviderMock.deploy(tx)
+    addresses_provider.setAddress("REGISTRY_ADAPTER_V2_VAULTS", registry_adapter, tx)
+    implementation = AllowlistImplementationYearnVaults.deploy(addresses_provider, allowlist_registry, {"from": owner})
+    implementation.syncVaults(vault_token, tx)
+    assert implementation.isCachedVault(vault) == True
+
+    # The new registry does not list the vault and is synced from its first index
+    new_registry = V2RegistryMock.deploy(tx)
+    addresses_provider.setAddress("REGISTRY_ADAPTER_V2_VAULTS", RegistryAdapterV2Mock.deploy(new_registry, tx), tx)
+    assert implementation.isCachedVault(vault) == False
+    assert implementation.syncedVaultsLength(vault_token) == 0
+    assert implementation.isVault(vault) == False
+    new_registry.newVault(vault, tx)
+    implementation.syncVaults(vault_token, tx)
+    assert implementation.isCachedVault(vault) == True
+    assert implementation.syncedVaultsLength(vault_token) == 1
 
 ##############################################################
 # Target: Tokens
@@ -48,7 +90,6 @@ def vault_token(vault):
 # Target: Must be a valid vault token
 # Param 0: Must be a valid vault address
 def test_token_approval_for_vault(allowlist_registry, allowlist, owner, origin_name, implementation_id, vault, vault_token):
-    chain.snapshot()
     # Add condition
     condition = (
         "TOKEN_APPROVE_VAULT",
@@ -81,7 +122,6 @@ def test_token_approval_for_vault(allowlist_registry, allowlist, owner, origin_n
     data = vault_token.decimals.encode_input()
     allowed = allowlist_registry.validateCalldataByOrigin(origin_name, vault_token, data)
     assert allowed == False
-    chain.revert()
 
 # Description: Token approvals for vault zaps
 # Signature: "token.approve(address,uint256)"
@@ -90,15 +130,14 @@ def test_token_approval_for_vault(allowlist_registry, allowlist, owner, origin_n
 #   - zap_in_yearn_address: "0x92Be6ADB6a12Da0CA607F9d87DB2F9978cD6ec3E"
 #   - zap_in_pickle_address: "0xc695f73c1862e050059367B2E64489E66c525983"
 #   - another address on the custom 
-def test_token_approval_for_zap(allowlist_registry, allowlist, owner, allowlist_addresses, origin_name, implementation_id, vault_token, implementation):
-    chain.snapshot()
+def test_token_approval_for_zap(allowlist_registry, allowlist, owner, allowlist_addresses, origin_name, implementation_id, vault_token, implementation, contract_at):
     # This test is not supported on all networks
     test_supported = "zap_in_to_vault_address" in allowlist_addresses
     if (chain.id == 1):
         assert test_supported == True
     if (test_supported == False):
         return
-    zap_in_contract = Contract(allowlist_addresses["zap_in_to_vault_address"])
+    zap_in_contract = contract_at(allowlist_addresses["zap_in_to_vault_address"])
 
     # Add condition
     condition = (
@@ -127,8 +166,6 @@ def test_token_approval_for_zap(allowlist_registry, allowlist, owner, allowlist_
     allowed = allowlist_registry.validateCalldataByOrigin(origin_name, vault_token, data)
     assert allowed == True
 
-    chain.revert()
-
 ##############################################################
 # Target: Vaults
 ##############################################################
@@ -139,7 +176,6 @@ def test_token_approval_for_zap(allowlist_registry, allowlist, owner, allowlist_
 # Signature: "vault.deposit(uint256)"
 # Target: Must be a valid vault address
 def test_vault_deposit(allowlist_registry, allowlist, owner, origin_name, implementation_id, vault):
-    chain.snapshot()
     # Test deposit before adding condition - vault.deposit(amount)
     data = vault.deposit.encode_input(MAX_UINT256)
     allowed = allowlist_registry.validateCalldataByOrigin(origin_name, vault, data)
@@ -161,14 +197,12 @@ def test_vault_deposit(allowlist_registry, allowlist, owner, origin_name, implem
     data = vault.deposit.encode_input(MAX_UINT256)
     allowed = allowlist_registry.validateCalldataByOrigin(origin_name, vault, data)
     assert allowed == True
-    chain.revert()
     
 # Vault withdrawals
 
 # Signature: "vault.withdraw(uint256)"
 # Target: Must be a valid vault address
 def test_vault_withdraw(allowlist_registry, allowlist, owner, origin_name, implementation_id, vault):
-    chain.snapshot()
     # Test withdraw before adding condition - vault.withdraw(amount)
     data = vault.withdraw.encode_input(MAX_UINT256)
     allowed = allowlist_registry.validateCalldataByOrigin(origin_name, vault, data)
@@ -190,7 +224,6 @@ def test_vault_withdraw(allowlist_registry, allowlist, owner, origin_name, imple
     data = vault.withdraw.encode_input(MAX_UINT256)
     allowed = allowlist_registry.validateCalldataByOrigin(origin_name, vault, data)
     assert allowed == True
-    chain.revert()
 
 # Vault approvals
 
@@ -202,8 +235,7 @@ def test_vault_withdraw(allowlist_registry, allowlist, owner, origin_name, imple
 #   - Migrator contract(s)?
 #     - trustedVaultMigrator: "0x1824df8D751704FA10FA371d62A37f9B8772ab90"
 #     - triCryptoVaultMigrator: "0xC306a5ef4B990A7F2b3bC2680E022E6a84D75fC1"
-def test_vault_zap_out_approval(allowlist_registry, allowlist, owner, origin_name, implementation, implementation_id, vault, vault_token, allowlist_addresses):
-    chain.snapshot()
+def test_vault_zap_out_approval(allowlist_registry, allowlist, owner, origin_name, implementation, implementation_id, vault, vault_token, allowlist_addresses, contract_at):
     # Zap out approvals
     zap_out_of_vault_address = "zap_out_of_vault_address"
     test_supported = zap_out_of_vault_address in allowlist_addresses
@@ -211,7 +243,7 @@ def test_vault_zap_out_approval(allowlist_registry, allowlist, owner, origin_nam
         assert test_supported == True
 
     if test_supported:
-        zap_out_contract = Contract(allowlist_addresses[zap_out_of_vault_address])
+        zap_out_contract = contract_at(allowlist_addresses[zap_out_of_vault_address])
 
         # Zap out condition
         condition = (
@@ -251,8 +283,6 @@ def test_vault_zap_out_approval(allowlist_registry, allowlist, owner, origin_nam
     test_supported = migrator_address_standard in allowlist_addresses
     if (chain.id == 1):
         assert test_supported == True
-    
-    chain.revert()
 
 # Description: Vault zap out approval
 # Signature: "vault.approve(address,uint256)"
@@ -261,7 +291,6 @@ def test_vault_zap_out_approval(allowlist_registry, allowlist, owner, origin_nam
 #   - trustedVaultMigrator: "0x1824df8D751704FA10FA371d62A37f9B8772ab90"
 #   - triCryptoVaultMigrator: "0xC306a5ef4B990A7F2b3bC2680E022E6a84D75fC1"
 def test_vault_migrator_approval(allowlist_registry, allowlist, owner, origin_name, implementation, implementation_id, vault, vault_token, allowlist_addresses):
-    chain.snapshot()
     # Vault migrator approvals
     migrator_address_standard = "migrator_address_standard"
     test_supported = migrator_address_standard in allowlist_addresses
@@ -304,8 +333,6 @@ def test_vault_migrator_approval(allowlist_registry, allowlist, owner, origin_na
         data = vault.approve.encode_input(not_migrator, MAX_UINT256)
         allowed = allowlist_registry.validateCalldataByOrigin(origin_name, vault, data)
         assert allowed == False
-    
-    chain.revert()
 
 
 ##############################################################
@@ -319,14 +346,13 @@ def test_vault_migrator_approval(allowlist_registry, allowlist, owner, origin_na
 # Target 0: Must be a valid zap in contract (mainnet):
 #   - zap_in_yearn_address: "0x92Be6ADB6a12Da0CA607F9d87DB2F9978cD6ec3E"
 # Param 2: Must be a valid vault address
-def test_zap_in_to_vault(allowlist_registry, allowlist, owner, origin_name, implementation, implementation_id, vault, allowlist_addresses):
-    chain.snapshot()
+def test_zap_in_to_vault(allowlist_registry, allowlist, owner, origin_name, implementation, implementation_id, vault, allowlist_addresses, contract_at):
     # This test is not supported on all networks
     zap_in_to_vault_address = "zap_in_to_vault_address"
     test_supported = zap_in_to_vault_address in allowlist_addresses
     if (test_supported == False):
         return
-    zap_in_contract = Contract(allowlist_addresses[zap_in_to_vault_address])
+    zap_in_contract = contract_at(allowlist_addresses[zap_in_to_vault_address])
 
     # Set isZapInContract in implementation
     assert implementation.isZapInContract(zap_in_contract) == False
@@ -387,8 +413,6 @@ def test_zap_in_to_vault(allowlist_registry, allowlist, owner, origin_name, impl
     allowed = allowlist_registry.validateCalldataByOrigin(origin_name, zap_in_contract, data)
     assert allowed == False
 
-    chain.revert()
-
 # Standard zap out
 
 # Description: Zapping out of a yVault
@@ -396,8 +420,7 @@ def test_zap_in_to_vault(allowlist_registry, allowlist, owner, origin_name, impl
 # Target 0: Must be a valid zap out contract (mainnet):
 #   - zap_out_yearn_address: "0xd6b88257e91e4E4D4E990B3A858c849EF2DFdE8c"
 # Param 0: Must be a valid vault address
-def test_zap_out_of_vault(allowlist_registry, allowlist, owner, origin_name, implementation, implementation_id, vault, allowlist_addresses):
-    chain.snapshot()
+def test_zap_out_of_vault(allowlist_registry, allowlist, owner, origin_name, implementation, implementation_id, vault, allowlist_addresses, contract_at):
     # This test is not supported on all networks
     zap_out_of_vault_address = "zap_out_of_vault_address"
     test_supported = zap_out_of_vault_address in allowlist_addresses
@@ -405,7 +428,7 @@ def test_zap_out_of_vault(allowlist_registry, allowlist, owner, origin_name, imp
         assert test_supported == True
     if (test_supported == False):
         return
-    zap_out_contract = Contract(allowlist_addresses[zap_out_of_vault_address])
+    zap_out_contract = contract_at(allowlist_addresses[zap_out_of_vault_address])
 
     # Set isZapOutContract in implementation
     assert implementation.isZapOutContract(zap_out_contract) == False
@@ -464,16 +487,13 @@ def test_zap_out_of_vault(allowlist_registry, allowlist, owner, origin_name, imp
     allowed = allowlist_registry.validateCalldataByOrigin(origin_name, zap_out_contract, data)
     assert allowed == False
 
-    chain.revert()
-
 
 # Description: Zapping out of a yVault with a permit (signing instead of approving)
 # Signature: "zapOutContract.ZapOutWithPermit(address,uint256,address,bool,uint256,bytes,address,bytes,address,bool)"
 # Target 0: Must be a valid zap out contract (mainnet):
 #   - zap_out_yearn_address: "0xd6b88257e91e4E4D4E990B3A858c849EF2DFdE8c"
 # Param 0: Must be a valid vault address
-def test_zap_out_of_vault_with_permit(allowlist_registry, allowlist, owner, origin_name, implementation, implementation_id, vault, allowlist_addresses):
-    chain.snapshot()
+def test_zap_out_of_vault_with_permit(allowlist_registry, allowlist, owner, origin_name, implementation, implementation_id, vault, allowlist_addresses, contract_at):
     # This test is not supported on all networks
     zap_out_of_vault_address = "zap_out_of_vault_address"
     test_supported = zap_out_of_vault_address in allowlist_addresses
@@ -481,7 +501,7 @@ def test_zap_out_of_vault_with_permit(allowlist_registry, allowlist, owner, orig
         assert test_supported == True
     if (test_supported == False):
         return
-    zap_out_contract = Contract(allowlist_addresses[zap_out_of_vault_address])
+    zap_out_contract = contract_at(allowlist_addresses[zap_out_of_vault_address])
 
     # Set isZapOutContract in implementation
     assert implementation.isZapOutContract(zap_out_contract) == False
@@ -542,8 +562,6 @@ def test_zap_out_of_vault_with_permit(allowlist_registry, allowlist, owner, orig
     allowed = allowlist_registry.validateCalldataByOrigin(origin_name, zap_out_contract, data)
     assert allowed == False
 
-    chain.revert()
-
 # Pickle zap in
 
 # Description: Zapping into a pickle vault
@@ -551,8 +569,7 @@ def test_zap_out_of_vault_with_permit(allowlist_registry, allowlist, owner, orig
 # Target 0: Must be a valid zap in contract (mainnet):
 #   - zap_in_pickle_address: "0xc695f73c1862e050059367B2E64489E66c525983"
 # Param 2: Must be the yvBOOST/ETH SLP pickle jar
-def test_zap_in_to_pickle_jar(allowlist_registry, allowlist, owner, origin_name, implementation, implementation_id, vault, allowlist_addresses):
-    chain.snapshot()
+def test_zap_in_to_pickle_jar(allowlist_registry, allowlist, owner, origin_name, implementation, implementation_id, vault, allowlist_addresses, contract_at):
     # This test is not supported on all networks
     zap_in_to_pickle_address = "zap_in_to_pickle_address"
     pickle_jar_address = "pickle_jar_address"
@@ -561,8 +578,8 @@ def test_zap_in_to_pickle_jar(allowlist_registry, allowlist, owner, origin_name,
         assert test_supported == True
     if (test_supported == False):
         return
-    zap_in_contract = Contract(allowlist_addresses[zap_in_to_pickle_address])
-    pickle_jar_contract = Contract(allowlist_addresses[pickle_jar_address])
+    zap_in_contract = contract_at(allowlist_addresses[zap_in_to_pickle_address])
+    pickle_jar_contract = contract_at(allowlist_addresses[pickle_jar_address])
 
     # Set isZapInContract for implementation
     assert implementation.isZapInContract(zap_in_contract) == False
@@ -625,8 +642,6 @@ def test_zap_in_to_pickle_jar(allowlist_registry, allowlist, owner, origin_name,
     allowed = allowlist_registry.validateCalldataByOrigin(origin_name, zap_in_contract, data)
     assert allowed == False
 
-    chain.revert()
-
 ##############################################################
 # Target: Migrators
 ##############################################################
@@ -636,10 +651,9 @@ def test_zap_in_to_pickle_jar(allowlist_registry, allowlist, owner, origin_name,
 # Description: Migrate tricrypto
 # Signature: "tricrypto_migrator.migrate_to_new_vault()"
 # Target: Must be valid migrator
-def test_migrate_tricrypto(allowlist_registry, allowlist, owner, origin_name, implementation, implementation_id, allowlist_addresses):
-    chain.snapshot()
+def test_migrate_tricrypto(allowlist_registry, allowlist, owner, origin_name, implementation, implementation_id, allowlist_addresses, contract_at):
     if "migrator_address_tricrypto" in allowlist_addresses:
-        tricrypto_migrator = Contract(allowlist_addresses["migrator_address_tricrypto"])
+        tricrypto_migrator = contract_at(allowlist_addresses["migrator_address_tricrypto"])
         implementation.setIsMigratorContract(tricrypto_migrator, True, {"from": owner})
         
         # Test valid calldata before adding condition - tricrypto_migrator.migrate_to_new_vault()
@@ -669,18 +683,15 @@ def test_migrate_tricrypto(allowlist_registry, allowlist, owner, origin_name, im
         data = tricrypto_migrator.migrate_to_new_vault.encode_input()
         allowed = allowlist_registry.validateCalldataByOrigin(origin_name, tricrypto_migrator, data)
         assert allowed == False
-
-    chain.revert()
         
 # Description: Standard migration
 # Signature: "migrator.migrateAll(address,address)"
 # Target: Must be valid migrator
 # Param0: Must be a valid vault token
 # Param1: Must be a valid vault token
-def test_migrate_standard(allowlist_registry, allowlist, owner, origin_name, implementation, implementation_id, allowlist_addresses, vault):
-    chain.snapshot()
+def test_migrate_standard(allowlist_registry, allowlist, owner, origin_name, implementation, implementation_id, allowlist_addresses, vault, contract_at):
     if "migrator_address_standard" in allowlist_addresses:
-        migrator = Contract(allowlist_addresses["migrator_address_standard"])
+        migrator = contract_at(allowlist_addresses["migrator_address_standard"])
         implementation.setIsMigratorContract(migrator, True, {"from": owner})
         
         # Test valid calldata before adding condition - migrator.migrateAll(address,address)
@@ -712,8 +723,6 @@ def test_migrate_standard(allowlist_registry, allowlist, owner, origin_name, imp
         data = migrator.migrateAll.encode_input(vault, vault)
         allowed = allowlist_registry.validateCalldataByOrigin(origin_name, migrator, data)
         assert allowed == False
-    
-    chain.revert()
 
 def test_conditions_json(allowlist):
     all_conditions_json = allowlist.conditionsJson()
@@ -0,0 +1,143 @@
+import json
+
+import pytest
+from yearn_allowlist import CachedBackend, RequirementCall, StaticBackend, load_conditions
+from yearn_allowlist.abi import encode_call, encode_word
+from yearn_allowlist.result_cache import result_key
+from yearn_allowlist.snapshot import snapshot_path, write_snapshot
+from yearn_allowlist.warmup import WarmBackend, WarmState, WarmValidator, load_results, results_path, write_results
+
+MAX_UINT256 = 2**256-1
+
+implementation_address = "0x4894d98442f5bea884cd6fa958954f73f58ae9b0"
+vault_address = "0x5c0a86a32c129538d62c106eb8115a8b02358d57"
+new_vault_address = "0xa258c4606ca8206d8aa700ce2143d7db854d168c"
+vault_token_address = "0x6b175474e89094c44da98b954eedeac495271d0f"
+implementations = {"IMPLEMENTATION_YEARN_VAULTS": implementation_address}
+
+snapshot = {
+    "version": 1,
+    "chain_id": 1,
+    "block": 90,
+    "implementations": {
+        "IMPLEMENTATION_YEARN_VAULTS": {
+            "contract": "AllowlistImplementationYearnVaults",
+            "address": implementation_address,
+            "state": {"vaults_by_token": {vault_token_address: [vault_address]}},
+        },
+    },
+}
+
+def is_vault(address):
+    return RequirementCall("IMPLEMENTATION_YEARN_VAULTS", "isVault", "address", encode_word("address", address))
+
+def approve(spender):
+    return (vault_token_address, encode_call("approve", ["address", "uint256"], [spender, MAX_UINT256]))
+
+@pytest.fixture
+def live_backend():
+    # On chain a new vault was added since the snapshot and the results were persisted
+    return StaticBackend({
+        ("IMPLEMENTATION_YEARN_VAULTS", "isVault"): {vault_address, new_vault_address},
+        ("IMPLEMENTATION_YEARN_VAULTS", "isVaultUnderlyingToken"): {vault_token_address},
+    })
+
+@pytest.fixture
+def warm_directory(tmp_path):
+    write_snapshot(snapshot_path(1, str(tmp_path)), snapshot)
+    write_results(results_path(1, str(tmp_path)), 1, 95, {result_key(is_vault(new_vault_address), implementations): False})
+    return str(tmp_path)
+
+##############################################################
+# Persistence
+##############################################################
+
+def test_results_round_trip(tmp_path):
+    path = results_path(1, str(tmp_path))
+    results = {result_key(is_vault(vault_address), implementations): True}
+    write_results(path, 1, 95, results)
+    assert load_results(path, 1) == (95, results)
+
+def test_load_warm_state(warm_directory):
+    state = WarmState.load(1, warm_directory)
+    assert (state.stale, state.block) == (True, 95)
+    assert state.warm_answer(is_vault(vault_address)) == True  # From the snapshot
+    assert state.warm_answer(is_vault(new_vault_address)) == False  # From the persisted results
+
+# Description: Answers the snapshot cannot give fall through to the live backend
+def test_unknown_warm_answers():
+    zap_in_address = "0x8e52522e6a77578904ddd7f528a22521dc4154f5"
+    exported = dict(snapshot, candidates=[zap_in_address])
+    state = WarmState(1, snapshot=exported)
+    def call(method_name, argument):
+        return RequirementCall("IMPLEMENTATION_YEARN_VAULTS", method_name, "address", argument)
+    assert state.warm_answer(call("isZapInContract", encode_word("address", zap_in_address))) == False
+    assert state.warm_answer(call("isZapInContract", encode_word("address", vault_address))) is None  # Not a candidate
+    assert state.warm_answer(call("isVault", encode_word("address", vault_token_address))) == False
+    truncated = RequirementCall("IMPLEMENTATION_YEARN_VAULTS", "isVault", "address[]", encode_word("uint256", 32))
+    assert state.warm_answer(truncated) is None
+    assert state.warm_answer(call("isGauge", encode_word("address", vault_address))) is None
+
+def test_cold_start(tmp_path):
+    state = WarmState.load(1, str(tmp_path))
+    assert state.stale == False
+    assert state.warm_answer(is_vault(vault_address)) is None
+
+    with open(results_path(1, str(tmp_path)), "w") as results_file:
+        json.dump({"version": 0}, results_file)
+    with pytest.warns(UserWarning, match="cold"):
+        assert WarmState.load(1, str(tmp_path)).stale == False
+
+##############################################################
+# Serving warm
+##############################################################
+
+# Description: Warm answers are flagged stale until revalidation switches to the live backend
+def test_warm_validation(warm_directory, live_backend):
+    backend = WarmBackend(WarmState.load(1, warm_directory), CachedBackend(live_backend, implementations))
+    validator = WarmValidator(load_conditions(1), backend)
+    answer = validator.screen(*approve(vault_address))
+    assert (answer.allowed, answer.condition.id, answer.stale) == (True, "TOKEN_APPROVE_VAULT", True)
+    assert validator.screen(*approve(new_vault_address)).allowed == False
+
+    backend.start_revalidation(lambda: 100).join()
+    assert backend.state.stale == False and backend.state.changed == 1
+    answer = validator.screen(*approve(new_vault_address))
+    assert (answer.allowed, answer.stale) == (True, False)
+
+    # Live answers are kept for the next start
+    backend.state.save()
+    block, results = load_results(results_path(1, warm_directory), 1)
+    assert block == 100
+    assert results[result_key(is_vault(new_vault_address), implementations)] == True
+
+# Description: Failed revalidations are retried with backoff, then warm answers are dropped
+def test_failed_revalidation(warm_directory, live_backend):
+    backend = WarmBackend(WarmState.load(1, warm_directory), live_backend)
+    failures = [OSError("node unreachable")] * 2
+    def current_block():
+        if failures:
+            raise failures.pop()
+        return 100
+    delays = []
+    backend.start_revalidation(current_block, sleep=delays.append).join()
+    assert delays == [1.0, 2.0]
+    assert (backend.state.stale, backend.state.block, backend.state.error) == (False, 100, None)
+
+    backend = WarmBackend(WarmState.load(1, warm_directory), live_backend)
+    def unreachable():
+        raise OSError("node unreachable")
+    backend.start_revalidation(unreachable, attempts=3, sleep=lambda seconds: None).join()
+    assert isinstance(backend.error, OSError)
+    assert backend.state.stale == False and "failed 3 times" in backend.state.error
+    answer = WarmValidator(load_conditions(1), backend).screen(*approve(new_vault_address))
+    assert (answer.allowed, answer.stale) == (True, False)
+
+def test_warm_answers_expire(warm_directory):
+    now = [0]
+    state = WarmState.load(1, warm_directory)
+    state = WarmState(1, state.results, state.block, implementation_addresses=implementations, max_age=60, clock=lambda: now[0])
+    assert state.warm_answer(is_vault(new_vault_address)) == False
+    now[0] = 60
+    assert state.warm_answer(is_vault(new_vault_address)) is None
+    assert state.stale == False and state.error == "not revalidated in time"
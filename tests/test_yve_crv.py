@@ -1,29 +1,31 @@
 import pytest
-from brownie import Contract, ZERO_ADDRESS, chain, convert
+from brownie import ZERO_ADDRESS, chain, convert
+
+pytestmark = pytest.mark.fork_only
 
 MAX_UINT256 = 2**256-1
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def implementation_id():
     return "IMPLEMENTATION_YEARN_YVE_CRV"
 
-@pytest.fixture
-def crv():
-    return Contract("0xD533a949740bb3306d119CC777fa900bA034cd52")
+@pytest.fixture(scope="module")
+def crv(contract_at):
+    return contract_at("0xD533a949740bb3306d119CC777fa900bA034cd52")
 
-@pytest.fixture
-def yve_crv():
-    return Contract("0xc5bddf9843308380375a611c18b50fb9341f502a")
+@pytest.fixture(scope="module")
+def yve_crv(contract_at):
+    return contract_at("0xc5bddf9843308380375a611c18b50fb9341f502a")
 
-@pytest.fixture(autouse=True)
-def implementation(owner, AllowlistImplementationYveCRV, allowlist_addresses, allowlist_registry, allowlist, implementation_id):
+@pytest.fixture(scope="module", autouse=True)
+def implementation(owner, AllowlistImplementationYveCRV, allowlist_addresses, allowlist_registry, allowlist, implementation_id, contract_at):
     use_live_contract = True
 
     _implementation = None
     if use_live_contract:
         key = "implementation_yearn_yve_crv"
         if key in allowlist_addresses:
-            _implementation = Contract(allowlist_addresses[key])
+            _implementation = contract_at(allowlist_addresses[key])
     if _implementation == None:
         _implementation = AllowlistImplementationYveCRV.deploy({"from": owner})
 
@@ -34,9 +36,7 @@ def implementation(owner, AllowlistImplementationYveCRV, allowlist_addresses, al
 # Signature: "token.approve(address,uint256)"
 # Target: Must be the CRV token address
 # Param 0: Must be the yveCRV token address
-def test_crv_approval_for_yve_crv(allowlist_registry, allowlist, owner, origin_name, implementation_id, crv, yve_crv):
-    chain.snapshot()
-
+def test_crv_approval_for_yve_crv(allowlist_registry, allowlist, owner, origin_name, implementation_id, crv, yve_crv, contract_at):
     # Add condition
     condition = (
         "CRV_APPROVE_YVE_CRV",
@@ -62,7 +62,7 @@ def test_crv_approval_for_yve_crv(allowlist_registry, allowlist, owner, origin_n
     assert allowed == False
     
     # Test invalid target - random_contract.approve(yveCRV, UINT256_MAX)
-    vault = Contract("0x5c0A86A32c129538D62C106Eb8115a8b02358d57")
+    vault = contract_at("0x5c0A86A32c129538D62C106Eb8115a8b02358d57")
     data = vault.approve.encode_input(vault, MAX_UINT256)
     allowed = allowlist_registry.validateCalldataByOrigin(origin_name, vault, data)
     assert allowed == False
@@ -71,14 +71,11 @@ def test_crv_approval_for_yve_crv(allowlist_registry, allowlist, owner, origin_n
     data = crv.decimals.encode_input()
     allowed = allowlist_registry.validateCalldataByOrigin(origin_name, crv, data)
     assert allowed == False
-    chain.revert()
 
 # Description: Depositing (aka locking) into yveCRV
 # Signature: "yveCRV.deposit(uint256)"
 # Target: Must be the yveCRV token address
 def test_yve_crv_deposit(allowlist_registry, allowlist, owner, origin_name, implementation_id, yve_crv):
-    chain.snapshot()
-
     # Test deposit before adding condition - yveCRV.deposit(amount)
     data = yve_crv.deposit.encode_input(MAX_UINT256)
     allowed = allowlist_registry.validateCalldataByOrigin(origin_name, yve_crv, data)
@@ -101,15 +98,11 @@ def test_yve_crv_deposit(allowlist_registry, allowlist, owner, origin_name, impl
     data = yve_crv.deposit.encode_input(MAX_UINT256)
     allowed = allowlist_registry.validateCalldataByOrigin(origin_name, yve_crv, data)
     assert allowed == True
-   
-    chain.revert()
 
 # Description: Claiming yveCRV
 # Signature: "yveCRV.claim()"
 # Target: Must be the yveCRV token address
 def test_yve_crv_claim(allowlist_registry, allowlist, owner, origin_name, implementation_id, yve_crv):
-    chain.snapshot()
-
     # Test claim before adding condition - yveCRV.claim()
     data = yve_crv.claim.encode_input()
     allowed = allowlist_registry.validateCalldataByOrigin(origin_name, yve_crv, data)
@@ -131,6 +124,4 @@ def test_yve_crv_claim(allowlist_registry, allowlist, owner, origin_name, implem
     # Test valid calldata - yveCRV.claim()
     data = yve_crv.claim.encode_input()
     allowed = allowlist_registry.validateCalldataByOrigin(origin_name, yve_crv, data)
-    assert allowed == True
-   
-    chain.revert()
\ No newline at end of file
+    assert allowed == True
\ No newline at end of file
@@ -0,0 +1,9 @@
+from .backends import Backend, EthCallBackend, RequirementCall, StaticBackend, brownie_eth_call
+from .conditions import Condition, Requirement, load_conditions
+from .config import ChainConfig, ConfigurationError, ProtocolConfig, load_chain_config, load_protocol_config
+from .dispatch import DispatchTable
+from .engine import Validator
+from .multicall import MulticallBackend
+from .result_cache import CachedBackend
+from .rpc_batch import BatchEthCallBackend
+from .simulators import DifferentialBackend, SimulatorBackend, simulators_from_snapshot
@@ -0,0 +1,205 @@
+"""
+Minimal ABI helpers used to evaluate allowlist conditions off-chain.
+
+Only the subset of the ABI used by conditions.json is supported: elementary
+static types (address, bool, uintN, intN, bytesN), dynamic `bytes`/`string`
+and one-dimensional arrays of static types (for example `address[]`).
+"""
+from eth_utils import function_signature_to_4byte_selector
+
+WORD_SIZE = 32
+SELECTOR_SIZE = 4
+
+
+class AbiDecodingError(ValueError):
+    """Raised when calldata does not match the expected parameter layout"""
+
+
+##############################################################
+# Types
+##############################################################
+
+def method_signature(method_name, param_types):
+    return method_name + "(" + ",".join(param_types) + ")"
+
+
+def function_selector(method_name, param_types):
+    return function_signature_to_4byte_selector(method_signature(method_name, param_types))
+
+
+def is_dynamic_type(param_type):
+    return param_type in ("bytes", "string") or param_type.endswith("[]")
+
+
+def head_size(param_type):
+    """Number of bytes a parameter occupies in the head of the encoding"""
+    if param_type.endswith("]") and not param_type.endswith("[]"):
+        element_type, length = param_type[:-1].rsplit("[", 1)
+        if not is_dynamic_type(element_type):
+            return head_size(element_type) * int(length)
+    return WORD_SIZE
+
+
+##############################################################
+# Encoding
+##############################################################
+
+def to_bytes(value):
+    """Convert a hex string or bytes-like value to bytes"""
+    if isinstance(value, str):
+        value = value[2:] if value.startswith("0x") else value
+        return bytes.fromhex(value)
+    return bytes(value)
+
+
+def encode_word(param_type, value):
+    if param_type == "address":
+        return to_bytes(value).rjust(WORD_SIZE, b"\x00")
+    if param_type == "bool":
+        return int(bool(value)).to_bytes(WORD_SIZE, "big")
+    if param_type.startswith("uint"):
+        return int(value).to_bytes(WORD_SIZE, "big")
+    if param_type.startswith("int"):
+        return int(value).to_bytes(WORD_SIZE, "big", signed=True)
+    if param_type.startswith("bytes"):
+        return to_bytes(value).ljust(WORD_SIZE, b"\x00")
+    raise ValueError("Unsupported static type: " + param_type)
+
+
+def encode_tail(param_type, value):
+    if param_type in ("bytes", "string"):
+        data = value.encode() if isinstance(value, str) and param_type == "string" else to_bytes(value)
+        padding = -len(data) % WORD_SIZE
+        return len(data).to_bytes(WORD_SIZE, "big") + data + b"\x00" * padding
+    element_type = param_type[:-2]
+    if is_dynamic_type(element_type):
+        raise ValueError("Nested dynamic arrays are not supported: " + param_type)
+    encoded_elements = b"".join(encode_word(element_type, element) for element in value)
+    return len(value).to_bytes(WORD_SIZE, "big") + encoded_elements
+
+
+def encode_arguments(param_types, values):
+    """ABI encode a list of values (without selector)"""
+    head_length = sum(head_size(param_type) for param_type in param_types)
+    heads = []
+    tails = []
+    for param_type, value in zip(param_types, values):
+        if is_dynamic_type(param_type):
+            offset = head_length + sum(len(tail) for tail in tails)
+            heads.append(offset.to_bytes(WORD_SIZE, "big"))
+            tails.append(encode_tail(param_type, value))
+        elif head_size(param_type) > WORD_SIZE:
+            element_type = param_type[:-1].rsplit("[", 1)[0]
+            heads.append(b"".join(encode_word(element_type, element) for element in value))
+        else:
+            heads.append(encode_word(param_type, value))
+    return b"".join(heads) + b"".join(tails)
+
+
+def encode_call(method_name, param_types, values):
+    """ABI encode calldata for a method call"""
+    return function_selector(method_name, param_types) + encode_arguments(param_types, values)
+
+
+##############################################################
+# Decoding
+##############################################################
+
+def parameter_head_offset(param_types, param_idx):
+    return SELECTOR_SIZE + sum(head_size(param_type) for param_type in param_types[:param_idx])
+
+
+def read_word(data, offset):
+    end = offset + WORD_SIZE
+    if offset < 0 or end > len(data):
+        raise AbiDecodingError("Calldata too short")
+    return data[offset:end]
+
+
+def tail_length(param_type, data, tail_offset):
+    length = int.from_bytes(read_word(data, tail_offset), "big")
+    if param_type in ("bytes", "string"):
+        return WORD_SIZE + length + (-length % WORD_SIZE)
+    return WORD_SIZE + length * head_size(param_type[:-2])
+
+
+def encoded_parameter(data, param_types, param_idx):
+    """
+    Return a single parameter re-encoded as the sole argument of a call.
+
+    This mirrors what the on-chain allowlist forwards to an implementation when
+    it evaluates a ["param", <method>, <idx>] requirement: static parameters are
+    forwarded as their head word(s), dynamic parameters as offset + tail.
+    """
+    if param_idx >= len(param_types):
+        raise AbiDecodingError("Parameter index out of range")
+    param_type = param_types[param_idx]
+    head_offset = parameter_head_offset(param_types, param_idx)
+    if not is_dynamic_type(param_type):
+        size = head_size(param_type)
+        if head_offset + size > len(data):
+            raise AbiDecodingError("Calldata too short")
+        return bytes(data[head_offset:head_offset + size])
+    tail_offset = SELECTOR_SIZE + int.from_bytes(read_word(data, head_offset), "big")
+    length = tail_length(param_type, data, tail_offset)
+    if tail_offset + length > len(data):
+        raise AbiDecodingError("Calldata too short")
+    return WORD_SIZE.to_bytes(WORD_SIZE, "big") + bytes(data[tail_offset:tail_offset + length])
+
+
+class ArrayView:
+    """
+    Lazy, zero-copy view of an array of static elements in ABI encoded data
+
+    `tail_offset` points at the length word. Elements are decoded one at a
+    time from a memoryview when iterated or indexed, so a check that fails on
+    the first element never touches the rest of the payload. Elements past
+    the end of the data raise AbiDecodingError when reached.
+    """
+
+    def __init__(self, data, tail_offset, decode_element, element_size=WORD_SIZE):
+        self.data = memoryview(data)
+        self.start = tail_offset + WORD_SIZE
+        self.length = int.from_bytes(read_word(self.data, tail_offset), "big")
+        self.decode_element = decode_element
+        self.element_size = element_size
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, idx):
+        if not 0 <= idx < self.length:
+            raise IndexError("Array index out of range")
+        offset = self.start + idx * self.element_size
+        if offset + self.element_size > len(self.data):
+            raise AbiDecodingError("Array element out of bounds")
+        return self.decode_element(self.data[offset:offset + self.element_size])
+
+    def __iter__(self):
+        for idx in range(self.length):
+            yield self[idx]
+
+
+def array_parameter(data, param_types, param_idx, decode_element):
+    """ArrayView of a dynamic array parameter, read in place from calldata"""
+    param_type = param_types[param_idx]
+    if not param_type.endswith("[]") or is_dynamic_type(param_type[:-2]):
+        raise AbiDecodingError("Not an array of static elements: " + param_type)
+    head_offset = parameter_head_offset(param_types, param_idx)
+    tail_offset = SELECTOR_SIZE + int.from_bytes(read_word(data, head_offset), "big")
+    return ArrayView(data, tail_offset, decode_element, head_size(param_type[:-2]))
+
+
+def decode_address(word):
+    """Decode an address word, rejecting non-zero upper bytes like the Solidity ABI decoder"""
+    word = bytes(word)
+    if any(word[:-20]):
+        raise AbiDecodingError("Dirty upper bytes in address word")
+    return "0x" + word[-20:].hex()
+
+
+def decode_bool(data):
+    """Decode the return value of a boolean view method"""
+    if len(data) < WORD_SIZE:
+        raise AbiDecodingError("Return data too short")
+    return int.from_bytes(data[:WORD_SIZE], "big") == 1
@@ -0,0 +1,250 @@
+"""
+Memory-mapped address sets
+
+Binary format for the large address lists in a snapshot (vaults, tokens,
+markets, gauges, flagged contracts). Each category is a sorted run of 20-byte
+addresses, so membership is a binary search over the mapped file without
+building Python objects per address. Files are mapped read-only, so every
+worker process opening the same file shares its pages through the OS page
+cache.
+
+Layout (little endian):
+
+    header    magic "YAS\\0", version u16, category count u16, chain id u64, block u64
+    category  name (64 bytes, NUL padded), offset u64, count u64   (one per category)
+    data      sorted 20-byte addresses of every category
+"""
+import mmap
+import os
+import struct
+import tempfile
+
+FORMAT_VERSION = 1
+MAGIC = b"YAS\x00"
+ADDRESS_SIZE = 20
+NAME_SIZE = 64
+HEADER = struct.Struct("<4sHHQQ")
+CATEGORY = struct.Struct("<" + str(NAME_SIZE) + "sQQ")
+
+# Snapshot state keys holding address lists
+ADDRESS_LIST_KEYS = (
+    "registered_tokens",
+    "vaults",
+    "cached_vaults",
+    "zap_in_contracts",
+    "zap_out_contracts",
+    "migrator_contracts",
+    "pickle_jar_contracts",
+    "listed_markets",
+    "underlying_tokens",
+    "indexed_underlying_tokens",
+    "gauges",
+    "zap_claim_contracts",
+)
+
+
+class AddressSetFormatError(ValueError):
+    pass
+
+
+def address_bytes(address):
+    """20-byte form of a hex or bytes address, or None if it isn't one"""
+    if isinstance(address, str):
+        try:
+            address = bytes.fromhex(address[2:] if address.startswith("0x") else address)
+        except ValueError:
+            return None
+    return bytes(address) if len(address) == ADDRESS_SIZE else None
+
+
+def write_address_sets(path, categories, chain_id=0, block=0):
+    """Write {name: addresses} to `path` atomically"""
+    names = sorted(categories)
+    for name in names:
+        if len(name.encode()) > NAME_SIZE:
+            raise ValueError("Category name too long: " + name)
+    sorted_sets = []
+    for name in names:
+        addresses = [address_bytes(address) for address in categories[name]]
+        if None in addresses:
+            raise ValueError("Invalid address in " + name)
+        sorted_sets.append(sorted(set(addresses)))
+
+    offset = HEADER.size + CATEGORY.size * len(names)
+    table = []
+    for name, addresses in zip(names, sorted_sets):
+        table.append(CATEGORY.pack(name.encode(), offset, len(addresses)))
+        offset += ADDRESS_SIZE * len(addresses)
+
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory)
+    with os.fdopen(fd, "wb") as sets_file:
+        sets_file.write(HEADER.pack(MAGIC, FORMAT_VERSION, len(names), chain_id, block))
+        sets_file.write(b"".join(table))
+        for addresses in sorted_sets:
+            sets_file.write(b"".join(addresses))
+    os.replace(tmp_path, path)
+
+
+class AddressSet:
+    """Read-only view of one sorted category in a mapped buffer"""
+
+    def __init__(self, buffer, offset, count):
+        self.buffer = buffer
+        self.offset = offset
+        self.count = count
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, address):
+        key = address_bytes(address)
+        if key is None:
+            return False
+        buffer = self.buffer
+        low = 0
+        high = self.count
+        while low < high:
+            middle = (low + high) // 2
+            start = self.offset + middle * ADDRESS_SIZE
+            value = buffer[start:start + ADDRESS_SIZE]
+            if value < key:
+                low = middle + 1
+            elif value > key:
+                high = middle
+            else:
+                return True
+        return False
+
+    def __iter__(self):
+        for idx in range(self.count):
+            start = self.offset + idx * ADDRESS_SIZE
+            yield "0x" + self.buffer[start:start + ADDRESS_SIZE].hex()
+
+
+class AddressSets:
+    """
+    Memory-mapped address sets file
+
+        with AddressSets(path) as address_sets:
+            "0x..." in address_sets["IMPLEMENTATION_YEARN_VAULTS/vaults"]
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as sets_file:
+            try:
+                self.buffer = mmap.mmap(sets_file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise AddressSetFormatError("Empty address sets file: " + path)
+        try:
+            self.categories = self.read_header(path)
+        except AddressSetFormatError:
+            self.close()
+            raise
+
+    def read_header(self, path):
+        if len(self.buffer) < HEADER.size:
+            raise AddressSetFormatError("Truncated address sets file: " + path)
+        magic, version, category_count, self.chain_id, self.block = HEADER.unpack_from(self.buffer, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise AddressSetFormatError("Not a version " + str(FORMAT_VERSION) + " address sets file: " + path)
+        categories = {}
+        for idx in range(category_count):
+            name, offset, count = CATEGORY.unpack_from(self.buffer, HEADER.size + idx * CATEGORY.size)
+            if offset + count * ADDRESS_SIZE > len(self.buffer):
+                raise AddressSetFormatError("Truncated address sets file: " + path)
+            categories[name.rstrip(b"\x00").decode()] = AddressSet(self.buffer, offset, count)
+        return categories
+
+    def __getitem__(self, name):
+        return self.categories[name]
+
+    def __contains__(self, name):
+        return name in self.categories
+
+    def close(self):
+        self.buffer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+##############################################################
+# Snapshots
+##############################################################
+
+def address_sets_path(snapshot_path):
+    return os.path.splitext(snapshot_path)[0] + ".addresses"
+
+
+def category_name(implementation_id, key):
+    return implementation_id + "/" + key
+
+
+def snapshot_categories(snapshot):
+    """Address lists of a snapshot by category name (vaults per token are flattened)"""
+    categories = {}
+    for implementation_id, implementation in snapshot["implementations"].items():
+        state = implementation.get("state", {})
+        for key in ADDRESS_LIST_KEYS:
+            if key in state:
+                categories[category_name(implementation_id, key)] = state[key]
+        if "vaults_by_token" in state:
+            categories[category_name(implementation_id, "vaults")] = [
+                vault for vaults in state["vaults_by_token"].values() for vault in vaults
+            ]
+    return categories
+
+
+def write_snapshot_address_sets(path, snapshot):
+    write_address_sets(path, snapshot_categories(snapshot), snapshot["chain_id"], snapshot["block"])
+
+
+def map_snapshot(snapshot, address_sets):
+    """
+    Copy of `snapshot` whose address lists are the mapped sets
+
+    Only scalar state (comptroller, veYFI addresses, ...) stays in Python
+    objects, so simulators built from the result share the mapped pages.
+    """
+    if (address_sets.chain_id, address_sets.block) != (snapshot["chain_id"], snapshot["block"]):
+        raise AddressSetFormatError("Address sets do not belong to this snapshot")
+    implementations = {}
+    for implementation_id, implementation in snapshot["implementations"].items():
+        state = {
+            key: value for key, value in implementation.get("state", {}).items()
+            if key not in ADDRESS_LIST_KEYS and key != "vaults_by_token"
+        }
+        for key in ADDRESS_LIST_KEYS:
+            name = category_name(implementation_id, key)
+            if name in address_sets:
+                state[key] = address_sets[name]
+        implementations[implementation_id] = dict(implementation, state=state)
+    return dict(snapshot, implementations=implementations)
+
+
+def main(args=None):
+    import argparse
+
+    from .snapshot import load_snapshot
+
+    parser = argparse.ArgumentParser(description="Write the address lists of a snapshot as memory-mapped address sets")
+    parser.add_argument("snapshot", help="Snapshot JSON file (see scripts/chains/<id>/export_snapshot.py)")
+    parser.add_argument("--output", help="Output path (default: the snapshot path with an .addresses extension)")
+    args = parser.parse_args(args)
+
+    snapshot = load_snapshot(args.snapshot)
+    output = args.output or address_sets_path(args.snapshot)
+    write_snapshot_address_sets(output, snapshot)
+    with AddressSets(output) as address_sets:
+        for name, addresses in sorted(address_sets.categories.items()):
+            print(name + ":", len(addresses))
+    print("Address sets written to", output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Requirement backends
+
+A backend answers a single requirement check, ie. "does `isVault(0x...)` on
+the IMPLEMENTATION_YEARN_VAULTS implementation return true". The engine only
+talks to backends through `check` and `check_many`, so checks can be answered
+by eth_call against a node, by in-memory data or by anything in between.
+"""
+from collections import namedtuple
+
+from .abi import AbiDecodingError, ArrayView, array_parameter, decode_address, decode_bool, function_selector, head_size, is_dynamic_type
+
+# `argument` is the ABI encoding of the single argument forwarded to the
+# implementation method, exactly as the on-chain allowlist forwards it.
+RequirementCall = namedtuple("RequirementCall", ["implementation_id", "method_name", "param_type", "argument"])
+
+
+def requirement_calldata(call):
+    return function_selector(call.method_name, [call.param_type]) + call.argument
+
+
+class ProviderError(Exception):
+    """
+    The node did not answer (transport failure, rejected batch, retries run
+    out). Not a failed requirement: backends let it propagate instead of
+    answering False, so it is never cached as an answer.
+    """
+    pass
+
+
+class Backend:
+    def check(self, call):
+        """Return True if the requirement call passes"""
+        raise NotImplementedError
+
+    def check_many(self, calls):
+        """Evaluate a list of requirement calls, preserving order"""
+        return [self.check(call) for call in calls]
+
+
+class EthCallBackend(Backend):
+    """
+    Evaluate requirements by calling implementation contracts
+
+    `eth_call` is any callable taking (to_address, calldata) and returning the
+    raw return data, for example `brownie_eth_call`. Reverts and malformed
+    return data count as a failed requirement, matching the on-chain behaviour.
+    """
+
+    def __init__(self, eth_call, implementation_addresses):
+        self.eth_call = eth_call
+        self.implementation_addresses = dict(implementation_addresses)
+
+    def check(self, call):
+        implementation_address = self.implementation_addresses.get(call.implementation_id)
+        if implementation_address is None:
+            return False
+        try:
+            return decode_bool(self.eth_call(implementation_address, requirement_calldata(call)))
+        except (AbiDecodingError, ValueError):
+            return False
+
+
+class StaticBackend(Backend):
+    """
+    Evaluate requirements from in-memory answers
+
+    `answers` maps (implementation_id, method_name) to either a collection of
+    accepted (lowercase hex) values or a predicate taking the decoded value.
+    Predicates get array values as lazy ArrayViews, collections hold them as
+    tuples, compared element by element without decoding the whole array.
+    Methods without an answer fail.
+    """
+
+    def __init__(self, answers):
+        self.answers = dict(answers)
+
+    def check(self, call):
+        answer = self.answers.get((call.implementation_id, call.method_name))
+        if answer is None:
+            return False
+        try:
+            return self.answer_passes(answer, decode_argument(call.param_type, call.argument))
+        except AbiDecodingError:
+            return False
+
+    def check_array(self, implementation_id, method_name, elements):
+        """Evaluate a requirement on an array param read in place (see Validator)"""
+        answer = self.answers.get((implementation_id, method_name))
+        if answer is None:
+            return False
+        return self.answer_passes(answer, elements)
+
+    def answer_passes(self, answer, value):
+        if callable(answer):
+            return bool(answer(value))
+        if isinstance(value, ArrayView):
+            return any(array_matches(value, accepted) for accepted in answer)
+        return value in answer
+
+
+def array_matches(view, accepted):
+    """Compare an ArrayView with an accepted tuple, decoding elements up to the first difference"""
+    if not isinstance(accepted, (tuple, list)) or len(accepted) != len(view):
+        return False
+    return all(view[idx] == element for idx, element in enumerate(accepted))
+
+
+def decode_argument(param_type, argument):
+    """Decode a forwarded requirement argument into a Python value"""
+    if is_dynamic_type(param_type):
+        if param_type.endswith("[]"):
+            return ArrayView(argument, 32, element_decoder(param_type), head_size(param_type[:-2]))
+        length = int.from_bytes(argument[32:64], "big")
+        return "0x" + bytes(argument[64:64 + length]).hex()
+    if param_type == "address":
+        return decode_address(argument)
+    if param_type == "bool":
+        return int.from_bytes(argument, "big") == 1
+    if param_type.startswith("uint"):
+        return int.from_bytes(argument, "big")
+    return "0x" + bytes(argument).hex()
+
+
+def element_decoder(param_type):
+    element_type = param_type[:-2]
+    return lambda word: decode_argument(element_type, word)
+
+
+def decoded_array_parameter(data, param_types, param_idx):
+    """Lazy decoded elements of an array param, read from calldata without copying"""
+    return array_parameter(data, param_types, param_idx, element_decoder(param_types[param_idx]))
+
+
+def brownie_eth_call(to_address, calldata):
+    """eth_call through the active brownie network connection"""
+    from brownie import web3
+
+    return bytes(web3.eth.call({"to": to_address, "data": "0x" + calldata.hex()}))
@@ -0,0 +1,192 @@
+"""
+Vectorized batch decoding (requires NumPy)
+
+For backtests over many transactions, calldata is packed into one buffer and
+selectors and head words are pulled out as NumPy arrays, one row per
+transaction. Address columns (`S20`) go straight into sorted membership checks
+against snapshot address lists, without a Python object per transaction.
+
+Only conditions whose params are single-word static types (address, bool,
+uintN, intN, bytesN) and whose requirements check addresses are supported;
+other conditions go through the Validator.
+
+    batch = TransactionBatch.from_transactions(transactions)
+    answers = {("IMPLEMENTATION_YEARN_VAULTS", "isVault"): member_array(address_sets["IMPLEMENTATION_YEARN_VAULTS/vaults"])}
+    allowed = validate_batch(batch, conditions, answers)
+"""
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from .abi import SELECTOR_SIZE, WORD_SIZE, is_dynamic_type, to_bytes
+from .address_sets import ADDRESS_SIZE, AddressSet, address_bytes
+
+ADDRESS_PADDING = WORD_SIZE - ADDRESS_SIZE
+
+
+def require_numpy():
+    if np is None:
+        raise ImportError("Batch decoding requires numpy (pip install numpy)")
+
+
+def is_word_type(param_type):
+    """True for static types encoded as exactly one word"""
+    if is_dynamic_type(param_type) or param_type.endswith("]"):
+        return False
+    return param_type in ("address", "bool") or param_type.startswith(("uint", "int", "bytes"))
+
+
+class TransactionBatch:
+    """
+    Targets and calldata of many transactions in packed buffers
+
+    `targets` is n * 20 bytes, `calldata` holds every calldata back to back and
+    `offsets` (n + 1 entries) delimits them.
+    """
+
+    def __init__(self, targets, calldata, offsets):
+        require_numpy()
+        self.targets = np.frombuffer(targets, dtype="S20")
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.lengths = np.diff(self.offsets)
+        # Padding keeps word gathers for short rows inside the buffer
+        self.data = np.frombuffer(bytes(calldata) + b"\x00" * WORD_SIZE, dtype=np.uint8)
+        if len(self.targets) != len(self.lengths):
+            raise ValueError("Expected one target per calldata")
+
+    @classmethod
+    def from_transactions(cls, transactions):
+        """Pack (target, calldata) pairs"""
+        targets = []
+        calldatas = []
+        offsets = [0]
+        for target, data in transactions:
+            target = address_bytes(target)
+            if target is None:
+                raise ValueError("Invalid target address")
+            data = to_bytes(data)
+            targets.append(target)
+            calldatas.append(data)
+            offsets.append(offsets[-1] + len(data))
+        return cls(b"".join(targets), b"".join(calldatas), offsets)
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def gather(self, start, size):
+        """(n, size) uint8 matrix of bytes at `start` in every calldata, zeros where too short"""
+        present = self.lengths >= start + size
+        index = np.where(present, self.offsets[:-1] + start, 0)[:, None] + np.arange(size)
+        values = self.data[index]
+        values[~present] = 0
+        return values, present
+
+    def selectors(self):
+        """uint32 selectors and a mask of rows long enough to have one"""
+        values, present = self.gather(0, SELECTOR_SIZE)
+        return values.view(">u4").ravel(), present
+
+    def selector_mask(self, selector):
+        selectors, present = self.selectors()
+        return present & (selectors == int.from_bytes(selector, "big"))
+
+    def word(self, param_idx):
+        """(n, 32) uint8 head words of param `param_idx` and a mask of rows that have it"""
+        return self.gather(SELECTOR_SIZE + WORD_SIZE * param_idx, WORD_SIZE)
+
+    def address_column(self, param_idx):
+        """
+        `S20` addresses of param `param_idx` and a mask of valid rows
+
+        Words with non-zero upper bytes are invalid, like in the Solidity ABI
+        decoder that reverts on them.
+        """
+        words, present = self.word(param_idx)
+        clean = present & ~words[:, :ADDRESS_PADDING].any(axis=1)
+        return np.ascontiguousarray(words[:, ADDRESS_PADDING:]).view("S20").ravel(), clean
+
+    def uint256_column(self, param_idx):
+        """(n, 4) big endian uint64 limbs, most significant first"""
+        words, present = self.word(param_idx)
+        return words.view(">u8"), present
+
+    def bytes32_column(self, param_idx):
+        words, present = self.word(param_idx)
+        return words.view("V32").ravel(), present
+
+
+##############################################################
+# Membership
+##############################################################
+
+def member_array(members):
+    """
+    Sorted `S20` array of addresses
+
+    Memory-mapped AddressSets are wrapped without copying.
+    """
+    require_numpy()
+    if isinstance(members, AddressSet):
+        return np.frombuffer(members.buffer, dtype="S20", count=len(members), offset=members.offset)
+    addresses = {address_bytes(member) for member in members}
+    addresses.discard(None)
+    return np.array(sorted(addresses), dtype="S20")
+
+
+def is_member(column, members):
+    """Boolean mask of the `S20` column entries found in sorted `members`"""
+    if len(members) == 0:
+        return np.zeros(len(column), dtype=bool)
+    idx = np.minimum(np.searchsorted(members, column), len(members) - 1)
+    return members[idx] == column
+
+
+def condition_supported(condition):
+    if not all(is_word_type(param_type) for param_type in condition.param_types):
+        return False
+    return all(
+        requirement.kind == "target" or condition.param_types[requirement.param_idx] == "address"
+        for requirement in condition.requirements
+    )
+
+
+def condition_mask(batch, condition, answers):
+    """
+    Rows allowed by one condition
+
+    `answers` maps (implementation_id, method_name) to member arrays; methods
+    without an answer fail, like in StaticBackend.
+    """
+    if not condition_supported(condition):
+        raise ValueError("Condition " + condition.id + " is not supported by batch decoding")
+    # Like on-chain, only the params that requirements check must be present
+    mask = batch.selector_mask(condition.selector)
+    for requirement in condition.requirements:
+        members = answers.get((condition.implementation_id, requirement.method_name))
+        if members is None:
+            return np.zeros(len(batch), dtype=bool)
+        if requirement.kind == "target":
+            column, valid = batch.targets, mask
+        else:
+            column, valid = batch.address_column(requirement.param_idx)
+        mask &= valid & is_member(column, members)
+    return mask
+
+
+def validate_batch(batch, conditions, answers):
+    """
+    One bool per transaction, like Validator.validate_many
+
+    Raises ValueError if a transaction uses the selector of a condition that
+    batch decoding does not support, rather than answering it wrongly.
+    """
+    allowed = np.zeros(len(batch), dtype=bool)
+    selectors, present = batch.selectors()
+    for condition in conditions:
+        if not condition_supported(condition):
+            if (present & (selectors == int.from_bytes(condition.selector, "big"))).any():
+                raise ValueError("Condition " + condition.id + " is not supported by batch decoding")
+            continue
+        allowed |= condition_mask(batch, condition, answers)
+    return allowed
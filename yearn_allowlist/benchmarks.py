@@ -0,0 +1,60 @@
+"""
+Gas baselines for condition validation
+
+Baselines are stored as {"<chain id>": {"<condition id>": {"valid": gas, "invalid": gas}}}.
+"""
+import json
+import os
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tests", "gas_baseline.json")
+DEFAULT_THRESHOLD = 0.05  # Allowed relative increase before a measurement counts as a regression
+
+# Charged for every transaction before execution (EIP-2028 calldata costs)
+TRANSACTION_GAS = 21000
+ZERO_BYTE_GAS = 4
+NONZERO_BYTE_GAS = 16
+
+
+def intrinsic_gas(calldata):
+    """Gas a transaction with `calldata` is charged before any code runs"""
+    return TRANSACTION_GAS + sum(NONZERO_BYTE_GAS if byte else ZERO_BYTE_GAS for byte in calldata)
+
+
+def load_baseline(path=BASELINE_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r") as baseline_file:
+        return json.load(baseline_file)
+
+
+def save_baseline(baseline, path=BASELINE_PATH):
+    with open(path, "w") as baseline_file:
+        json.dump(baseline, baseline_file, indent=2, sort_keys=True)
+        baseline_file.write("\n")
+
+
+def find_regressions(baseline, results, threshold=DEFAULT_THRESHOLD):
+    """
+    Compare measured gas against a baseline for one chain
+
+    Returns a list of (condition_id, case, baseline_gas, measured_gas) for every
+    measurement exceeding its baseline by more than `threshold`. Measurements
+    without a baseline are not regressions.
+    """
+    regressions = []
+    for condition_id, cases in sorted(results.items()):
+        for case, measured_gas in sorted(cases.items()):
+            baseline_gas = baseline.get(condition_id, {}).get(case)
+            if baseline_gas is not None and measured_gas > baseline_gas * (1 + threshold):
+                regressions.append((condition_id, case, baseline_gas, measured_gas))
+    return regressions
+
+
+def missing_baselines(baseline, results):
+    """Return (condition_id, case) pairs measured but not in the baseline"""
+    return [
+        (condition_id, case)
+        for condition_id, cases in sorted(results.items())
+        for case in sorted(cases)
+        if case not in baseline.get(condition_id, {})
+    ]
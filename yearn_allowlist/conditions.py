@@ -0,0 +1,99 @@
+"""
+Allowlist conditions as configured in configuration/chains/<id>/conditions.json
+"""
+from dataclasses import dataclass
+import json
+import os
+
+from .abi import function_selector, method_signature
+
+CONFIGURATION_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "configuration")
+
+
+@dataclass(frozen=True)
+class Requirement:
+    kind: str  # "target" or "param"
+    method_name: str
+    param_idx: int = None  # Only set for "param" requirements
+
+    @classmethod
+    def from_list(cls, requirement):
+        kind = requirement[0]
+        if kind == "target":
+            return cls(kind, requirement[1])
+        if kind == "param":
+            return cls(kind, requirement[1], int(requirement[2]))
+        raise ValueError("Unknown requirement type: " + str(kind))
+
+    def to_list(self):
+        if self.kind == "target":
+            return [self.kind, self.method_name]
+        return [self.kind, self.method_name, str(self.param_idx)]
+
+
+@dataclass(frozen=True)
+class Condition:
+    id: str
+    implementation_id: str
+    method_name: str
+    param_types: tuple
+    requirements: tuple
+
+    @classmethod
+    def from_dict(cls, condition):
+        return cls(
+            condition["id"],
+            condition["implementationId"],
+            condition["methodName"],
+            tuple(condition["paramTypes"]),
+            tuple(Requirement.from_list(requirement) for requirement in condition["requirements"]),
+        )
+
+    @classmethod
+    def from_tuple(cls, condition):
+        """Parse a condition as returned by Allowlist.conditionsList"""
+        id, implementation_id, method_name, param_types, requirements = condition
+        return cls(
+            id,
+            implementation_id,
+            method_name,
+            tuple(param_types),
+            tuple(Requirement.from_list(requirement) for requirement in requirements),
+        )
+
+    @property
+    def signature(self):
+        return method_signature(self.method_name, self.param_types)
+
+    @property
+    def selector(self):
+        return function_selector(self.method_name, self.param_types)
+
+    def to_tuple(self):
+        """Format the condition the way Allowlist.addCondition expects it"""
+        return (
+            self.id,
+            self.implementation_id,
+            self.method_name,
+            list(self.param_types),
+            [requirement.to_list() for requirement in self.requirements],
+        )
+
+
+def conditions_path(chain_id):
+    return os.path.join(CONFIGURATION_PATH, "chains", str(chain_id), "conditions.json")
+
+
+def load_conditions(chain_id, path=None):
+    """
+    Load the conditions of a chain
+
+    `chain_id` is required, like for load_chain_config. The conditions are
+    read from configuration/chains/<chain_id>, or from the file at `path`.
+    """
+    if path is None:
+        from .config import load_chain_config
+
+        return list(load_chain_config(chain_id).conditions)
+    with open(path, "r") as conditions_file:
+        return [Condition.from_dict(condition) for condition in json.load(conditions_file)]
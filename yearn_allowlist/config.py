@@ -0,0 +1,145 @@
+"""
+Typed, cached access to configuration/
+
+protocol.json and configuration/chains/<id>/{addresses,allowlist,conditions}.json
+are parsed and validated once per process into immutable records. Conditions
+are indexed by id and by selector.
+
+    chain_config = load_chain_config(250)
+    chain_config.allowlist_registry_address
+    chain_config.addresses["addresses_provider_address"]
+    chain_config.condition("MARKET_SUPPLY")
+"""
+from dataclasses import dataclass
+from functools import lru_cache
+from types import MappingProxyType
+import json
+import os
+import re
+
+from .conditions import CONFIGURATION_PATH, Condition
+
+ADDRESS_PATTERN = re.compile(r"^0x[0-9a-fA-F]{40}$")
+
+
+class ConfigurationError(ValueError):
+    pass
+
+
+def read_json(path):
+    try:
+        with open(path, "r") as json_file:
+            return json.load(json_file)
+    except (OSError, ValueError) as error:
+        raise ConfigurationError("Cannot read " + path + ": " + str(error))
+
+
+def validate_address(value, description):
+    if not isinstance(value, str) or not ADDRESS_PATTERN.match(value):
+        raise ConfigurationError(description + " is not an address: " + repr(value))
+    return value
+
+
+def parse_condition(condition, path):
+    try:
+        parsed = Condition.from_dict(condition)
+    except (KeyError, TypeError, ValueError) as error:
+        raise ConfigurationError("Invalid condition in " + path + ": " + repr(condition) + " (" + str(error) + ")")
+    for requirement in parsed.requirements:
+        if requirement.kind == "param" and not 0 <= requirement.param_idx < len(parsed.param_types):
+            raise ConfigurationError(
+                "Condition " + parsed.id + " checks param " + str(requirement.param_idx) + " of " + parsed.signature
+            )
+    return parsed
+
+
+##########################################
+# Records
+##########################################
+@dataclass(frozen=True)
+class ProtocolConfig:
+    origin_name: str
+
+
+@dataclass(frozen=True)
+class ChainConfig:
+    chain_id: int
+    allowlist_registry_address: str
+    addresses: MappingProxyType  # Key (e.g. "addresses_provider_address") to address
+    conditions: tuple
+    conditions_by_id: MappingProxyType
+    conditions_by_selector: MappingProxyType  # Selector bytes to a tuple of conditions
+
+    @classmethod
+    def from_conditions(cls, chain_id, allowlist_registry_address, addresses, conditions):
+        conditions_by_id = {}
+        conditions_by_selector = {}
+        for condition in conditions:
+            if condition.id in conditions_by_id:
+                raise ConfigurationError("Duplicate condition id on chain " + str(chain_id) + ": " + condition.id)
+            conditions_by_id[condition.id] = condition
+            conditions_by_selector.setdefault(condition.selector, []).append(condition)
+        return cls(
+            chain_id,
+            allowlist_registry_address,
+            MappingProxyType(dict(addresses)),
+            tuple(conditions),
+            MappingProxyType(conditions_by_id),
+            MappingProxyType({selector: tuple(matches) for selector, matches in conditions_by_selector.items()}),
+        )
+
+    def condition(self, id):
+        """Return the condition with this id, or raise KeyError"""
+        return self.conditions_by_id[id]
+
+    def conditions_for_selector(self, selector):
+        return self.conditions_by_selector.get(bytes(selector), ())
+
+
+##########################################
+# Loading
+##########################################
+def chain_path(chain_id, configuration_path=CONFIGURATION_PATH):
+    return os.path.join(configuration_path, "chains", str(chain_id))
+
+
+def available_chain_ids(configuration_path=CONFIGURATION_PATH):
+    chains_path = os.path.join(configuration_path, "chains")
+    return sorted(
+        int(name) for name in os.listdir(chains_path)
+        if name.isdigit() and os.path.isdir(os.path.join(chains_path, name))
+    )
+
+
+@lru_cache(maxsize=None)
+def load_protocol_config(configuration_path=CONFIGURATION_PATH):
+    path = os.path.join(configuration_path, "protocol.json")
+    protocol = read_json(path)
+    origin_name = protocol.get("originName") if isinstance(protocol, dict) else None
+    if not isinstance(origin_name, str) or not origin_name:
+        raise ConfigurationError("originName is not set in " + path)
+    return ProtocolConfig(origin_name)
+
+
+@lru_cache(maxsize=None)
+def _load_chain_config(chain_id, configuration_path):
+    path = chain_path(chain_id, configuration_path)
+    allowlist_path = os.path.join(path, "allowlist.json")
+    allowlist = read_json(allowlist_path)
+    allowlist_registry_address = validate_address(
+        allowlist.get("allowlist_registry_address"), "allowlist_registry_address in " + allowlist_path
+    )
+
+    addresses_path = os.path.join(path, "addresses.json")
+    addresses = read_json(addresses_path)
+    for key, address in addresses.items():
+        validate_address(address, key + " in " + addresses_path)
+
+    conditions_path = os.path.join(path, "conditions.json")
+    conditions = [parse_condition(condition, conditions_path) for condition in read_json(conditions_path)]
+    return ChainConfig.from_conditions(chain_id, allowlist_registry_address, addresses, conditions)
+
+
+def load_chain_config(chain_id, configuration_path=CONFIGURATION_PATH):
+    """Parse and validate the configuration of a chain (memoized per chain id)"""
+    return _load_chain_config(int(chain_id), configuration_path)
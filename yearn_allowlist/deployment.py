@@ -0,0 +1,166 @@
+"""
+Multi-chain deployment
+
+Runs scripts/chains/<id>/deploy.py for every configured chain concurrently,
+one `brownie run` process per chain. Each process has its own connection and
+accounts, so nonces are managed per chain and no chain waits on another
+chain's receipts. Deploy scripts report back through `write_summary`.
+
+    python -m yearn_allowlist.deployment [--chain 250] [--network 250=ftm-main-fork]
+"""
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from .conditions import CONFIGURATION_PATH
+
+PROJECT_PATH = os.path.dirname(CONFIGURATION_PATH)
+SUMMARY_PATH_VARIABLE = "DEPLOY_SUMMARY_PATH"
+
+# Brownie network used for each chain unless overridden
+DEFAULT_NETWORKS = {"1": "mainnet", "250": "ftm-main"}
+
+ChainDeployment = namedtuple("ChainDeployment", ["chain_id", "network", "script"])
+# `error` is set when the deploy script could not be run or its summary could not be read
+ChainResult = namedtuple("ChainResult", ["deployment", "returncode", "duration", "summary", "error"], defaults=[None])
+
+
+def result_status(result):
+    """Return "ok", "failed", or "incomplete" when the script exited without a summary"""
+    if result.error is not None or result.returncode != 0:
+        return "failed"
+    return "ok" if result.summary else "incomplete"
+
+
+def plan_deployments(chain_ids=None, networks=None, fork=False, project_path=PROJECT_PATH):
+    """
+    One ChainDeployment per chain in configuration/chains/ with a deploy script
+
+    `networks` overrides DEFAULT_NETWORKS; `fork` selects the "-fork" variant
+    of the default networks.
+    """
+    networks = dict(networks or {})
+    deployments = []
+    for chain_id in sorted(os.listdir(os.path.join(project_path, "configuration", "chains"))):
+        if chain_ids is not None and chain_id not in chain_ids:
+            continue
+        script = os.path.join("scripts", "chains", chain_id, "deploy.py")
+        if not os.path.exists(os.path.join(project_path, script)):
+            continue
+        network = networks.get(chain_id)
+        if network is None:
+            if chain_id not in DEFAULT_NETWORKS:
+                raise ValueError("No brownie network configured for chain " + chain_id)
+            network = DEFAULT_NETWORKS[chain_id] + ("-fork" if fork else "")
+        deployments.append(ChainDeployment(chain_id, network, script))
+    return deployments
+
+
+def deployment_command(deployment):
+    script = os.path.splitext(deployment.script)[0].replace(os.sep, "/")
+    return ["brownie", "run", script[len("scripts/"):], "--network", deployment.network]
+
+
+def run_deployment(deployment, command=None, project_path=PROJECT_PATH, output=sys.stdout, output_lock=None):
+    """
+    Run one chain's deploy script, streaming its output prefixed with the chain id
+
+    Failures to start the script or read its summary are returned as the
+    chain's error, so other chains still finish and get reported.
+    """
+    output_lock = output_lock or threading.Lock()
+    fd, summary_path = tempfile.mkstemp(suffix=".json")
+    os.close(fd)
+    env = dict(os.environ, **{SUMMARY_PATH_VARIABLE: summary_path})
+    start = time.time()
+    try:
+        process = subprocess.Popen(
+            command or deployment_command(deployment),
+            cwd=project_path,
+            env=env,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+        )
+        for line in process.stdout:
+            with output_lock:
+                output.write("[" + deployment.chain_id + "] " + line)
+        returncode = process.wait()
+        with open(summary_path, "r") as summary_file:
+            content = summary_file.read()
+        summary = json.loads(content) if content else {}
+    except Exception as error:
+        return ChainResult(deployment, None, time.time() - start, {}, str(error) or type(error).__name__)
+    finally:
+        os.remove(summary_path)
+    return ChainResult(deployment, returncode, time.time() - start, summary)
+
+
+def run_deployments(deployments, command=None, project_path=PROJECT_PATH, output=sys.stdout):
+    """Run every deployment concurrently and return results in input order"""
+    if not deployments:
+        return []
+    output_lock = threading.Lock()
+    with ThreadPoolExecutor(max_workers=len(deployments)) as executor:
+        futures = [
+            executor.submit(
+                run_deployment,
+                deployment,
+                command(deployment) if command else None,
+                project_path,
+                output,
+                output_lock,
+            )
+            for deployment in deployments
+        ]
+        return [future.result() for future in futures]
+
+
+def format_summary(results):
+    lines = ["{:<8}{:<16}{:<12}{:>10}  {}".format("Chain", "Network", "Status", "Seconds", "Summary")]
+    for result in results:
+        status = result_status(result)
+        details = ", ".join(key + "=" + str(value) for key, value in sorted(result.summary.items()))
+        if result.error is not None:
+            details = "error=" + result.error
+        lines.append("{:<8}{:<16}{:<12}{:>10.1f}  {}".format(
+            result.deployment.chain_id, result.deployment.network, status, result.duration, details
+        ))
+    return "\n".join(lines)
+
+
+def write_summary(summary):
+    """Report a deploy script's results to the orchestrator (no-op when run standalone)"""
+    summary_path = os.environ.get(SUMMARY_PATH_VARIABLE)
+    if summary_path:
+        with open(summary_path, "w") as summary_file:
+            json.dump(summary, summary_file, sort_keys=True)
+
+
+def main(args=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Deploy to every configured chain concurrently")
+    parser.add_argument("--chain", action="append", dest="chain_ids", help="Only deploy to this chain id (repeatable)")
+    parser.add_argument("--network", action="append", default=[], help="<chain id>=<brownie network> (repeatable)")
+    parser.add_argument("--fork", action="store_true", help="Use the fork variant of the default networks")
+    args = parser.parse_args(args)
+
+    networks = dict(network.split("=", 1) for network in args.network)
+    deployments = plan_deployments(args.chain_ids, networks, args.fork)
+    for deployment in deployments:
+        print("Planned:", deployment.chain_id, "on", deployment.network)
+    results = run_deployments(deployments)
+    print()
+    print(format_summary(results))
+    return 0 if all(result_status(result) == "ok" for result in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,75 @@
+"""
+Selector-indexed condition dispatch
+
+Conditions are grouped by 4-byte selector once, so calldata with an unknown
+selector is rejected with a single dict lookup. Within a selector, conditions
+(which are OR'ed) and their requirements (which are AND'ed) are ordered by
+estimated cost so the cheapest checks run, and short-circuit, first.
+"""
+from collections import namedtuple
+
+# Rough relative cost of evaluating a requirement on its implementation:
+# 1 - pure comparison against a constant
+# 2 - single storage read
+# 5 - one or more external calls through the addresses provider
+# 10 - external calls plus a loop over registry/adapter data
+REQUIREMENT_COSTS = {
+    "isPartnerTracker": 1,
+    "isCRV": 1,
+    "isYveCRV": 1,
+    "isPickleJar": 1,
+    "isPickleGauge": 1,
+    "isYveCrvVault": 1,
+    "isThreeCrvZap": 1,
+    "isZapInContract": 2,
+    "isZapOutContract": 2,
+    "isMigratorContract": 2,
+    "isPickleJarContract": 2,
+    "isZapClaimContract": 2,
+    "isVeYfiSpaceId": 2,
+    "isDelegateRegistry": 2,
+    "isVaultUnderlyingToken": 5,
+    "isComptroller": 5,
+    "isMarket": 5,
+    "isGauge": 5,
+    "isVotingEscrow": 5,
+    "isUnderlying": 5,
+    "isRewardPool": 5,
+    "isVault": 10,
+    "isMarketUnderlyingToken": 10,
+    "areMarkets": 10,
+}
+DEFAULT_REQUIREMENT_COST = 5
+
+# A condition together with its requirements in evaluation order
+Route = namedtuple("Route", ["condition", "requirements", "cost"])
+
+
+class DispatchTable:
+    def __init__(self, conditions, requirement_costs=None):
+        self.requirement_costs = dict(REQUIREMENT_COSTS)
+        if requirement_costs:
+            self.requirement_costs.update(requirement_costs)
+        routes_by_selector = {}
+        for position, condition in enumerate(conditions):
+            requirements = sorted(condition.requirements, key=self.requirement_cost)
+            cost = sum(self.requirement_cost(requirement) for requirement in requirements)
+            route = Route(condition, tuple(requirements), cost)
+            routes_by_selector.setdefault(condition.selector, []).append((cost, position, route))
+        self.routes_by_selector = {
+            selector: tuple(route for _, _, route in sorted(routes))
+            for selector, routes in routes_by_selector.items()
+        }
+
+    def requirement_cost(self, requirement):
+        return self.requirement_costs.get(requirement.method_name, DEFAULT_REQUIREMENT_COST)
+
+    def routes(self, selector):
+        """Candidate routes for a selector, cheapest first (empty if unknown)"""
+        return self.routes_by_selector.get(bytes(selector), ())
+
+    def __contains__(self, selector):
+        return bytes(selector) in self.routes_by_selector
+
+    def __len__(self):
+        return len(self.routes_by_selector)
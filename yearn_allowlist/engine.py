@@ -0,0 +1,107 @@
+"""
+Off-chain calldata validation
+
+Mirrors `validateCalldataByOrigin` on the allowlist registry: calldata is
+allowed if at least one condition matches its selector and every requirement
+of that condition passes.
+"""
+from .abi import SELECTOR_SIZE, AbiDecodingError, decode_address, encode_word, encoded_parameter, to_bytes
+from .backends import RequirementCall, decoded_array_parameter
+from .dispatch import DispatchTable
+
+
+class Validator:
+    def __init__(self, conditions, backend, requirement_costs=None):
+        self.conditions = list(conditions)
+        self.backend = backend
+        self.dispatch_table = DispatchTable(self.conditions, requirement_costs)
+
+    def requirement_call(self, condition, requirement, target, data):
+        """Build a single requirement call (raises AbiDecodingError on bad calldata)"""
+        if requirement.kind == "target":
+            return RequirementCall(condition.implementation_id, requirement.method_name, "address", encode_word("address", target))
+        param_type = condition.param_types[requirement.param_idx]
+        argument = encoded_parameter(data, condition.param_types, requirement.param_idx)
+        if param_type == "address":
+            # The implementation's ABI decoder reverts on dirty address words
+            decode_address(argument)
+        return RequirementCall(condition.implementation_id, requirement.method_name, param_type, argument)
+
+    def requirement_calls(self, route, target, data):
+        return [self.requirement_call(route.condition, requirement, target, data) for requirement in route.requirements]
+
+    def requirement_passes(self, condition, requirement, target, data):
+        check_array = getattr(self.backend, "check_array", None)
+        if check_array is not None and requirement.kind == "param" and condition.param_types[requirement.param_idx].endswith("[]"):
+            # In-memory backends walk array params in place and stop at the first failing element
+            elements = decoded_array_parameter(memoryview(data), condition.param_types, requirement.param_idx)
+            return check_array(condition.implementation_id, requirement.method_name, elements)
+        return self.backend.check(self.requirement_call(condition, requirement, target, data))
+
+    def route_passes(self, route, target, data):
+        try:
+            for requirement in route.requirements:
+                if not self.requirement_passes(route.condition, requirement, target, data):
+                    return False
+        except AbiDecodingError:
+            return False
+        return True
+
+    def matching_condition(self, target, data):
+        """Return the cheapest condition allowing the calldata, or None"""
+        data = to_bytes(data)
+        routes = self.dispatch_table.routes(data[:SELECTOR_SIZE])
+        if not routes or len(data) < SELECTOR_SIZE:
+            return None
+        for route in routes:
+            if self.route_passes(route, target, data):
+                return route.condition
+        return None
+
+    def validate(self, target, data):
+        """Return True if the calldata is allowed for the target"""
+        return self.matching_condition(target, data) is not None
+
+    def candidate_calls(self, transactions):
+        """
+        Candidate routes of each transaction with their requirement calls, and
+        the deduplicated calls of all of them
+        """
+        candidates = []
+        calls = []
+        for target, data in transactions:
+            data = to_bytes(data)
+            routes = self.dispatch_table.routes(data[:SELECTOR_SIZE]) if len(data) >= SELECTOR_SIZE else ()
+            route_calls = []
+            for route in routes:
+                try:
+                    current_calls = self.requirement_calls(route, target, data)
+                except AbiDecodingError:
+                    continue
+                route_calls.append((route, current_calls))
+                calls.extend(current_calls)
+            candidates.append(route_calls)
+        return candidates, list(dict.fromkeys(calls))
+
+    def select_conditions(self, candidates, results):
+        """Cheapest passing condition of each transaction, given {call: passed}"""
+        return [
+            next((route.condition for route, current_calls in route_calls if all(results[call] for call in current_calls)), None)
+            for route_calls in candidates
+        ]
+
+    def matching_conditions(self, transactions):
+        """
+        Batch version of `matching_condition` for (target, calldata) pairs
+
+        Requirement calls of every candidate route are gathered, deduplicated
+        and evaluated with a single `backend.check_many`, so backends that
+        aggregate calls (e.g. MulticallBackend) answer a batch in one round trip.
+        """
+        candidates, unique_calls = self.candidate_calls(transactions)
+        results = dict(zip(unique_calls, self.backend.check_many(unique_calls)))
+        return self.select_conditions(candidates, results)
+
+    def validate_many(self, transactions):
+        """Return one bool per (target, calldata) pair"""
+        return [condition is not None for condition in self.matching_conditions(transactions)]
@@ -0,0 +1,148 @@
+"""
+Deployment journal
+
+Deploy scripts record each completed step (registration, implementation
+deployments, condition batches) in a per-network JSON file as soon as it
+completes. A rerun verifies every journaled step against one block, with one
+multicall and one JSON-RPC batch for the code of deployed implementations,
+and skips the ones that still hold, so a failure midway resumes where it
+stopped instead of starting over.
+
+Journal layout:
+
+    {
+      "chain_id": 250,
+      "steps": {
+        "registration": {"allowlist": "0x..."},
+        "implementation:IMPLEMENTATION_YEARN_VAULTS": {"address": "0x...", "set": true},
+        "conditions": {"digest": "...", "count": 31, "batches": [...]}
+      }
+    }
+"""
+import hashlib
+import json
+import os
+import tempfile
+
+from .abi import to_bytes
+from .deployment import PROJECT_PATH
+
+JOURNAL_PATH = os.path.join(PROJECT_PATH, ".deploy_journal")
+IMPLEMENTATION_STEP_PREFIX = "implementation:"
+
+
+def implementation_step(implementation_id):
+    return IMPLEMENTATION_STEP_PREFIX + implementation_id
+
+
+def conditions_digest(conditions):
+    """Digest of a condition set, independent of its order"""
+    formatted = sorted(json.dumps(condition.to_tuple()) for condition in conditions)
+    return hashlib.sha256("\n".join(formatted).encode()).hexdigest()
+
+
+class DeploymentJournal:
+    def __init__(self, path, chain_id):
+        self.path = path
+        self.chain_id = chain_id
+        self.steps = {}
+        if os.path.exists(path):
+            with open(path, "r") as journal_file:
+                journal = json.load(journal_file)
+            if journal.get("chain_id") == chain_id:
+                self.steps = journal["steps"]
+
+    @classmethod
+    def for_network(cls, network_name, chain_id, directory=None):
+        directory = directory or os.environ.get("DEPLOY_JOURNAL_PATH", JOURNAL_PATH)
+        return cls(os.path.join(directory, network_name + ".json"), chain_id)
+
+    def get(self, step):
+        return self.steps.get(step)
+
+    def record(self, step, **data):
+        """Record (or extend) a completed step and persist the journal immediately"""
+        self.steps[step] = dict(self.steps.get(step) or {}, **data)
+        self.save()
+
+    def forget(self, step):
+        if self.steps.pop(step, None) is not None:
+            self.save()
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.path))
+        with os.fdopen(fd, "w") as journal_file:
+            json.dump({"chain_id": self.chain_id, "steps": self.steps}, journal_file, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+
+def read_codes(addresses, block):
+    """Code at each address, read as one JSON-RPC batch pinned to `block`"""
+    from brownie import web3
+
+    from .rpc_batch import RpcBatchTransport, http_send_batch
+
+    if not addresses:
+        return []
+    transport = RpcBatchTransport(http_send_batch(web3.provider.endpoint_uri))
+    codes = transport.call_many([("eth_getCode", [address, hex(block)]) for address in addresses])
+    for code in codes:
+        if isinstance(code, Exception):
+            raise code
+    return [to_bytes(code) for code in codes]
+
+
+def verify_journal(journal, allowlist_registry, origin_name, contract_at):
+    """
+    Check journaled steps against the chain and forget the ones that don't hold
+
+    Contract reads go through a single brownie multicall and the code of
+    deployed but unset implementations through one JSON-RPC batch, both at
+    the same block. The conditions step holds if the digest of the on-chain
+    conditions matches. Returns the names of the forgotten steps.
+    """
+    from brownie import multicall, web3
+
+    from .conditions import Condition
+
+    registration = journal.get("registration")
+    if registration is None:
+        # Nothing after registration can be trusted without it
+        stale = list(journal.steps)
+        for step in stale:
+            journal.forget(step)
+        return stale
+    allowlist = contract_at(registration["allowlist"])
+    implementation_steps = [step for step in journal.steps if step.startswith(IMPLEMENTATION_STEP_PREFIX)]
+    set_steps = [step for step in implementation_steps if journal.get(step).get("set")]
+    # Deployed but not yet set: the contract must still exist
+    deployed_steps = [step for step in implementation_steps if not journal.get(step).get("set")]
+    conditions = journal.get("conditions")
+    check_conditions = conditions is not None and "digest" in conditions
+    block = web3.eth.block_number
+    with multicall(block_identifier=block):
+        allowlist_address = allowlist_registry.allowlistAddressByOriginName(origin_name)
+        implementation_addresses = [
+            allowlist.implementationById(step[len(IMPLEMENTATION_STEP_PREFIX):]) for step in set_steps
+        ]
+        onchain_conditions = allowlist.conditionsList() if check_conditions else None
+    codes = read_codes([journal.get(step)["address"] for step in deployed_steps], block)
+
+    stale = []
+    if str(allowlist_address).lower() != registration["allowlist"].lower():
+        stale = list(journal.steps)
+    else:
+        for step, address in zip(set_steps, implementation_addresses):
+            if str(address).lower() != journal.get(step)["address"].lower():
+                stale.append(step)
+        for step, code in zip(deployed_steps, codes):
+            if len(code) == 0:
+                stale.append(step)
+        if check_conditions:
+            digest = conditions_digest([Condition.from_tuple(condition) for condition in onchain_conditions])
+            if digest != conditions["digest"]:
+                stale.append("conditions")
+    for step in stale:
+        journal.forget(step)
+    return stale
@@ -0,0 +1,394 @@
+"""
+Incremental snapshot index from logs
+
+Re-reading a registry (numVaults/vaults, getVaults, getAllMarkets) to find
+new entries costs O(total vaults) per refresh. `LogIndexer` instead follows
+the logs that change what the implementations answer, from the snapshot
+block onwards, and applies each one as a delta to the snapshot state and to
+the simulators built from it, so a poll costs O(changes):
+
+    NewVault (V2 registry)              vaults_by_token, registered_tokens
+    MarketListed (comptroller)          listed_markets, underlying_tokens
+    VaultAdded (veYFI registry)         vaults, gauges
+    ZapInContractSet and the other      zap_in_contracts, zap_out_contracts,
+    setter events (implementations)     migrator_contracts, pickle_jar_contracts,
+                                        zap_claim_contracts
+
+NewExperimentalVault is not followed: `isVault` only accepts vaults the
+registry endorsed, and endorsing an experimental vault emits NewVault.
+
+After each eth_getLogs range the indexer keeps a checkpoint (block, block
+hash, applied deltas). The deltas of a range are only applied once all of its
+reads succeeded, together with its checkpoint. The first checkpoint is the
+snapshot block with the hash recorded at export. A poll first compares the
+newest checkpoints with the chain; checkpoints on a reorged branch are rolled
+back, deltas undone in reverse, and the logs are read again from the last
+checkpoint still on chain.
+
+    indexer = LogIndexer(load_snapshot(path, 250), RpcBatchTransport(http_send_batch(url)).call)
+    backend = SimulatorBackend(indexer.simulators)
+    indexer.poll()  # Whenever new blocks matter
+    indexer.save(path)
+"""
+from collections import deque
+from dataclasses import dataclass
+import warnings
+
+from eth_utils import keccak
+
+from .abi import decode_address, encode_call, to_bytes
+from .simulators import simulators_from_snapshot
+from .snapshot import ZERO_ADDRESS, snapshot_path, write_snapshot
+
+DEFAULT_MAX_BLOCK_RANGE = 2000
+DEFAULT_MAX_CHECKPOINTS = 64
+
+
+def event_topic(signature):
+    return "0x" + keccak(text=signature).hex()
+
+
+NEW_VAULT = event_topic("NewVault(address,uint256,address,string)")
+MARKET_LISTED = event_topic("MarketListed(address)")
+VAULT_ADDED = event_topic("VaultAdded(address,address)")
+ZAP_IN_CONTRACT_SET = event_topic("ZapInContractSet(address,bool)")
+ZAP_OUT_CONTRACT_SET = event_topic("ZapOutContractSet(address,bool)")
+MIGRATOR_CONTRACT_SET = event_topic("MigratorContractSet(address,bool)")
+PICKLE_JAR_CONTRACT_SET = event_topic("PickleJarContractSet(address,bool)")
+ZAP_CLAIM_CONTRACT_SET = event_topic("ZapClaimContractSet(address,bool)")
+
+
+class LogIndexError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class Delta:
+    implementation_id: str
+    key: str  # Snapshot state key
+    address: str
+    added: bool
+    token: str = None  # Token listing the vault, for vaults_by_token
+
+
+@dataclass(frozen=True)
+class Checkpoint:
+    block: int
+    hash: str
+    deltas: tuple  # Deltas applied since the previous checkpoint
+
+
+@dataclass(frozen=True)
+class IndexUpdate:
+    block: int  # Block the index is up to date with
+    applied: list  # Deltas applied by this poll
+    rolled_back: list  # Deltas undone after a reorg
+
+
+##############################################################
+# Log decoding
+##############################################################
+
+def topic_address(topic):
+    return decode_address(to_bytes(topic))
+
+
+def data_words(log):
+    data = to_bytes(log["data"])
+    return [data[start:start + 32] for start in range(0, len(data), 32)]
+
+
+def new_vault(log):
+    token = topic_address(log["topics"][1])
+    vault = decode_address(data_words(log)[0])
+    return [("vaults_by_token", vault, True, token), ("registered_tokens", token, True, None)]
+
+
+def new_partner_vault(log):
+    return new_vault(log)[:1]
+
+
+def market_listed(log):
+    # Compound's MarketListed does not index the market
+    market = topic_address(log["topics"][1]) if len(log["topics"]) > 1 else decode_address(data_words(log)[0])
+    return [("listed_markets", market, True, None)]
+
+
+def vault_added(log):
+    gauge = topic_address(log["topics"][2])
+    deltas = [("vaults", topic_address(log["topics"][1]), True, None)]
+    if gauge != ZERO_ADDRESS:
+        deltas.append(("gauges", gauge, True, None))
+    return deltas
+
+
+def flag_set(key):
+    def decode(log):
+        return [(key, topic_address(log["topics"][1]), int.from_bytes(data_words(log)[0], "big") != 0, None)]
+    return decode
+
+
+# Contract name to (state key of the emitting contract, {topic: decoder}); None
+# stands for the implementation itself
+LOG_SOURCES = {
+    "AllowlistImplementationYearnVaults": [
+        ("registry", {NEW_VAULT: new_vault}),
+        (None, {
+            ZAP_IN_CONTRACT_SET: flag_set("zap_in_contracts"),
+            ZAP_OUT_CONTRACT_SET: flag_set("zap_out_contracts"),
+            MIGRATOR_CONTRACT_SET: flag_set("migrator_contracts"),
+            PICKLE_JAR_CONTRACT_SET: flag_set("pickle_jar_contracts"),
+        }),
+    ],
+    "AllowlistImplementationIronBank": [("comptroller", {MARKET_LISTED: market_listed})],
+    "AllowlistImplementationVeYFI": [
+        ("registry", {VAULT_ADDED: vault_added}),
+        (None, {ZAP_CLAIM_CONTRACT_SET: flag_set("zap_claim_contracts")}),
+    ],
+    "AllowlistImplementationPartnerTracker": [("registry", {NEW_VAULT: new_partner_vault})],
+}
+
+# State keys held by a simulator attribute of another name
+SIMULATOR_ATTRIBUTES = {"vaults_by_token": "vaults"}
+
+
+def log_position(log):
+    return int(log["blockNumber"], 16), int(log["logIndex"], 16)
+
+
+##############################################################
+# Indexes
+##############################################################
+
+class OverlaySet:
+    """Address set with additions and removals on top of an immutable one (frozenset or AddressSet)"""
+
+    def __init__(self, base):
+        self.base = base
+        self.added = set()
+        self.removed = set()
+
+    def __contains__(self, address):
+        return address in self.added or (address not in self.removed and address in self.base)
+
+    def add(self, address):
+        self.removed.discard(address)
+        if address not in self.base:
+            self.added.add(address)
+
+    def discard(self, address):
+        self.added.discard(address)
+        if address in self.base:
+            self.removed.add(address)
+
+    def __iter__(self):
+        yield from self.added
+        for address in self.base:
+            if address not in self.removed:
+                yield address
+
+    def __len__(self):
+        return len(self.base) - len(self.removed) + len(self.added)
+
+
+def overlay(simulator, attribute):
+    """The simulator's address set behind `attribute`, made updatable"""
+    addresses = getattr(simulator, attribute)
+    if not isinstance(addresses, OverlaySet):
+        addresses = OverlaySet(addresses)
+        setattr(simulator, attribute, addresses)
+    return addresses
+
+
+def state_contains(state, delta):
+    if delta.key == "vaults_by_token":
+        return any(delta.address in vaults for vaults in state.get("vaults_by_token", {}).values())
+    return delta.address in state.get(delta.key, [])
+
+
+def apply_to_state(state, delta, undo=False):
+    added = delta.added != undo
+    if delta.key == "vaults_by_token":
+        addresses = state.setdefault("vaults_by_token", {}).setdefault(delta.token, [])
+    else:
+        addresses = state.setdefault(delta.key, [])
+    if added:
+        addresses.append(delta.address)
+    elif delta.address in addresses:
+        addresses.remove(delta.address)
+
+
+class LogIndexer:
+    """
+    Keep a snapshot (and `simulators`, by default built from it) up to date from logs
+
+    `request(method, params)` sends a JSON-RPC request and returns its result
+    (RpcBatchTransport.call, brownie_request). Logs are read up to
+    `confirmations` blocks behind the head, `max_block_range` blocks per
+    eth_getLogs. Snapshot state must hold plain address lists, as written by
+    export_snapshot.
+    """
+
+    def __init__(
+        self, snapshot, request, simulators=None, confirmations=0,
+        max_block_range=DEFAULT_MAX_BLOCK_RANGE, max_checkpoints=DEFAULT_MAX_CHECKPOINTS,
+    ):
+        self.snapshot = snapshot
+        self.request = request
+        self.implementations = snapshot["implementations"]
+        self.simulators = simulators if simulators is not None else simulators_from_snapshot(self.implementations)
+        self.confirmations = confirmations
+        self.max_block_range = max_block_range
+        self.checkpoints = deque(maxlen=max_checkpoints)
+        self.block = int(snapshot["block"])
+        self.decoders = self.subscriptions()
+
+    def subscriptions(self):
+        """{(address, topic): [(implementation id, decoder)]} of every followed log"""
+        decoders = {}
+        for implementation_id, implementation in sorted(self.implementations.items()):
+            for source_key, topics in LOG_SOURCES.get(implementation["contract"], []):
+                if source_key is None:
+                    source = implementation.get("address")
+                else:
+                    source = implementation.get("state", {}).get(source_key)
+                if not source:
+                    warnings.warn(
+                        "Snapshot has no " + (source_key or "address") + " for " + implementation_id
+                        + ", its logs are not followed (export the snapshot again)"
+                    )
+                    continue
+                for topic, decoder in topics.items():
+                    decoders.setdefault((source.lower(), topic), []).append((implementation_id, decoder))
+        return decoders
+
+    def block_hash(self, block):
+        result = self.request("eth_getBlockByNumber", [hex(block), False])
+        if result is None:
+            return None
+        return result["hash"]
+
+    def head(self):
+        return int(self.request("eth_blockNumber", []), 16) - self.confirmations
+
+    def snapshot_checkpoint(self):
+        """Checkpoint of the snapshot block, with the hash it was exported at"""
+        block_hash = self.snapshot.get("block_hash")
+        if block_hash is None:
+            warnings.warn("Snapshot has no block hash, a reorg of its block is not detected (export the snapshot again)")
+            block_hash = self.block_hash(self.block)
+        return Checkpoint(self.block, block_hash, ())
+
+    def poll(self):
+        """
+        Roll back reorged checkpoints, then apply the logs up to the head
+
+        A range whose blocks change while its logs are read is not applied,
+        the next poll rolls the reorg back and reads it again.
+        """
+        if not self.checkpoints:
+            self.checkpoints.append(self.snapshot_checkpoint())
+        rolled_back = self.check_reorg()
+        applied = []
+        head = self.head()
+        while self.block < head:
+            to_block = min(head, self.block + self.max_block_range)
+            # Every read of the range happens before its deltas are applied
+            block_hash = self.block_hash(to_block)
+            deltas = self.log_deltas(self.get_logs(self.block + 1, to_block))
+            if block_hash is None or not self.is_unchanged(to_block, block_hash):
+                break
+            deltas = self.apply_deltas(deltas)
+            self.set_block(to_block, block_hash)
+            self.checkpoints.append(Checkpoint(to_block, block_hash, tuple(deltas)))
+            applied.extend(deltas)
+        return IndexUpdate(self.block, applied, rolled_back)
+
+    def is_unchanged(self, to_block, block_hash):
+        """The range end still has `block_hash` and still descends from the newest checkpoint"""
+        return self.block_hash(to_block) == block_hash and self.block_hash(self.block) == self.checkpoints[-1].hash
+
+    def set_block(self, block, block_hash):
+        self.block = block
+        self.snapshot["block"] = block
+        self.snapshot["block_hash"] = block_hash
+
+    def check_reorg(self):
+        """Undo the checkpoints whose block is no longer on chain and move the cursor back"""
+        rolled_back = []
+        while self.checkpoints:
+            checkpoint = self.checkpoints[-1]
+            if self.block_hash(checkpoint.block) == checkpoint.hash:
+                break
+            self.checkpoints.pop()
+            for delta in reversed(checkpoint.deltas):
+                self.apply(delta, undo=True)
+                rolled_back.append(delta)
+        if not self.checkpoints:
+            raise LogIndexError("Reorg deeper than the oldest checkpoint, export the snapshot again")
+        self.set_block(self.checkpoints[-1].block, self.checkpoints[-1].hash)
+        return rolled_back
+
+    def get_logs(self, from_block, to_block):
+        logs = self.request("eth_getLogs", [{
+            "fromBlock": hex(from_block),
+            "toBlock": hex(to_block),
+            "address": sorted({address for address, _ in self.decoders}),
+            "topics": [sorted({topic for _, topic in self.decoders})],
+        }])
+        return sorted((log for log in logs if not log.get("removed")), key=log_position)
+
+    def log_deltas(self, logs):
+        """Deltas of `logs` in log order, without applying them"""
+        deltas = []
+        for log in logs:
+            if not log["topics"]:
+                continue
+            for implementation_id, decoder in self.decoders.get((log["address"].lower(), log["topics"][0].lower()), []):
+                for key, address, added, token in decoder(log):
+                    if key == "listed_markets" and added:
+                        deltas.append(self.underlying_token_delta(implementation_id, address, log["blockNumber"]))
+                    deltas.append(Delta(implementation_id, key, address, added, token))
+        return deltas
+
+    def underlying_token_delta(self, implementation_id, market, block):
+        """isMarketUnderlyingToken reads underlying() of every market, so a listed market brings its token"""
+        result = self.request("eth_call", [{"to": market, "data": "0x" + encode_call("underlying", [], []).hex()}, block])
+        token = decode_address(to_bytes(result))
+        return Delta(implementation_id, "underlying_tokens", token, True)
+
+    def apply_deltas(self, deltas):
+        """Apply deltas in order and return those that changed the index"""
+        return [delta for delta in deltas if self.apply(delta)]
+
+    def apply(self, delta, undo=False):
+        """Apply (or undo) a delta; False if the index already agreed with it"""
+        state = self.implementations[delta.implementation_id].setdefault("state", {})
+        simulator = self.simulators.get(delta.implementation_id)
+        added = delta.added != undo
+        if simulator is None:
+            if not undo and state_contains(state, delta) == added:
+                return False
+        else:
+            addresses = overlay(simulator, SIMULATOR_ATTRIBUTES.get(delta.key, delta.key))
+            if not undo and (delta.address in addresses) == added:
+                return False
+            if added:
+                addresses.add(delta.address)
+            else:
+                addresses.discard(delta.address)
+        apply_to_state(state, delta, undo)
+        return True
+
+    def save(self, path=None):
+        write_snapshot(path or snapshot_path(self.snapshot["chain_id"]), self.snapshot)
+
+
+def brownie_request(method, params):
+    """JSON-RPC request through the active brownie network connection"""
+    from brownie import web3
+
+    response = web3.provider.make_request(method, params)
+    if "error" in response:
+        raise LogIndexError(method + ": " + str(response["error"]))
+    return response["result"]
@@ -0,0 +1,125 @@
+"""
+Multicall backend
+
+Sends a batch of requirement calls as one `tryAggregate` eth_call on a
+Multicall2 contract, instead of one eth_call per requirement. Failed calls and
+malformed return data count as a failed requirement, like in EthCallBackend.
+When the aggregated call itself fails (for example over the node's gas cap),
+the batch falls back to one eth_call per requirement. A ProviderError from
+`eth_call` is not a failed call and propagates.
+contracts/mocks/MulticallMock.sol is a local stand-in for development chains.
+"""
+from .abi import WORD_SIZE, AbiDecodingError, decode_bool, encode_tail, encode_word, function_selector, read_word
+from .backends import Backend, EthCallBackend, requirement_calldata
+
+# Multicall2 deployments by chain id
+MULTICALL_ADDRESSES = {
+    1: "0x5BA1e12693Dc8F9c48aAD8770482f4739bEeD696",
+    250: "0xD98e3dBE5950Ca8Ce5a4b59630a5652110403E5c",
+}
+DEFAULT_BATCH_SIZE = 500  # Calls per eth_call, keeps requests under node gas caps
+
+TRY_AGGREGATE_SELECTOR = function_selector("tryAggregate", ["bool", "(address,bytes)[]"])
+
+
+def encode_words_with_offsets(encoded_items):
+    """Encode a dynamic array body: length, element offsets, then elements"""
+    offsets = []
+    offset = WORD_SIZE * len(encoded_items)
+    for encoded_item in encoded_items:
+        offsets.append(offset.to_bytes(WORD_SIZE, "big"))
+        offset += len(encoded_item)
+    return len(encoded_items).to_bytes(WORD_SIZE, "big") + b"".join(offsets) + b"".join(encoded_items)
+
+
+def encode_try_aggregate(calls, require_success=False):
+    """Calldata for tryAggregate(bool,(address,bytes)[]) from (target, calldata) pairs"""
+    encoded_calls = [
+        encode_word("address", target) + (2 * WORD_SIZE).to_bytes(WORD_SIZE, "big") + encode_tail("bytes", calldata)
+        for target, calldata in calls
+    ]
+    return (
+        TRY_AGGREGATE_SELECTOR
+        + encode_word("bool", require_success)
+        + (2 * WORD_SIZE).to_bytes(WORD_SIZE, "big")
+        + encode_words_with_offsets(encoded_calls)
+    )
+
+
+def read_uint(data, offset):
+    return int.from_bytes(read_word(data, offset), "big")
+
+
+def decode_dynamic_bytes(data, offset):
+    length = read_uint(data, offset)
+    if offset + WORD_SIZE + length > len(data):
+        raise AbiDecodingError("Bytes out of bounds")
+    return bytes(data[offset + WORD_SIZE:offset + WORD_SIZE + length])
+
+
+def decode_try_aggregate(data):
+    """Decode the (bool success, bytes returnData)[] returned by tryAggregate"""
+    array_offset = read_uint(data, 0)
+    length = read_uint(data, array_offset)
+    elements_offset = array_offset + WORD_SIZE
+    results = []
+    for idx in range(length):
+        element_offset = elements_offset + read_uint(data, elements_offset + WORD_SIZE * idx)
+        success = read_uint(data, element_offset) == 1
+        return_data = decode_dynamic_bytes(data, element_offset + read_uint(data, element_offset + WORD_SIZE))
+        results.append((success, return_data))
+    return results
+
+
+class MulticallBackend(Backend):
+    """
+    Evaluate requirement batches with one aggregated eth_call
+
+    `eth_call` takes (to_address, calldata) like for EthCallBackend and is sent
+    to the Multicall2 contract at `multicall_address`. Duplicate calls in a
+    batch are only sent once.
+    """
+
+    def __init__(self, eth_call, multicall_address, implementation_addresses, batch_size=DEFAULT_BATCH_SIZE):
+        self.eth_call = eth_call
+        self.multicall_address = multicall_address
+        self.implementation_addresses = dict(implementation_addresses)
+        self.batch_size = batch_size
+
+    def check(self, call):
+        return self.check_many([call])[0]
+
+    def check_many(self, calls):
+        unique_calls = [
+            call for call in dict.fromkeys(calls)
+            if call.implementation_id in self.implementation_addresses
+        ]
+        results = {}
+        for start in range(0, len(unique_calls), self.batch_size):
+            batch = unique_calls[start:start + self.batch_size]
+            results.update(zip(batch, self.aggregate(batch)))
+        return [results.get(call, False) for call in calls]
+
+    def aggregate(self, calls):
+        calldata = encode_try_aggregate([
+            (self.implementation_addresses[call.implementation_id], requirement_calldata(call)) for call in calls
+        ])
+        try:
+            returned = decode_try_aggregate(self.eth_call(self.multicall_address, calldata))
+        except (AbiDecodingError, ValueError):
+            returned = None
+        if returned is None or len(returned) != len(calls):
+            return self.check_each(calls)
+        return [success and return_data_passes(return_data) for success, return_data in returned]
+
+    def check_each(self, calls):
+        """Answer a batch the aggregated call could not, one eth_call per requirement"""
+        backend = EthCallBackend(self.eth_call, self.implementation_addresses)
+        return [backend.check(call) for call in calls]
+
+
+def return_data_passes(return_data):
+    try:
+        return decode_bool(return_data)
+    except AbiDecodingError:
+        return False
@@ -0,0 +1,144 @@
+"""
+Requirement result cache
+
+Wraps a backend with an LRU cache of requirement answers keyed by
+(implementation address, method, argument). Answers like `isVault(0x...)`
+rarely change between blocks and screening traffic keeps asking about the same
+few hundred vaults and tokens, so most checks never reach the node.
+
+Entries are dropped when a new block is reported through `set_block`, after
+`ttl` seconds, or least recently used first once the cache grows past
+`max_bytes`.
+"""
+from collections import OrderedDict
+from dataclasses import dataclass
+import threading
+import time
+
+from .backends import Backend
+
+DEFAULT_MAX_BYTES = 16 * 1024 * 1024
+# Approximate size of an entry besides its argument bytes: key tuple, result
+# tuple, OrderedDict node and the shared method name strings
+ENTRY_OVERHEAD = 256
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    invalidations: int = 0
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+def result_key(call, implementation_addresses):
+    """(implementation address or id, method, param type, argument) of a requirement call"""
+    implementation = implementation_addresses.get(call.implementation_id, call.implementation_id)
+    return (implementation.lower(), call.method_name, call.param_type, bytes(call.argument))
+
+
+def entry_size(key):
+    return ENTRY_OVERHEAD + len(key[3])
+
+
+class CachedBackend(Backend):
+    """
+    Serve repeated requirement checks from memory
+
+    `implementation_addresses` maps implementation ids to addresses so that
+    answers are keyed by the contract that gave them; ids without an address
+    are keyed by id. `ttl` is in seconds (None keeps entries until the block
+    changes or they are evicted).
+    """
+
+    def __init__(self, backend, implementation_addresses=None, max_bytes=DEFAULT_MAX_BYTES, ttl=None, clock=time.monotonic):
+        self.backend = backend
+        self.implementation_addresses = dict(implementation_addresses or {})
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.clock = clock
+        self.block = None
+        self.entries = OrderedDict()  # Key to (result, expires_at)
+        self.size = 0
+        self.stats = CacheStats()
+        self.lock = threading.Lock()
+
+    def key(self, call):
+        return result_key(call, self.implementation_addresses)
+
+    def set_block(self, block_number):
+        """Report the current block, clearing the cache when it moved"""
+        with self.lock:
+            if block_number == self.block:
+                return
+            self.block = block_number
+            if self.entries:
+                self.stats.invalidations += 1
+            self.entries.clear()
+            self.size = 0
+
+    def check(self, call):
+        return self.check_many([call])[0]
+
+    def check_many(self, calls):
+        keys = [self.key(call) for call in calls]
+        results = {}
+        missing = {}
+        with self.lock:
+            block = self.block
+            now = self.clock()
+            for key, call in zip(keys, calls):
+                if key in results or key in missing:
+                    continue
+                result = self.lookup(key, now)
+                if result is None:
+                    missing[key] = call
+                else:
+                    results[key] = result
+        if missing:
+            answers = self.backend.check_many(list(missing.values()))
+            with self.lock:
+                # Answers read while the block moved may be older than the new block
+                stale = self.block != block
+                expires_at = None if self.ttl is None else self.clock() + self.ttl
+                for key, answer in zip(missing, answers):
+                    results[key] = answer
+                    if not stale:
+                        self.store(key, answer, expires_at)
+        return [results[key] for key in keys]
+
+    def lookup(self, key, now):
+        """Return the cached answer or None, counting hits and misses (lock held)"""
+        entry = self.entries.get(key)
+        if entry is not None and entry[1] is not None and entry[1] <= now:
+            self.remove(key)
+            entry = None
+        if entry is None:
+            self.stats.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.stats.hits += 1
+        return entry[0]
+
+    def store(self, key, result, expires_at):
+        if key in self.entries:
+            self.remove(key)
+        self.entries[key] = (result, expires_at)
+        self.size += entry_size(key)
+        while self.size > self.max_bytes and self.entries:
+            self.remove(next(iter(self.entries)))
+            self.stats.evictions += 1
+
+    def remove(self, key):
+        del self.entries[key]
+        self.size -= entry_size(key)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
@@ -0,0 +1,248 @@
+"""
+JSON-RPC batch transport
+
+Pending calls are packed into JSON-RPC batch arrays instead of one HTTP
+request each. The batch size adapts to the provider:
+
+- it grows by a quarter after a full batch answered within `target_latency`;
+- it shrinks by a quarter after a slow batch;
+- it halves after a provider error (HTTP failure, batch rejected, rate limit).
+
+Calls that fail transiently inside an otherwise good batch (rate limits,
+internal errors, missing responses) are retried in a later batch, up to
+`max_retries` times. Reverts are returned to the caller as `RpcError`s, other
+final errors and exhausted retries as `ProviderError`s. Every batch is
+recorded as a `BatchTiming` in `timings`.
+
+    transport = RpcBatchTransport(http_send_batch(url))
+    results = transport.call_many([("eth_call", [{"to": ..., "data": ...}, "latest"]), ...])
+"""
+from collections import deque
+from dataclasses import dataclass
+import json
+import time
+import urllib.request
+
+from .abi import AbiDecodingError, decode_bool, to_bytes
+from .backends import Backend, ProviderError, requirement_calldata
+
+DEFAULT_BATCH_SIZE = 20
+MAX_BATCH_SIZE = 1000
+DEFAULT_TARGET_LATENCY = 1.0  # Seconds per batch
+DEFAULT_MAX_RETRIES = 3
+TIMING_HISTORY = 100
+
+# Error codes worth retrying: limit exceeded, internal error
+TRANSIENT_ERROR_CODES = {-32005, -32603}
+TRANSIENT_ERROR_MESSAGES = ("rate limit", "too many requests", "timeout", "timed out", "try again")
+REVERT_ERROR_CODE = 3
+
+
+class RpcError(ValueError):
+    """JSON-RPC revert, a failed requirement for backends"""
+    pass
+
+
+@dataclass(frozen=True)
+class BatchTiming:
+    size: int
+    seconds: float
+    retried: int  # Calls sent again in a later batch
+    failed: bool  # The whole batch was rejected
+
+
+def is_transient(error):
+    if error.get("code") in TRANSIENT_ERROR_CODES:
+        return True
+    message = str(error.get("message", "")).lower()
+    return any(fragment in message for fragment in TRANSIENT_ERROR_MESSAGES)
+
+
+def is_revert(error):
+    return error.get("code") == REVERT_ERROR_CODE or "revert" in str(error.get("message", "")).lower()
+
+
+class PendingCall:
+    def __init__(self, method, params):
+        self.method = method
+        self.params = params
+        self.attempts = 0
+        self.result = None
+        self.error = None
+
+    def payload(self, request_id):
+        return {"jsonrpc": "2.0", "id": request_id, "method": self.method, "params": self.params}
+
+    def outcome(self):
+        return self.error if self.error is not None else self.result
+
+
+class BatchController:
+    """Batch sizing, response matching and retry bookkeeping shared by the sync and async transports"""
+
+    def __init__(
+        self, batch_size=DEFAULT_BATCH_SIZE, min_batch_size=1, max_batch_size=MAX_BATCH_SIZE,
+        target_latency=DEFAULT_TARGET_LATENCY, max_retries=DEFAULT_MAX_RETRIES,
+    ):
+        self.batch_size = batch_size
+        self.min_batch_size = min_batch_size
+        self.max_batch_size = max_batch_size
+        self.target_latency = target_latency
+        self.max_retries = max_retries
+        self.timings = deque(maxlen=TIMING_HISTORY)
+
+    def payload(self, batch):
+        return json.dumps([call.payload(idx) for idx, call in enumerate(batch)]).encode()
+
+    def settle(self, batch, responses, seconds):
+        """
+        Resolve the calls of a batch from the provider's response array and
+        return the calls to send again
+        """
+        if not isinstance(responses, list):
+            # Some providers answer a rejected batch with a single error object
+            return self.fail(batch, RpcError("Batch rejected: " + json.dumps(responses)), seconds)
+        by_id = {response.get("id"): response for response in responses if isinstance(response, dict)}
+        retry = []
+        throttled = False
+        for idx, call in enumerate(batch):
+            call.attempts += 1
+            response = by_id.get(idx)
+            if response is not None and "error" not in response:
+                call.result = response.get("result")
+                continue
+            error = response["error"] if response is not None else {"message": "missing response"}
+            if not isinstance(error, dict):
+                error = {"message": str(error)}
+            transient = response is None or is_transient(error)
+            throttled = throttled or (response is not None and transient)
+            message = call.method + ": " + str(error.get("message", error))
+            if transient and call.attempts <= self.max_retries:
+                retry.append(call)
+            elif is_revert(error):
+                call.error = RpcError(message)
+            else:
+                call.error = ProviderError(message)
+        self.record(BatchTiming(len(batch), seconds, len(retry), False), throttled)
+        return retry
+
+    def fail(self, batch, error, seconds):
+        """Handle a batch the provider rejected as a whole; raise once retries run out"""
+        for call in batch:
+            call.attempts += 1
+        exhausted = any(call.attempts > self.max_retries for call in batch)
+        self.record(BatchTiming(len(batch), seconds, 0 if exhausted else len(batch), True), True)
+        if exhausted:
+            raise ProviderError(str(error) or type(error).__name__) from error
+        return list(batch)
+
+    def record(self, timing, throttled):
+        self.timings.append(timing)
+        if throttled:
+            self.batch_size = max(self.min_batch_size, self.batch_size // 2)
+        elif timing.seconds > self.target_latency:
+            self.batch_size = max(self.min_batch_size, self.batch_size * 3 // 4)
+        elif timing.size >= self.batch_size:
+            self.batch_size = min(self.max_batch_size, self.batch_size + max(1, self.batch_size // 4))
+
+    def summary(self):
+        seconds = [timing.seconds for timing in self.timings]
+        return {
+            "batch_size": self.batch_size,
+            "batches": len(seconds),
+            "mean_batch_seconds": sum(seconds) / len(seconds) if seconds else None,
+            "max_batch_seconds": max(seconds) if seconds else None,
+            "retried": sum(timing.retried for timing in self.timings),
+        }
+
+
+##########################################
+# Sync transport
+##########################################
+def http_send_batch(url, timeout=60):
+    """Return a `send_batch(payload)` posting a batch to a node and returning the decoded response"""
+    def send_batch(payload):
+        request = urllib.request.Request(url, data=payload, headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return json.load(response)
+    return send_batch
+
+
+class RpcBatchTransport:
+    """
+    Blocking batch transport
+
+    `send_batch` takes the encoded batch and returns the decoded response,
+    raising OSError on transport failures (see `http_send_batch`).
+    """
+
+    def __init__(self, send_batch, controller=None, clock=time.monotonic):
+        self.send_batch = send_batch
+        self.controller = controller or BatchController()
+        self.clock = clock
+
+    def call_many(self, calls):
+        """
+        Results of (method, params) pairs in order; calls that failed hold an
+        RpcError (reverts) or a ProviderError instead of a result. Raises
+        ProviderError once a whole batch fails `max_retries` times.
+        """
+        pending = [PendingCall(method, params) for method, params in calls]
+        queue = deque(pending)
+        while queue:
+            batch = [queue.popleft() for _ in range(min(self.controller.batch_size, len(queue)))]
+            start = self.clock()
+            try:
+                responses = self.send_batch(self.controller.payload(batch))
+            except (OSError, ValueError) as error:
+                retry = self.controller.fail(batch, error, self.clock() - start)
+            else:
+                retry = self.controller.settle(batch, responses, self.clock() - start)
+            queue.extend(retry)
+        return [call.outcome() for call in pending]
+
+    def call(self, method, params):
+        result = self.call_many([(method, params)])[0]
+        if isinstance(result, (RpcError, ProviderError)):
+            raise result
+        return result
+
+
+class BatchEthCallBackend(Backend):
+    """
+    EthCallBackend sending `check_many` as batched eth_calls
+
+    Reverts and malformed return data count as a failed requirement, provider
+    failures raise ProviderError.
+    """
+
+    def __init__(self, transport, implementation_addresses, block="latest"):
+        self.transport = transport
+        self.implementation_addresses = dict(implementation_addresses)
+        self.block = block
+
+    def check(self, call):
+        return self.check_many([call])[0]
+
+    def check_many(self, calls):
+        unique_calls = [call for call in dict.fromkeys(calls) if call.implementation_id in self.implementation_addresses]
+        results = self.transport.call_many([
+            ("eth_call", [{
+                "to": self.implementation_addresses[call.implementation_id],
+                "data": "0x" + requirement_calldata(call).hex(),
+            }, self.block])
+            for call in unique_calls
+        ])
+        passed = {call: result_passes(result) for call, result in zip(unique_calls, results)}
+        return [passed.get(call, False) for call in calls]
+
+
+def result_passes(result):
+    if isinstance(result, ProviderError):
+        raise result
+    if isinstance(result, RpcError):
+        return False
+    try:
+        return decode_bool(to_bytes(result))
+    except (AbiDecodingError, TypeError, ValueError):
+        return False
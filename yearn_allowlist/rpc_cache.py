@@ -0,0 +1,311 @@
+"""
+Record/replay cache for JSON-RPC responses and contract ABIs
+
+Forked runs spend most of their startup fetching state from the upstream node
+and ABIs from the block explorer. The cache sits in front of both:
+
+- `serve` runs a JSON-RPC proxy between the fork client (ganache/anvil) and the
+  upstream node. Requests are keyed by chain id, pinned block and the request
+  itself, so a fork always starts from the same block and every response can be
+  replayed without network access.
+- `cached_contract` replaces `Contract(address)` and serves ABIs from the cache.
+
+Responses are stored in a content-addressed `ContentStore`; identical responses
+(e.g. the many `eth_call`s returning true) are stored once.
+
+    python -m yearn_allowlist.rpc_cache record --upstream <node url> --port 8546
+    python -m yearn_allowlist.rpc_cache replay --port 8546
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import urllib.request
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".rpc_cache")
+MODES = ("record", "replay")
+
+# Block tags resolved to the pinned block before keying and forwarding
+BLOCK_TAGS = ("latest", "pending", "safe", "finalized")
+
+# Methods whose response only depends on their params and the pinned block
+CACHEABLE_METHODS = {
+    "eth_blockNumber",
+    "eth_call",
+    "eth_chainId",
+    "eth_estimateGas",
+    "eth_getBalance",
+    "eth_getBlockByHash",
+    "eth_getBlockByNumber",
+    "eth_getCode",
+    "eth_getLogs",
+    "eth_getProof",
+    "eth_getStorageAt",
+    "eth_getTransactionByHash",
+    "eth_getTransactionCount",
+    "eth_getTransactionReceipt",
+    "net_version",
+    "web3_clientVersion",
+}
+
+
+class CacheMissError(LookupError):
+    pass
+
+
+def canonical_json(value):
+    return json.dumps(value, sort_keys=True, separators=(",", ":"))
+
+
+def digest(value):
+    return hashlib.sha256(canonical_json(value).encode()).hexdigest()
+
+
+##########################################
+# Storage
+##########################################
+class ContentStore:
+    """
+    Content-addressed JSON store
+
+    Objects live in objects/<aa>/<digest>.json; names (any JSON value) are
+    hashed and linked to an object digest in names/<aa>/<name digest>.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH):
+        self.path = path
+
+    def _file(self, kind, key, suffix=""):
+        return os.path.join(self.path, kind, key[:2], key + suffix)
+
+    def _write(self, file_path, content):
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(file_path))
+        with os.fdopen(fd, "w") as tmp_file:
+            tmp_file.write(content)
+        os.replace(tmp_path, file_path)
+
+    def put(self, value):
+        """Store a value and return its digest"""
+        value_digest = digest(value)
+        file_path = self._file("objects", value_digest, ".json")
+        if not os.path.exists(file_path):
+            self._write(file_path, canonical_json(value))
+        return value_digest
+
+    def get(self, value_digest):
+        file_path = self._file("objects", value_digest, ".json")
+        if not os.path.exists(file_path):
+            raise CacheMissError(value_digest)
+        with open(file_path, "r") as object_file:
+            return json.load(object_file)
+
+    def link(self, name, value):
+        self._write(self._file("names", digest(name)), self.put(value))
+
+    def lookup(self, name):
+        """Return the value linked to `name`, or raise CacheMissError"""
+        file_path = self._file("names", digest(name))
+        if not os.path.exists(file_path):
+            raise CacheMissError(canonical_json(name))
+        with open(file_path, "r") as name_file:
+            return self.get(name_file.read().strip())
+
+
+##########################################
+# JSON-RPC
+##########################################
+def pin_block_tags(params, block):
+    """Replace block tags in request params with the pinned block number"""
+    if isinstance(params, list):
+        return [pin_block_tags(param, block) for param in params]
+    if isinstance(params, dict):
+        return {key: pin_block_tags(value, block) for key, value in params.items()}
+    if params in BLOCK_TAGS:
+        return hex(block)
+    return params
+
+
+class RpcCache:
+    """
+    Answer JSON-RPC requests from a ContentStore
+
+    In "record" mode misses are sent upstream and stored; in "replay" mode
+    misses raise CacheMissError. `block` pins block tags; when recording without
+    a block the upstream head is pinned on the first request. The pinned block
+    and chain id are kept in the store so replays fork from the same block.
+    """
+
+    def __init__(self, store, mode, block=None):
+        if mode not in MODES:
+            raise ValueError("Unknown cache mode: " + str(mode))
+        self.store = store
+        self.mode = mode
+        self.block = block
+        self.chain_id = None
+        self.lock = threading.Lock()
+
+    def pin(self, send):
+        """Resolve the pinned block and chain id, once"""
+        with self.lock:
+            if self.chain_id is not None:
+                return
+            if self.mode == "replay":
+                manifest = self.store.lookup("manifest")
+                self.block = manifest["block"] if self.block is None else self.block
+                self.chain_id = manifest["chain_id"]
+                return
+            if self.block is None:
+                self.block = int(send("eth_blockNumber", [])["result"], 16)
+            self.chain_id = int(send("eth_chainId", [])["result"], 16)
+            self.store.link("manifest", {"block": self.block, "chain_id": self.chain_id})
+
+    def key(self, method, params):
+        return ["rpc", self.chain_id, self.block, method, params]
+
+    def request(self, method, params, send):
+        """
+        Answer a single request
+
+        `send(method, params)` performs the upstream request and returns the
+        response object without its id. Returns the response object.
+        """
+        self.pin(send)
+        if method == "eth_blockNumber":
+            return {"jsonrpc": "2.0", "result": hex(self.block)}
+        params = pin_block_tags(params or [], self.block)
+        if method not in CACHEABLE_METHODS:
+            if self.mode == "replay":
+                raise CacheMissError(method + " is not cacheable")
+            return send(method, params)
+        key = self.key(method, params)
+        try:
+            return self.store.lookup(key)
+        except CacheMissError:
+            if self.mode == "replay":
+                raise
+        response = send(method, params)
+        if "result" in response:
+            # Errors may be transient (rate limits, timeouts) and are not stored
+            self.store.link(key, response)
+        return response
+
+
+def http_send(url, timeout=60):
+    """Return a `send(method, params)` posting requests to a node"""
+    def send(method, params):
+        payload = json.dumps({"jsonrpc": "2.0", "id": 1, "method": method, "params": params}).encode()
+        request = urllib.request.Request(url, data=payload, headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            body = json.load(response)
+        body.pop("id", None)
+        return body
+    return send
+
+
+def handle_payload(cache, payload, send):
+    """Answer a JSON-RPC request object or batch, reporting failures as JSON-RPC errors"""
+    if isinstance(payload, list):
+        return [handle_payload(cache, item, send) for item in payload]
+    try:
+        response = dict(cache.request(payload["method"], payload.get("params"), send))
+    except CacheMissError as error:
+        response = {"jsonrpc": "2.0", "error": {"code": -32000, "message": "rpc cache miss: " + str(error)}}
+    except Exception as error:
+        # Unreachable upstream, HTTP errors and malformed upstream responses
+        response = {"jsonrpc": "2.0", "error": {"code": -32603, "message": "upstream request failed: " + repr(error)}}
+    response["id"] = payload.get("id")
+    return response
+
+
+def make_server(cache, send, host="127.0.0.1", port=8546):
+    """Build an HTTP JSON-RPC proxy answering from `cache`"""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            body = json.dumps(handle_payload(cache, payload, send)).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return ThreadingHTTPServer((host, port), Handler)
+
+
+def serve(cache, send, host="127.0.0.1", port=8546):
+    server = make_server(cache, send, host, port)
+    print("RPC cache (" + cache.mode + ") listening on http://" + host + ":" + str(server.server_address[1]))
+    server.serve_forever()
+
+
+##########################################
+# ABIs
+##########################################
+def environment_cache():
+    """
+    (mode, store) configured by the RPC_CACHE and RPC_CACHE_DIR environment
+    variables, or (None, None) if caching is disabled
+    """
+    mode = os.environ.get("RPC_CACHE")
+    if not mode:
+        return None, None
+    if mode not in MODES:
+        raise ValueError("RPC_CACHE must be one of " + ", ".join(MODES))
+    return mode, ContentStore(os.environ.get("RPC_CACHE_DIR", DEFAULT_CACHE_PATH))
+
+
+def cached_contract(address):
+    """
+    `Contract(address)` with ABIs served from the cache
+
+    Without RPC_CACHE this is `Contract(address)`. With RPC_CACHE=record ABIs
+    fetched by brownie are stored; with RPC_CACHE=replay they are only read from
+    the cache and the block explorer is never used.
+    """
+    from brownie import Contract, chain
+
+    mode, store = environment_cache()
+    if mode is None:
+        return Contract(address)
+    key = ["abi", chain.id, str(address).lower()]
+    try:
+        entry = store.lookup(key)
+    except CacheMissError:
+        if mode == "replay":
+            raise
+        contract = Contract(address)
+        store.link(key, {"name": contract._name, "abi": contract.abi})
+        return contract
+    return Contract.from_abi(entry["name"], address, entry["abi"])
+
+
+def main(args=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Record/replay JSON-RPC proxy")
+    parser.add_argument("mode", choices=MODES)
+    parser.add_argument("--upstream", help="Node URL (required to record)")
+    parser.add_argument("--block", type=int, help="Block to pin (default: upstream head when recording)")
+    parser.add_argument("--cache-dir", default=os.environ.get("RPC_CACHE_DIR", DEFAULT_CACHE_PATH))
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8546)
+    args = parser.parse_args(args)
+    if args.mode == "record" and not args.upstream:
+        parser.error("--upstream is required to record")
+
+    def offline_send(method, params):
+        raise CacheMissError(method)
+
+    send = http_send(args.upstream) if args.upstream and args.mode == "record" else offline_send
+    serve(RpcCache(ContentStore(args.cache_dir), args.mode, args.block), send, args.host, args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Representative calldata for configured conditions
+
+`samples` map a requirement method name to a value that passes it, for
+example {"isVault": <vault address>}. Parameters without a requirement are
+filled with zero values.
+"""
+from .abi import encode_call
+
+ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
+ZERO_BYTES32 = b"\x00" * 32
+
+# Requirement methods taking a list, keyed to the element requirement
+LIST_REQUIREMENTS = {"areMarkets": "isMarket"}
+
+
+def default_value(param_type):
+    if param_type.endswith("[]"):
+        return []
+    if param_type == "address":
+        return ZERO_ADDRESS
+    if param_type == "bool":
+        return False
+    if param_type in ("bytes", "string"):
+        return b""
+    if param_type.startswith("bytes"):
+        return ZERO_BYTES32
+    return 0
+
+
+def sample_value(method_name, samples):
+    if method_name in LIST_REQUIREMENTS:
+        return [samples[LIST_REQUIREMENTS[method_name]]]
+    return samples[method_name]
+
+
+def missing_samples(condition, samples):
+    """Return the sample names a condition's requirements need but `samples` lacks"""
+    names = [LIST_REQUIREMENTS.get(requirement.method_name, requirement.method_name) for requirement in condition.requirements]
+    return sorted(set(name for name in names if name not in samples))
+
+
+def has_samples(condition, samples):
+    """Return True if every requirement of a condition has a sample value"""
+    return missing_samples(condition, samples) == []
+
+
+def condition_calldata(condition, samples, invalid_requirement=None):
+    """
+    Build (target, calldata) passing every requirement of a condition
+
+    If `invalid_requirement` is given, that requirement's value is replaced with
+    a zero value so the requirement (and the condition) fails.
+    """
+    target = ZERO_ADDRESS
+    values = [default_value(param_type) for param_type in condition.param_types]
+    for requirement in condition.requirements:
+        if requirement is invalid_requirement:
+            continue
+        value = sample_value(requirement.method_name, samples)
+        if requirement.kind == "target":
+            target = value
+        else:
+            values[requirement.param_idx] = value
+    if invalid_requirement is not None and invalid_requirement.kind == "param":
+        param_type = condition.param_types[invalid_requirement.param_idx]
+        values[invalid_requirement.param_idx] = [ZERO_ADDRESS] if param_type.endswith("[]") else default_value(param_type)
+    return target, encode_call(condition.method_name, condition.param_types, values)
+
+
+def invalid_condition_calldata(condition, samples):
+    """Yield (requirement, target, calldata) failing each requirement in turn"""
+    for requirement in condition.requirements:
+        target, data = condition_calldata(condition, samples, requirement)
+        yield requirement, target, data
+
+
+def brownie_samples(allowlist_addresses):
+    """
+    Resolve sample values on the active brownie network
+
+    `allowlist_addresses` is the content of configuration/chains/<id>/addresses.json.
+    Requirements whose data is not available on the chain are left out.
+    """
+    from brownie import Contract, ZERO_ADDRESS as BROWNIE_ZERO_ADDRESS
+    from brownie.exceptions import VirtualMachineError
+
+    samples = {
+        "isPartnerTracker": "0x8ee392a4787397126C163Cb9844d7c447da419D8",
+        "isCRV": "0xD533a949740bb3306d119CC777fa900bA034cd52",
+        "isYveCRV": "0xc5bDdf9843308380375a611c18B50Fb9341f502A",
+    }
+    address_keys = {
+        "isZapInContract": "zap_in_to_vault_address",
+        "isZapOutContract": "zap_out_of_vault_address",
+        "isMigratorContract": "migrator_address_standard",
+        "isPickleJarContract": "pickle_jar_address",
+    }
+    for method_name, key in address_keys.items():
+        if key in allowlist_addresses:
+            samples[method_name] = allowlist_addresses[key]
+
+    addresses_provider = Contract(allowlist_addresses["addresses_provider_address"])
+
+    def address_by_id(id):
+        try:
+            address = addresses_provider.addressById(id)
+        except VirtualMachineError:
+            return None
+        return None if address == BROWNIE_ZERO_ADDRESS else address
+
+    registry_adapter_address = address_by_id("REGISTRY_ADAPTER_V2_VAULTS")
+    if registry_adapter_address is not None:
+        registry = Contract(Contract(registry_adapter_address).registryAddress())
+        vault = Contract(registry.releases(0))
+        samples["isVault"] = vault.address
+        samples["isVaultUnderlyingToken"] = vault.token()
+
+    iron_bank_adapter_address = address_by_id("REGISTRY_ADAPTER_IRON_BANK")
+    if iron_bank_adapter_address is not None:
+        registry_adapter = Contract(iron_bank_adapter_address)
+        market = Contract(registry_adapter.assetsAddresses()[0])
+        samples["isMarket"] = market.address
+        samples["isMarketUnderlyingToken"] = market.underlying()
+        samples["isComptroller"] = registry_adapter.comptrollerAddress()
+
+    ve_yfi_address = address_by_id("VEYFI")
+    if ve_yfi_address is not None:
+        ve_yfi = Contract(ve_yfi_address)
+        samples["isVotingEscrow"] = ve_yfi_address
+        samples["isUnderlying"] = ve_yfi.token()
+        samples["isRewardPool"] = ve_yfi.reward_pool()
+    return samples
@@ -0,0 +1,609 @@
+"""
+Screening service
+
+An asyncio HTTP service answering "would the allowlist accept this calldata"
+for many chains and origins at once. Conditions come from
+configuration/chains/<id> (one configuration directory per origin, named by
+its protocol.json), implementation addresses are resolved on-chain through
+the allowlist registry and requirements are evaluated concurrently as
+eth_calls, packed into JSON-RPC batches over a pool of keep-alive connections
+per node. Standard library only.
+
+    python -m yearn_allowlist.service --rpc 1=<node url> --rpc 250=<node url> --port 8080
+
+    POST /screen        {"chain_id": 250, "origin": "yearn.finance", "target": "0x...", "calldata": "0x..."}
+                        -> {"allowed": true, "condition": "MARKET_SUPPLY", "stale": false}
+    POST /screen/batch  {"requests": [<screen request>, ...]}  -> {"results": [<screen result>, ...]}
+    GET  /health
+"""
+import asyncio
+import json
+import ssl
+import time
+import urllib.parse
+
+from .abi import AbiDecodingError, decode_address, decode_bool, encode_call, read_word, to_bytes
+from .backends import ProviderError, requirement_calldata
+from .conditions import CONFIGURATION_PATH
+from .config import ADDRESS_PATTERN, ConfigurationError, load_chain_config, load_protocol_config
+from .engine import Validator
+from .rpc_batch import BatchController, PendingCall, RpcError
+from .single_flight import SingleFlight
+from .warmup import REVALIDATION_ATTEMPTS, REVALIDATION_BACKOFF, load_warm_states, stale_flags
+
+ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
+DEFAULT_MAX_CONNECTIONS = 16  # Per node
+DEFAULT_TIMEOUT = 30
+DEFAULT_IMPLEMENTATIONS_TTL = 300  # Seconds before implementation addresses are resolved again
+MAX_BODY_SIZE = 8 * 1024 * 1024
+
+
+class ScreeningError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+##########################################
+# HTTP/1.1
+##########################################
+async def read_headers(reader):
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if not line:
+            raise ConnectionError("Connection closed in headers")
+        if line in (b"\r\n", b"\n"):
+            return headers
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+
+async def read_body(reader, headers, max_size=MAX_BODY_SIZE):
+    if headers.get("transfer-encoding", "").lower() == "chunked":
+        chunks = []
+        size = 0
+        while True:
+            chunk_size = int((await reader.readline()).split(b";")[0], 16)
+            if chunk_size == 0:
+                await read_headers(reader)  # Trailers
+                return b"".join(chunks)
+            size += chunk_size
+            if size > max_size:
+                raise ValueError("Body too large")
+            chunks.append(await reader.readexactly(chunk_size))
+            await reader.readexactly(2)
+    length = int(headers.get("content-length", 0))
+    if length > max_size:
+        raise ValueError("Body too large")
+    return await reader.readexactly(length)
+
+
+def keeps_alive(version, headers):
+    connection = headers.get("connection", "").lower()
+    return connection == "keep-alive" if version == "HTTP/1.0" else connection != "close"
+
+
+##########################################
+# JSON-RPC client
+##########################################
+class AsyncRpcClient:
+    """
+    JSON-RPC over a pool of up to `max_connections` keep-alive HTTP connections
+
+    Requests made in the same event loop iteration are packed into JSON-RPC
+    batches sized by `batches` (a BatchController, see rpc_batch), and
+    transient failures are retried in later batches. Batches beyond the pool
+    size wait for a free connection. A request on a
+    reused connection the node has since closed is retried on another one.
+    Identical eth_calls (target, calldata, block) in flight at the same time
+    share one request, so bursts of the same requirement from concurrent
+    screenings cost a single RPC.
+    """
+
+    def __init__(self, url, max_connections=DEFAULT_MAX_CONNECTIONS, timeout=DEFAULT_TIMEOUT, batches=None):
+        parsed = urllib.parse.urlsplit(url)
+        if parsed.scheme not in ("http", "https"):
+            raise ValueError("Unsupported RPC url: " + url)
+        self.url = url
+        self.host = parsed.hostname
+        self.port = parsed.port or (443 if parsed.scheme == "https" else 80)
+        self.path = (parsed.path or "/") + ("?" + parsed.query if parsed.query else "")
+        self.ssl = ssl.create_default_context() if parsed.scheme == "https" else None
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.idle = []
+        self.slots = None  # Created in the running loop
+        self.batches = batches or BatchController()
+        self.pending = []
+        self.flush_scheduled = False
+        self.flights = SingleFlight()
+
+    async def post(self, body):
+        if self.slots is None:
+            self.slots = asyncio.Semaphore(self.max_connections)
+        async with self.slots:
+            while self.idle:
+                connection = self.idle.pop()
+                try:
+                    return await self.exchange(connection, body)
+                except ConnectionError:
+                    continue
+            connection = await asyncio.wait_for(
+                asyncio.open_connection(self.host, self.port, ssl=self.ssl), self.timeout
+            )
+            return await self.exchange(connection, body)
+
+    async def exchange(self, connection, body):
+        reader, writer = connection
+        try:
+            writer.write(
+                ("POST " + self.path + " HTTP/1.1\r\nHost: " + self.host + "\r\n"
+                 "Content-Type: application/json\r\nContent-Length: " + str(len(body)) + "\r\n\r\n").encode()
+                + body
+            )
+            status, headers, response = await asyncio.wait_for(self.read_response(reader), self.timeout)
+        except asyncio.IncompleteReadError:
+            writer.close()
+            raise ConnectionError("Connection closed by node mid-response")
+        except BaseException:
+            writer.close()
+            raise
+        if keeps_alive("HTTP/1.1", headers):
+            self.idle.append(connection)
+        else:
+            writer.close()
+        if status != 200:
+            raise OSError("Node answered HTTP " + str(status))
+        return response
+
+    async def read_response(self, reader):
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionError("Connection closed by node")
+        status = int(status_line.split()[1])
+        headers = await read_headers(reader)
+        return status, headers, await read_body(reader, headers)
+
+    async def request(self, method, params):
+        call = PendingCall(method, params)
+        call.future = asyncio.get_running_loop().create_future()
+        self.enqueue([call])
+        return await call.future
+
+    def enqueue(self, calls):
+        self.pending.extend(calls)
+        if not self.flush_scheduled:
+            self.flush_scheduled = True
+            asyncio.get_running_loop().call_soon(self.flush)
+
+    def flush(self):
+        self.flush_scheduled = False
+        pending = [call for call in self.pending if not call.future.done()]  # Skips cancelled requests
+        self.pending = []
+        while pending:
+            batch, pending = pending[:self.batches.batch_size], pending[self.batches.batch_size:]
+            asyncio.ensure_future(self.send_batch(batch))
+
+    async def send_batch(self, batch):
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        try:
+            try:
+                responses = json.loads(await self.post(self.batches.payload(batch)))
+            except Exception as error:
+                retry = self.batches.fail(batch, error, loop.time() - start)
+            else:
+                retry = self.batches.settle(batch, responses, loop.time() - start)
+        except Exception as error:
+            # Out of retries: every waiter gets the error, none is left hanging
+            for call in batch:
+                if not call.future.done():
+                    call.future.set_exception(error)
+            return
+        for call in batch:
+            if call in retry or call.future.done():
+                continue
+            if call.error is not None:
+                call.future.set_exception(call.error)
+            else:
+                call.future.set_result(call.result)
+        if retry:
+            self.enqueue(retry)
+
+    async def eth_call(self, to_address, calldata, block="latest"):
+        params = [{"to": to_address.lower(), "data": "0x" + calldata.hex()}, block]
+        result = await self.flights.run((params[0]["to"], params[0]["data"], block), lambda: self.request("eth_call", params))
+        try:
+            return to_bytes(result)
+        except (TypeError, ValueError):
+            raise ProviderError("Malformed eth_call result: " + json.dumps(result))
+
+    def close(self):
+        for _, writer in self.idle:
+            writer.close()
+        self.idle = []
+
+
+class AsyncEthCallBackend:
+    """
+    Async counterpart of EthCallBackend
+
+    `check_many` sends the deduplicated calls concurrently. Only reverts and
+    empty return data count as a failed requirement, anything else the node
+    answers is raised (and the screening answered 502).
+    """
+
+    def __init__(self, client, implementation_addresses, block="latest"):
+        self.client = client
+        self.implementation_addresses = dict(implementation_addresses)
+        self.block = block
+
+    async def check(self, call):
+        implementation_address = self.implementation_addresses.get(call.implementation_id)
+        if implementation_address is None:
+            return False
+        try:
+            return_data = await self.client.eth_call(implementation_address, requirement_calldata(call), self.block)
+        except RpcError:
+            return False
+        return len(return_data) > 0 and decode_bool(return_data)
+
+    async def check_many(self, calls):
+        unique_calls = list(dict.fromkeys(calls))
+        results = dict(zip(unique_calls, await asyncio.gather(*[self.check(call) for call in unique_calls])))
+        return [results[call] for call in calls]
+
+
+##########################################
+# Screening
+##########################################
+class Screener:
+    """
+    Screens calldata for one origin on one chain
+
+    With a `warm_state` (see warmup), its answers are used until it is
+    revalidated and flagged stale. They are dropped as soon as the resolved
+    implementation addresses differ from the ones the warm state is keyed by.
+    """
+
+    def __init__(
+        self, chain_config, origin_name, client, implementations_ttl=DEFAULT_IMPLEMENTATIONS_TTL,
+        clock=time.monotonic, warm_state=None,
+    ):
+        self.chain_config = chain_config
+        self.origin_name = origin_name
+        self.client = client
+        self.warm_state = warm_state
+        self.validator = Validator(chain_config.conditions, None)
+        self.implementation_ids = sorted(set(condition.implementation_id for condition in chain_config.conditions))
+        self.implementations_ttl = implementations_ttl
+        self.clock = clock
+        self.backend = None
+        self.resolved_at = None
+        self.resolving = None
+
+    async def address_call(self, to_address, method_name, value):
+        return decode_address(read_word(await self.client.eth_call(to_address, encode_call(method_name, ["string"], [value])), 0))
+
+    async def resolve_implementations(self):
+        """Implementation addresses the origin's allowlist has set, by id"""
+        allowlist_address = await self.address_call(
+            self.chain_config.allowlist_registry_address, "allowlistAddressByOriginName", self.origin_name
+        )
+        if allowlist_address == ZERO_ADDRESS:
+            raise ScreeningError(
+                "Origin " + self.origin_name + " is not registered on chain " + str(self.chain_config.chain_id), 404
+            )
+        addresses = await asyncio.gather(*[
+            self.address_call(allowlist_address, "implementationById", implementation_id)
+            for implementation_id in self.implementation_ids
+        ])
+        return {
+            implementation_id: address for implementation_id, address in zip(self.implementation_ids, addresses)
+            if address != ZERO_ADDRESS
+        }
+
+    async def current_backend(self):
+        if self.backend is not None and self.clock() - self.resolved_at < self.implementations_ttl:
+            return self.backend
+        # Concurrent requests share one resolution
+        if self.resolving is None:
+            self.resolving = asyncio.ensure_future(self.resolve_implementations())
+        resolving = self.resolving
+        try:
+            implementation_addresses = await resolving
+        finally:
+            if self.resolving is resolving:
+                self.resolving = None
+        if self.backend is None or self.backend.implementation_addresses != implementation_addresses:
+            self.backend = AsyncEthCallBackend(self.client, implementation_addresses)
+            if self.warm_state is not None and not self.warm_state.matches(implementation_addresses, self.implementation_ids):
+                self.warm_state = None
+        self.resolved_at = self.clock()
+        return self.backend
+
+    async def matching_conditions(self, transactions):
+        """(condition or None, stale) of each transaction"""
+        candidates, calls = self.validator.candidate_calls(transactions)
+        results = {}
+        if self.warm_state is not None:
+            for call in calls:
+                answer = self.warm_state.warm_answer(call)
+                if answer is not None:
+                    results[call] = answer
+        live_calls = [call for call in calls if call not in results]
+        if live_calls:
+            backend = await self.current_backend()
+            if self.warm_state is None:
+                # Dropped while resolving: its answers were for other implementations
+                results = {}
+                live_calls = calls
+            answers = await backend.check_many(live_calls)
+            results.update(zip(live_calls, answers))
+            if self.warm_state is not None:
+                self.warm_state.observe(live_calls, answers)
+        stale_calls = set(calls) - set(live_calls)
+        conditions = self.validator.select_conditions(candidates, results)
+        return list(zip(conditions, stale_flags(candidates, conditions, stale_calls)))
+
+
+def parse_screen_request(item):
+    """(chain_id, origin, target, calldata) of a request object"""
+    if not isinstance(item, dict):
+        raise ScreeningError("Expected a screening request object, got " + json.dumps(item))
+    try:
+        chain_id = int(item["chain_id"])
+        origin = str(item["origin"])
+        target = str(item["target"])
+        calldata = to_bytes(item["calldata"])
+    except (KeyError, TypeError, ValueError) as error:
+        raise ScreeningError("Invalid screening request " + json.dumps(item) + ": " + str(error))
+    if not ADDRESS_PATTERN.match(target):
+        raise ScreeningError("Invalid target address: " + target)
+    return chain_id, origin, target.lower(), calldata
+
+
+class ScreeningService:
+    """
+    Screeners for every (chain, origin) pair, created on first use
+
+    `clients` maps chain ids to AsyncRpcClients. Each configuration path holds
+    the conditions of the origin named in its protocol.json. `warm_states`
+    maps (chain id, origin) pairs to WarmStates, revalidated in the background
+    once the service starts (retried `revalidation_attempts` times with
+    exponential backoff) and saved when it closes.
+    """
+
+    def __init__(
+        self, clients, configuration_paths=(CONFIGURATION_PATH,), implementations_ttl=DEFAULT_IMPLEMENTATIONS_TTL,
+        warm_states=None, revalidation_attempts=REVALIDATION_ATTEMPTS, revalidation_backoff=REVALIDATION_BACKOFF,
+    ):
+        self.clients = dict(clients)
+        self.configuration_paths = {load_protocol_config(path).origin_name: path for path in configuration_paths}
+        self.implementations_ttl = implementations_ttl
+        self.warm_states = dict(warm_states or {})
+        self.revalidation_attempts = revalidation_attempts
+        self.revalidation_backoff = revalidation_backoff
+        self.revalidations = {}
+        self.screeners = {}
+
+    def screener(self, chain_id, origin):
+        key = (chain_id, origin)
+        if key not in self.screeners:
+            if chain_id not in self.clients:
+                raise ScreeningError("No RPC endpoint for chain " + str(chain_id), 404)
+            if origin not in self.configuration_paths:
+                raise ScreeningError("Unknown origin: " + origin, 404)
+            try:
+                chain_config = load_chain_config(chain_id, self.configuration_paths[origin])
+            except ConfigurationError as error:
+                raise ScreeningError("Chain " + str(chain_id) + " is not configured for " + origin + ": " + str(error), 404)
+            self.screeners[key] = Screener(
+                chain_config, origin, self.clients[chain_id], self.implementations_ttl,
+                warm_state=self.warm_states.get(key),
+            )
+        return self.screeners[key]
+
+    async def screen_many(self, items):
+        """One {"allowed", "condition", "stale"} result per request, screened per (chain, origin) group concurrently"""
+        requests = [parse_screen_request(item) for item in items]
+        groups = {}
+        for idx, (chain_id, origin, target, calldata) in enumerate(requests):
+            groups.setdefault((chain_id, origin), []).append((idx, (target, calldata)))
+        screeners = [self.screener(chain_id, origin) for chain_id, origin in groups]
+        group_conditions = await asyncio.gather(*[
+            screener.matching_conditions([transaction for _, transaction in group])
+            for screener, group in zip(screeners, groups.values())
+        ])
+        results = [None] * len(requests)
+        for group, conditions in zip(groups.values(), group_conditions):
+            for (idx, _), (condition, stale) in zip(group, conditions):
+                results[idx] = {
+                    "allowed": condition is not None,
+                    "condition": condition.id if condition else None,
+                    "stale": stale,
+                }
+        return results
+
+    async def revalidate(self, key):
+        """Revalidate a warm state, retrying failures; drop its warm answers if every attempt fails"""
+        state = self.warm_states[key]
+        for attempt in range(self.revalidation_attempts):
+            try:
+                await self.revalidate_at_head(key)
+                return
+            except Exception as error:
+                state.error = str(error) or type(error).__name__
+            if attempt + 1 < self.revalidation_attempts:
+                await asyncio.sleep(self.revalidation_backoff * 2 ** attempt)
+        state.expire("revalidation failed " + str(self.revalidation_attempts) + " times: " + state.error)
+
+    async def revalidate_at_head(self, key):
+        """Check the persisted results of a (chain, origin) pair again at the chain's current block"""
+        state = self.warm_states[key]
+        client = self.clients[state.chain_id]
+        screener = self.screener(*key)
+        await screener.current_backend()
+        if screener.warm_state is not state:
+            state.expire("implementations changed since the snapshot")
+            return
+        block = int(await client.request("eth_blockNumber", []), 16)
+        calls = state.revalidation_calls()
+        backend = AsyncEthCallBackend(client, state.implementation_addresses, hex(block))
+        state.finish_revalidation(block, calls, await backend.check_many(calls))
+
+    def start_revalidation(self):
+        for key, state in self.warm_states.items():
+            if state.stale and state.chain_id in self.clients and state.origin_name in self.configuration_paths:
+                self.revalidations[key] = asyncio.ensure_future(self.revalidate(key))
+        return self.revalidations
+
+    ##########################################
+    # HTTP
+    ##########################################
+    async def route(self, method, path, body):
+        """(status, response object) of an HTTP request"""
+        if method == "GET" and path == "/health":
+            return 200, {
+                "status": "ok",
+                "chains": sorted(self.clients),
+                "origins": sorted(self.configuration_paths),
+                "rpc": {
+                    str(chain_id): dict(vars(client.flights.stats), **client.batches.summary())
+                    for chain_id, client in sorted(self.clients.items())
+                },
+                "warm": {
+                    str(chain_id) + "/" + origin: self.warm_status((chain_id, origin))
+                    for chain_id, origin in sorted(self.warm_states)
+                },
+            }
+        if method != "POST" or path not in ("/screen", "/screen/batch"):
+            return 404, {"error": "Not found: " + method + " " + path}
+        try:
+            payload = json.loads(body)
+        except ValueError as error:
+            return 400, {"error": "Invalid JSON: " + str(error)}
+        try:
+            if path == "/screen":
+                return 200, (await self.screen_many([payload]))[0]
+            items = payload.get("requests") if isinstance(payload, dict) else payload
+            if not isinstance(items, list):
+                raise ScreeningError("Expected {\"requests\": [...]}")
+            return 200, {"results": await self.screen_many(items)}
+        except ScreeningError as error:
+            return error.status, {"error": str(error)}
+        except (OSError, asyncio.TimeoutError, RpcError, ProviderError, AbiDecodingError) as error:
+            return 502, {"error": "RPC failure: " + (str(error) or type(error).__name__)}
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, version = request_line.decode("latin-1").split()
+                headers = await read_headers(reader)
+                try:
+                    body = await read_body(reader, headers)
+                except ValueError:
+                    write_response(writer, 413, {"error": "Request body too large"}, False)
+                    break
+                try:
+                    status, response = await self.route(method, urllib.parse.urlsplit(path).path, body)
+                except Exception as error:
+                    status, response = 500, {"error": "Internal error: " + (str(error) or type(error).__name__)}
+                keep_alive = keeps_alive(version, headers)
+                write_response(writer, status, response, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    def warm_status(self, key):
+        state = self.warm_states[key]
+        return {"stale": state.stale, "block": state.block, "changed": state.changed, "error": state.error}
+
+    async def start(self, host="127.0.0.1", port=8080):
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        self.start_revalidation()
+        return server
+
+    def close(self):
+        for revalidation in self.revalidations.values():
+            revalidation.cancel()
+        for state in self.warm_states.values():
+            state.save()
+        for client in self.clients.values():
+            client.close()
+
+
+STATUS_REASONS = {
+    200: "OK", 400: "Bad Request", 404: "Not Found", 413: "Payload Too Large", 500: "Internal Server Error",
+    502: "Bad Gateway",
+}
+
+
+def write_response(writer, status, response, keep_alive):
+    body = json.dumps(response).encode()
+    writer.write(
+        ("HTTP/1.1 " + str(status) + " " + STATUS_REASONS.get(status, "") + "\r\n"
+         "Content-Type: application/json\r\nContent-Length: " + str(len(body)) + "\r\n"
+         "Connection: " + ("keep-alive" if keep_alive else "close") + "\r\n\r\n").encode()
+        + body
+    )
+
+
+async def serve(service, host="127.0.0.1", port=8080):
+    server = await service.start(host, port)
+    print("Screening service listening on http://" + host + ":" + str(server.sockets[0].getsockname()[1]))
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+
+def main(args=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="HTTP calldata screening service")
+    parser.add_argument("--rpc", action="append", required=True, metavar="CHAIN_ID=URL", help="Node of a chain (repeatable)")
+    parser.add_argument(
+        "--configuration", action="append", metavar="PATH",
+        help="Configuration directory of an origin (repeatable, default: configuration/)",
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--max-connections", type=int, default=DEFAULT_MAX_CONNECTIONS, help="Connections per node")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT, help="RPC timeout in seconds")
+    parser.add_argument(
+        "--warm-start", action="store_true",
+        help="Serve persisted results and snapshots while revalidating them (see yearn_allowlist.warmup)",
+    )
+    parser.add_argument("--snapshots", help="Directory of snapshots and persisted results (default: snapshots/)")
+    args = parser.parse_args(args)
+
+    clients = {}
+    for rpc in args.rpc:
+        chain_id, separator, url = rpc.partition("=")
+        if not separator or not chain_id.isdigit():
+            parser.error("--rpc expects CHAIN_ID=URL, got " + rpc)
+        clients[int(chain_id)] = AsyncRpcClient(url, args.max_connections, args.timeout)
+    warm_states = None
+    if args.warm_start:
+        warm_states = {
+            (chain_id, state.origin_name): state for chain_id, state in load_warm_states(sorted(clients), args.snapshots).items()
+        }
+    service = ScreeningService(clients, args.configuration or [CONFIGURATION_PATH], warm_states=warm_states)
+    try:
+        asyncio.run(serve(service, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,344 @@
+"""
+Implementation simulators
+
+Python ports of the view methods of the implementation contracts in
+contracts/implementations/. They answer requirements from a state snapshot
+(registry vaults, listed markets, gauges, zap and migrator flags) instead of
+eth_calls, so a validator using `SimulatorBackend` needs no RPC at all.
+
+A snapshot maps implementation ids to the contract behind them and its state:
+
+    {
+      "IMPLEMENTATION_YEARN_VAULTS": {
+        "contract": "AllowlistImplementationYearnVaults",
+        "address": "0x...",
+        "state": {"vaults_by_token": {"0x...": ["0x..."]}, "zap_in_contracts": [...], ...}
+      },
+      ...
+    }
+
+Address lists in state are lowercase hex or memory-mapped `AddressSet`s (see
+address_sets.map_snapshot). `DifferentialBackend` compares the simulators with
+the real contracts to catch ports drifting from Solidity.
+"""
+from .address_sets import AddressSet
+from .backends import Backend, decode_argument
+
+
+class SimulationMismatch(AssertionError):
+    pass
+
+
+def address_set(addresses):
+    if isinstance(addresses, AddressSet):
+        return addresses
+    return frozenset(address.lower() for address in addresses)
+
+
+def registry_vaults(state):
+    """Vaults of a V2 registry, from a flat `vaults` list or `vaults_by_token`"""
+    if "vaults" in state:
+        return address_set(state["vaults"])
+    return address_set(vault for vaults in state.get("vaults_by_token", {}).values() for vault in vaults)
+
+
+def normalize_address(address):
+    """Lowercase address, or None if the snapshot has none so that nothing matches it"""
+    return address.lower() if address else None
+
+
+class ImplementationSimulator:
+    """
+    Base class for contract ports
+
+    `methods` maps Solidity view names to simulator methods taking the decoded
+    requirement argument. Unknown methods behave like a revert. `flag_methods`
+    read mappings that snapshots only hold for candidate addresses.
+    """
+    methods = {}
+    flag_methods = frozenset()
+
+    def __init__(self, state):
+        self.state = state
+
+    @classmethod
+    def from_state(cls, state):
+        return cls(state)
+
+    def call(self, method_name, value):
+        method = self.methods.get(method_name)
+        if method is None:
+            return False
+        return bool(getattr(self, method)(value))
+
+
+##############################################################
+# Contract ports
+##############################################################
+
+class YearnVaultsSimulator(ImplementationSimulator):
+    """
+    AllowlistImplementationYearnVaults
+
+    The V2 registry only lists a vault under its own `token()`, so a vault is
+    valid if any token lists it (or it was cached by `syncVaults`).
+    """
+    methods = {
+        "isVault": "is_vault",
+        "isVaultUnderlyingToken": "is_vault_underlying_token",
+        "isZapInContract": "is_zap_in_contract",
+        "isZapOutContract": "is_zap_out_contract",
+        "isMigratorContract": "is_migrator_contract",
+        "isPickleJarContract": "is_pickle_jar_contract",
+    }
+    flag_methods = frozenset(["isZapInContract", "isZapOutContract", "isMigratorContract", "isPickleJarContract"])
+
+    def __init__(self, state):
+        super().__init__(state)
+        self.vaults = registry_vaults(state)
+        self.cached_vaults = address_set(state.get("cached_vaults", []))
+        self.registered_tokens = address_set(state.get("registered_tokens", state.get("vaults_by_token", {})))
+        self.zap_in_contracts = address_set(state.get("zap_in_contracts", []))
+        self.zap_out_contracts = address_set(state.get("zap_out_contracts", []))
+        self.migrator_contracts = address_set(state.get("migrator_contracts", []))
+        self.pickle_jar_contracts = address_set(state.get("pickle_jar_contracts", []))
+
+    def is_vault(self, vault_address):
+        return vault_address in self.cached_vaults or vault_address in self.vaults
+
+    def is_vault_underlying_token(self, token_address):
+        return token_address in self.registered_tokens
+
+    def is_zap_in_contract(self, address):
+        return address in self.zap_in_contracts
+
+    def is_zap_out_contract(self, address):
+        return address in self.zap_out_contracts
+
+    def is_migrator_contract(self, address):
+        return address in self.migrator_contracts
+
+    def is_pickle_jar_contract(self, address):
+        return address in self.pickle_jar_contracts
+
+
+class IronBankSimulator(ImplementationSimulator):
+    """AllowlistImplementationIronBank"""
+    methods = {
+        "isMarket": "is_market",
+        "areMarkets": "are_markets",
+        "isComptroller": "is_comptroller",
+        "isMarketUnderlyingToken": "is_market_underlying_token",
+    }
+
+    def __init__(self, state):
+        super().__init__(state)
+        self.comptroller = normalize_address(state.get("comptroller"))
+        self.listed_markets = address_set(state.get("listed_markets", []))
+        self.underlying_tokens = address_set(state.get("underlying_tokens", []))
+        self.indexed_underlying_tokens = address_set(state.get("indexed_underlying_tokens", []))
+
+    def is_market(self, market_address):
+        return market_address in self.listed_markets
+
+    def are_markets(self, market_addresses):
+        return all(market_address in self.listed_markets for market_address in market_addresses)
+
+    def is_comptroller(self, address):
+        return address == self.comptroller
+
+    def is_market_underlying_token(self, token_address):
+        return token_address in self.indexed_underlying_tokens or token_address in self.underlying_tokens
+
+
+class VeYfiSimulator(ImplementationSimulator):
+    """AllowlistImplementationVeYFI"""
+    methods = {
+        "isVeYfiSpaceId": "is_ve_yfi_space_id",
+        "isVotingEscrow": "is_voting_escrow",
+        "isUnderlying": "is_underlying",
+        "isRewardPool": "is_reward_pool",
+        "isGauge": "is_gauge",
+        "isDelegateRegistry": "is_delegate_registry",
+        "isVault": "is_vault",
+        "isZapClaimContract": "is_zap_claim_contract",
+    }
+    flag_methods = frozenset(["isZapClaimContract"])
+
+    def __init__(self, state):
+        super().__init__(state)
+        self.ve_yfi_id = state["ve_yfi_id"].lower() if state.get("ve_yfi_id") else None
+        self.voting_escrow = normalize_address(state.get("voting_escrow"))
+        self.underlying = normalize_address(state.get("underlying"))
+        self.reward_pool = normalize_address(state.get("reward_pool"))
+        self.delegate_registry = normalize_address(state.get("delegate_registry"))
+        self.gauges = address_set(state.get("gauges", []))
+        self.vaults = address_set(state.get("vaults", []))
+        self.zap_claim_contracts = address_set(state.get("zap_claim_contracts", []))
+
+    def is_ve_yfi_space_id(self, id):
+        return id == self.ve_yfi_id
+
+    def is_voting_escrow(self, address):
+        return address == self.voting_escrow
+
+    def is_underlying(self, address):
+        return address == self.underlying
+
+    def is_reward_pool(self, address):
+        return address == self.reward_pool
+
+    def is_gauge(self, address):
+        return address in self.gauges
+
+    def is_delegate_registry(self, address):
+        return address == self.delegate_registry
+
+    def is_vault(self, vault_address):
+        return vault_address in self.vaults
+
+    def is_zap_claim_contract(self, address):
+        return address in self.zap_claim_contracts
+
+
+class PartnerTrackerSimulator(ImplementationSimulator):
+    """AllowlistImplementationPartnerTracker"""
+    methods = {
+        "isPartnerTracker": "is_partner_tracker",
+        "isVault": "is_vault",
+    }
+    partner_tracker = "0x8ee392a4787397126c163cb9844d7c447da419d8"
+
+    def __init__(self, state):
+        super().__init__(state)
+        self.vaults = registry_vaults(state)
+
+    def is_partner_tracker(self, address):
+        return address == self.partner_tracker
+
+    def is_vault(self, vault_address):
+        return vault_address in self.vaults
+
+
+class YearnLabsSimulator(ImplementationSimulator):
+    """YearnLabsAllowlistImplementation (constants only)"""
+    methods = {
+        "isPickleJar": "is_pickle_jar",
+        "isPickleGauge": "is_pickle_gauge",
+        "isYveCrvVault": "is_yve_crv_vault",
+        "isThreeCrvZap": "is_three_crv_zap",
+    }
+    pickle_jar = "0xced67a187b923f0e5ebcc77c7f2f7da20099e378"
+    pickle_gauge = "0xda481b277dce305b97f4091bd66595d57cf31634"
+    yve_crv_vault = "0xc5bddf9843308380375a611c18b50fb9341f502a"
+    three_crv_zap = "0x579422a1c774470ca623329c69f27cc3beb935a1"
+
+    def is_pickle_jar(self, address):
+        return address == self.pickle_jar
+
+    def is_pickle_gauge(self, address):
+        return address == self.pickle_gauge
+
+    def is_yve_crv_vault(self, address):
+        return address == self.yve_crv_vault
+
+    def is_three_crv_zap(self, address):
+        return address == self.three_crv_zap
+
+
+class YveCrvSimulator(ImplementationSimulator):
+    """AllowlistImplementationYveCRV (constants only)"""
+    methods = {
+        "isCRV": "is_crv",
+        "isYveCRV": "is_yve_crv",
+    }
+    crv = "0xd533a949740bb3306d119cc777fa900ba034cd52"
+    yve_crv = "0xc5bddf9843308380375a611c18b50fb9341f502a"
+
+    def is_crv(self, address):
+        return address == self.crv
+
+    def is_yve_crv(self, address):
+        return address == self.yve_crv
+
+
+# Contract name to simulator
+SIMULATORS = {
+    "AllowlistImplementationYearnVaults": YearnVaultsSimulator,
+    "AllowlistImplementationIronBank": IronBankSimulator,
+    "AllowlistImplementationVeYFI": VeYfiSimulator,
+    "AllowlistImplementationPartnerTracker": PartnerTrackerSimulator,
+    "YearnLabsAllowlistImplementation": YearnLabsSimulator,
+    "AllowlistImplementationYveCRV": YveCrvSimulator,
+}
+
+
+def simulators_from_snapshot(implementations):
+    """Build simulators by implementation id from the snapshot layout above"""
+    simulators = {}
+    for implementation_id, implementation in implementations.items():
+        simulator = SIMULATORS.get(implementation["contract"])
+        if simulator is None:
+            raise ValueError("No simulator for " + implementation["contract"])
+        simulators[implementation_id] = simulator.from_state(implementation.get("state", {}))
+    return simulators
+
+
+##############################################################
+# Backends
+##############################################################
+
+class SimulatorBackend(Backend):
+    """Evaluate requirements with simulators keyed by implementation id"""
+
+    def __init__(self, simulators):
+        self.simulators = dict(simulators)
+
+    def check(self, call):
+        simulator = self.simulators.get(call.implementation_id)
+        if simulator is None:
+            return False
+        try:
+            return simulator.call(call.method_name, decode_argument(call.param_type, call.argument))
+        except ValueError:
+            return False
+
+    def check_array(self, implementation_id, method_name, elements):
+        """Evaluate a requirement on an array param read in place (see Validator)"""
+        simulator = self.simulators.get(implementation_id)
+        if simulator is None:
+            return False
+        return simulator.call(method_name, elements)
+
+
+class DifferentialBackend(Backend):
+    """
+    Answer from `backend` and compare every answer with `reference`
+
+    Mismatches are recorded as (call, answer, reference answer) in
+    `mismatches`; with `strict` they raise SimulationMismatch instead. The
+    reference answer is returned, so validation stays correct while the
+    simulators are being checked.
+    """
+
+    def __init__(self, backend, reference, strict=False):
+        self.backend = backend
+        self.reference = reference
+        self.strict = strict
+        self.mismatches = []
+
+    def check(self, call):
+        return self.check_many([call])[0]
+
+    def check_many(self, calls):
+        answers = self.backend.check_many(calls)
+        reference_answers = self.reference.check_many(calls)
+        for call, answer, reference_answer in zip(calls, answers, reference_answers):
+            if answer != reference_answer:
+                if self.strict:
+                    raise SimulationMismatch(
+                        call.method_name + " on " + call.implementation_id + " returned " + str(answer)
+                        + ", the contract returned " + str(reference_answer)
+                    )
+                self.mismatches.append((call, answer, reference_answer))
+        return reference_answers
@@ -0,0 +1,48 @@
+"""
+Single-flight coalescing for asyncio
+
+Concurrent callers asking for the same key share one outstanding call: the
+first caller starts it, later callers wait on the same future and every waiter
+gets its result (or its exception). Once the call finishes the key is free
+again, so results are never served after the fact; caching is left to
+CachedBackend.
+
+    flights = SingleFlight()
+    result = await flights.run((to_address, calldata, block), lambda: send(to_address, calldata, block))
+"""
+import asyncio
+from dataclasses import dataclass
+
+
+@dataclass
+class FlightStats:
+    calls: int = 0  # Calls actually started
+    coalesced: int = 0  # Callers that joined a call in flight
+
+
+class SingleFlight:
+    def __init__(self):
+        self.in_flight = {}
+        self.stats = FlightStats()
+
+    def __len__(self):
+        return len(self.in_flight)
+
+    async def run(self, key, function):
+        """Await `function()` once for all concurrent callers with the same key"""
+        future = self.in_flight.get(key)
+        if future is None:
+            self.stats.calls += 1
+            future = asyncio.ensure_future(function())
+            self.in_flight[key] = future
+            future.add_done_callback(lambda done: self.finish(key, done))
+        else:
+            self.stats.coalesced += 1
+        # A cancelled waiter must not cancel the call the others are waiting on
+        return await asyncio.shield(future)
+
+    def finish(self, key, future):
+        if self.in_flight.get(key) is future:
+            del self.in_flight[key]
+        if not future.cancelled():
+            future.exception()  # Retrieved here in case every waiter was cancelled
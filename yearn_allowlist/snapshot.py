@@ -0,0 +1,278 @@
+"""
+Allowlist state snapshots
+
+A snapshot holds everything the implementation contracts consult, read at a
+single block, in the layout `simulators_from_snapshot` expects:
+
+    {
+      "version": 1,
+      "chain_id": 250,
+      "origin": "yearn.finance",
+      "block": 51234567,
+      "block_hash": "0x...",
+      "candidates": ["0x...", ...],
+      "implementations": {
+        "IMPLEMENTATION_YEARN_VAULTS": {"contract": "...", "address": "0x...", "state": {...}},
+        ...
+      }
+    }
+
+`export_snapshot` reads the state through brownie multicalls pinned to the
+block, `batch_size` calls per eth_call. scripts/chains/<id>/export_snapshot.py
+writes it to snapshots/<chain id>.json.
+"""
+import json
+import os
+import tempfile
+
+from .deployment import PROJECT_PATH
+from .simulators import SimulatorBackend, simulators_from_snapshot
+
+SNAPSHOT_VERSION = 1
+ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
+SNAPSHOT_PATH = os.path.join(PROJECT_PATH, "snapshots")
+DEFAULT_BATCH_SIZE = 500
+
+# Contract deployed for each implementation id
+IMPLEMENTATION_CONTRACTS = {
+    "IMPLEMENTATION_YEARN_VAULTS": "AllowlistImplementationYearnVaults",
+    "IMPLEMENTATION_IRON_BANK": "AllowlistImplementationIronBank",
+    "IMPLEMENTATION_VEYFI": "AllowlistImplementationVeYFI",
+    "IMPLEMENTATION_PARTNER_TRACKER": "AllowlistImplementationPartnerTracker",
+    "IMPLEMENTATION_YEARN_YVE_CRV": "AllowlistImplementationYveCRV",
+}
+
+
+class SnapshotError(ValueError):
+    pass
+
+
+def snapshot_path(chain_id, directory=None):
+    directory = directory or os.environ.get("SNAPSHOT_PATH", SNAPSHOT_PATH)
+    return os.path.join(directory, str(chain_id) + ".json")
+
+
+def write_snapshot(path, snapshot):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+    with os.fdopen(fd, "w") as snapshot_file:
+        json.dump(snapshot, snapshot_file, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def load_snapshot(path, chain_id=None):
+    """Read a snapshot file, rejecting other versions and chains"""
+    try:
+        with open(path, "r") as snapshot_file:
+            snapshot = json.load(snapshot_file)
+    except (OSError, ValueError) as error:
+        raise SnapshotError("Cannot read snapshot " + path + ": " + str(error))
+    if snapshot.get("version") != SNAPSHOT_VERSION:
+        raise SnapshotError("Unsupported snapshot version in " + path + ": " + repr(snapshot.get("version")))
+    if chain_id is not None and snapshot.get("chain_id") != int(chain_id):
+        raise SnapshotError("Snapshot " + path + " is for chain " + str(snapshot.get("chain_id")))
+    return snapshot
+
+
+def snapshot_backend(snapshot):
+    return SimulatorBackend(simulators_from_snapshot(snapshot["implementations"]))
+
+
+##############################################################
+# Export
+##############################################################
+
+def address(value):
+    return str(value).lower()
+
+
+def bytes32_hex(value):
+    hex_value = value.hex()
+    return hex_value if hex_value.startswith("0x") else "0x" + hex_value
+
+
+def batch_read(read, items, block, batch_size=DEFAULT_BATCH_SIZE):
+    """Return [read(item) for item in items], batch_size calls per multicall"""
+    from brownie import multicall
+
+    results = []
+    for start in range(0, len(items), batch_size):
+        with multicall(block_identifier=block):
+            batch = [read(item) for item in items[start:start + batch_size]]
+        results.extend(batch)
+    return results
+
+
+def read_block_hash(block):
+    from brownie import web3
+
+    return bytes32_hex(web3.eth.get_block(block)["hash"])
+
+
+def read_all(reads, block):
+    """Evaluate a dict of zero-argument reads in one multicall"""
+    names = list(reads)
+    return dict(zip(names, batch_read(lambda name: reads[name](), names, block, len(names) or 1)))
+
+
+def flagged(implementation, method_name, candidates, block, batch_size):
+    if not hasattr(implementation, method_name):
+        return []
+    method = getattr(implementation, method_name)
+    flags = batch_read(method, candidates, block, batch_size)
+    return [candidate for candidate, flag in zip(candidates, flags) if flag]
+
+
+def export_registry_vaults(registry, block, batch_size):
+    """Vaults per token of a V2 registry: numTokens/tokens, then numVaults/vaults"""
+    num_tokens = read_all({"num_tokens": registry.numTokens}, block)["num_tokens"]
+    tokens = [address(token) for token in batch_read(registry.tokens, list(range(int(num_tokens))), block, batch_size)]
+    num_vaults = batch_read(registry.numVaults, tokens, block, batch_size)
+    vault_ids = [(token, idx) for token, count in zip(tokens, num_vaults) for idx in range(int(count))]
+    vaults = batch_read(lambda vault_id: registry.vaults(*vault_id), vault_ids, block, batch_size)
+    vaults_by_token = {token: [] for token in tokens}
+    for (token, _), vault in zip(vault_ids, vaults):
+        vaults_by_token[token].append(address(vault))
+    return vaults_by_token
+
+
+def export_yearn_vaults(implementation, contract_at, candidates, block, batch_size):
+    registry = contract_at(read_all({"registry": implementation.registryAddress}, block)["registry"])
+    vaults_by_token = export_registry_vaults(registry, block, batch_size)
+    return {
+        "registry": address(registry.address),
+        "registered_tokens": sorted(vaults_by_token),
+        "vaults_by_token": vaults_by_token,
+        "zap_in_contracts": flagged(implementation, "isZapInContract", candidates, block, batch_size),
+        "zap_out_contracts": flagged(implementation, "isZapOutContract", candidates, block, batch_size),
+        "migrator_contracts": flagged(implementation, "isMigratorContract", candidates, block, batch_size),
+        "pickle_jar_contracts": flagged(implementation, "isPickleJarContract", candidates, block, batch_size),
+    }
+
+
+def export_iron_bank(implementation, contract_at, candidates, block, batch_size):
+    reads = {"comptroller": implementation.comptrollerAddress, "adapter": implementation.registryAdapterAddress}
+    if hasattr(implementation, "indexedUnderlyingTokensList"):
+        reads["indexed"] = implementation.indexedUnderlyingTokensList
+    values = read_all(reads, block)
+    comptroller = contract_at(values["comptroller"])
+    adapter = contract_at(values["adapter"])
+    values.update(read_all({"markets": comptroller.getAllMarkets, "tokens": adapter.assetsTokensAddresses}, block))
+    markets = [address(market) for market in values["markets"]]
+    listed = batch_read(comptroller.isMarketListed, markets, block, batch_size)
+    return {
+        "comptroller": address(values["comptroller"]),
+        "listed_markets": [market for market, is_listed in zip(markets, listed) if is_listed],
+        "underlying_tokens": [address(token) for token in values["tokens"]],
+        "indexed_underlying_tokens": [address(token) for token in values.get("indexed") or []],
+    }
+
+
+def export_ve_yfi(implementation, contract_at, candidates, block, batch_size):
+    values = read_all({
+        "voting_escrow": implementation.veYfiAddress,
+        "registry": implementation.veYfiRegistryAddress,
+        "delegate_registry": implementation.snapshotDelegateRegistry,
+        "ve_yfi_id": implementation.veYfiId,
+    }, block)
+    voting_escrow = contract_at(values["voting_escrow"])
+    registry = contract_at(values["registry"])
+    values.update(read_all({
+        "underlying": voting_escrow.token,
+        "reward_pool": voting_escrow.reward_pool,
+        "vaults": registry.getVaults,
+    }, block))
+    vaults = [address(vault) for vault in values["vaults"]]
+    # Vaults without a gauge answer the zero address, which is not a gauge
+    gauges = [address(gauge) for gauge in batch_read(registry.gauges, vaults, block, batch_size)]
+    return {
+        "voting_escrow": address(values["voting_escrow"]),
+        "underlying": address(values["underlying"]),
+        "reward_pool": address(values["reward_pool"]),
+        "delegate_registry": address(values["delegate_registry"]),
+        "registry": address(values["registry"]),
+        "ve_yfi_id": bytes32_hex(values["ve_yfi_id"]),
+        "vaults": vaults,
+        "gauges": [gauge for gauge in gauges if gauge != ZERO_ADDRESS],
+        "zap_claim_contracts": flagged(implementation, "isZapClaimContract", candidates, block, batch_size),
+    }
+
+
+def export_partner_tracker(implementation, contract_at, candidates, block, batch_size):
+    registry = contract_at(read_all({"registry": implementation.registryAddress}, block)["registry"])
+    return {"registry": address(registry.address), "vaults_by_token": export_registry_vaults(registry, block, batch_size)}
+
+
+def export_constants(implementation, contract_at, candidates, block, batch_size):
+    return {}
+
+
+EXPORTERS = {
+    "AllowlistImplementationYearnVaults": export_yearn_vaults,
+    "AllowlistImplementationIronBank": export_iron_bank,
+    "AllowlistImplementationVeYFI": export_ve_yfi,
+    "AllowlistImplementationPartnerTracker": export_partner_tracker,
+    "YearnLabsAllowlistImplementation": export_constants,
+    "AllowlistImplementationYveCRV": export_constants,
+}
+
+
+def export_snapshot(chain_id, allowlist, implementation_ids, contract_at, block, candidates=(), batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Read the state behind every implementation set on `allowlist`
+
+    Flag mappings (isZapInContract and the like) cannot be enumerated, so they
+    are read for each of `candidates`, typically the addresses in
+    configuration/chains/<id>/addresses.json. Unset implementations and ids
+    without a known contract are left out.
+    """
+    implementation_ids = sorted(set(implementation_ids) & set(IMPLEMENTATION_CONTRACTS))
+    candidates = sorted(set(address(candidate) for candidate in candidates))
+    origin_name = read_all({"origin": allowlist.name}, block)["origin"]
+    block_hash = read_block_hash(block)
+    implementation_addresses = batch_read(allowlist.implementationById, implementation_ids, block, batch_size)
+    implementations = {}
+    for implementation_id, implementation_address in zip(implementation_ids, implementation_addresses):
+        if int(str(implementation_address), 16) == 0:
+            continue
+        contract_name = IMPLEMENTATION_CONTRACTS[implementation_id]
+        implementation = contract_at(implementation_address)
+        implementations[implementation_id] = {
+            "contract": contract_name,
+            "address": address(implementation_address),
+            "state": EXPORTERS[contract_name](implementation, contract_at, candidates, block, batch_size),
+        }
+    return {
+        "version": SNAPSHOT_VERSION,
+        "chain_id": int(chain_id),
+        "origin": str(origin_name),
+        "block": int(block),
+        "block_hash": block_hash,
+        "candidates": candidates,
+        "implementations": implementations,
+    }
+
+
+def export_main(block=None, path=None):
+    """Entry point shared by scripts/chains/<id>/export_snapshot.py"""
+    from brownie import chain
+
+    from .config import load_chain_config, load_protocol_config
+    from .rpc_cache import cached_contract
+
+    chain_config = load_chain_config(chain.id)
+    block = int(block) if block is not None else chain.height
+    allowlist_registry = cached_contract(chain_config.allowlist_registry_address)
+    origin_name = load_protocol_config().origin_name
+    allowlist = cached_contract(allowlist_registry.allowlistAddressByOriginName(origin_name, block_identifier=block))
+    implementation_ids = [condition.implementation_id for condition in chain_config.conditions]
+    print("Exporting chain", chain.id, "at block", block)
+    snapshot = export_snapshot(
+        chain.id, allowlist, implementation_ids, cached_contract, block, candidates=chain_config.addresses.values()
+    )
+    path = path or snapshot_path(chain.id)
+    write_snapshot(path, snapshot)
+    for implementation_id, implementation in sorted(snapshot["implementations"].items()):
+        print(implementation_id + ":", implementation["address"])
+    print("Snapshot written to", path)
+    return snapshot
@@ -0,0 +1,110 @@
+"""
+Incremental condition sync
+
+Diffs the conditions stored on an allowlist against conditions.json and only
+sends what changed. addConditions replaces a condition with the same id, so
+changed conditions are re-added in place and are never missing. Additions are
+sent before deletions, and the sync only relies on addConditions and
+deleteConditions.
+"""
+from collections import namedtuple
+
+# Share of the block gas limit a single sync transaction may use
+GAS_LIMIT_FRACTION = 0.8
+
+SyncPlan = namedtuple("SyncPlan", ["adds", "updates", "removes", "unchanged"])
+
+
+def plan_sync(onchain_conditions, configured_conditions):
+    """
+    Compare on-chain conditions with configured ones, by id and content
+
+    Returns a SyncPlan of conditions to add, conditions to update, ids to
+    remove and the number of unchanged conditions.
+    """
+    onchain_by_id = {condition.id: condition for condition in onchain_conditions}
+    configured_ids = set()
+    adds = []
+    updates = []
+    unchanged = 0
+    for condition in configured_conditions:
+        configured_ids.add(condition.id)
+        onchain_condition = onchain_by_id.get(condition.id)
+        if onchain_condition is None:
+            adds.append(condition)
+        elif onchain_condition != condition:
+            updates.append(condition)
+        else:
+            unchanged += 1
+    removes = [condition.id for condition in onchain_conditions if condition.id not in configured_ids]
+    return SyncPlan(adds, updates, removes, unchanged)
+
+
+def chunk(items, estimate_gas, max_gas, name=str):
+    """
+    Split `items` into consecutive chunks whose estimated gas fits `max_gas`
+
+    `estimate_gas(chunk)` returns the gas of one transaction sending `chunk`.
+    Chunks are halved until they fit, so a diff that fits in one transaction
+    costs a single estimate. An item too large to send on its own raises
+    ValueError naming it with `name(item)`.
+    """
+    if not items:
+        return []
+    if len(items) == 1:
+        try:
+            gas = estimate_gas(items)
+        except ValueError as error:
+            raise ValueError("Cannot estimate gas for " + name(items[0]) + " alone: " + str(error))
+        if gas > max_gas:
+            raise ValueError(name(items[0]) + " exceeds the gas limit alone: " + str(gas) + " > " + str(max_gas))
+        return [items]
+    try:
+        fits = estimate_gas(items) <= max_gas
+    except ValueError:
+        # Nodes reject estimates above the block gas limit
+        fits = False
+    if fits:
+        return [items]
+    middle = len(items) // 2
+    return chunk(items[:middle], estimate_gas, max_gas, name) + chunk(items[middle:], estimate_gas, max_gas, name)
+
+
+def sync_conditions(allowlist, configured_conditions, owner, max_gas=None, on_batch=None):
+    """
+    Bring a brownie `allowlist` contract in line with `configured_conditions`
+
+    Reads the on-chain conditions once and returns the executed SyncPlan.
+    `on_batch(action, ids, receipt)` is called after each confirmed transaction,
+    with action "add" or "delete". Added and changed conditions are sent
+    first, then removed ones are deleted.
+    """
+    from brownie import chain
+
+    from .conditions import Condition
+
+    if max_gas is None:
+        max_gas = int(chain.block_gas_limit * GAS_LIMIT_FRACTION)
+    tx = {"from": owner}
+    onchain_conditions = [Condition.from_tuple(condition) for condition in allowlist.conditionsList()]
+    plan = plan_sync(onchain_conditions, configured_conditions)
+
+    added_conditions = [condition.to_tuple() for condition in plan.updates + plan.adds]
+    added_chunks = chunk(
+        added_conditions, lambda conditions: allowlist.addConditions.estimate_gas(conditions, tx), max_gas,
+        lambda condition: "condition " + condition[0],
+    )
+    for conditions in added_chunks:
+        receipt = allowlist.addConditions(conditions, tx)
+        if on_batch is not None:
+            on_batch("add", [condition[0] for condition in conditions], receipt)
+
+    removed_chunks = chunk(
+        plan.removes, lambda ids: allowlist.deleteConditions.estimate_gas(ids, tx), max_gas,
+        lambda id: "deleting condition " + id,
+    )
+    for ids in removed_chunks:
+        receipt = allowlist.deleteConditions(ids, tx)
+        if on_batch is not None:
+            on_batch("delete", ids, receipt)
+    return plan
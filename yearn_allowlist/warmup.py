@@ -0,0 +1,320 @@
+"""
+Cold-start warmup
+
+A restarted validator would send every check to the node until its caches
+fill up again. Instead, each chain starts from warm state: the requirement
+results persisted by the previous run (snapshots/<chain id>.results.json) and
+the chain's state snapshot (snapshots/<chain id>.json, answered by the
+simulators). Warm answers are served right away and flagged stale, while the
+persisted results are checked again in the background at the current block.
+Once that revalidation finishes, every check goes to the live backend.
+
+    warm_states = load_warm_states()
+    backend = WarmBackend(warm_states[250], CachedBackend(EthCallBackend(...)))
+    backend.start_revalidation(lambda: web3.eth.block_number)
+    answers = WarmValidator(load_conditions(250), backend).screen_many(transactions)
+    ...
+    warm_states[250].save()
+
+Revalidation is retried with exponential backoff. Warm answers are dropped,
+so every check goes to the live backend, once revalidation has failed
+`REVALIDATION_ATTEMPTS` times or `MAX_WARM_AGE` seconds after loading.
+"""
+from collections import OrderedDict
+from dataclasses import dataclass
+import json
+import os
+import threading
+import time
+import warnings
+
+from .backends import Backend, RequirementCall, decode_argument
+from .config import available_chain_ids, load_protocol_config
+from .engine import Validator
+from .result_cache import result_key
+from .simulators import simulators_from_snapshot
+from .snapshot import SnapshotError, load_snapshot, snapshot_path, write_snapshot
+
+RESULTS_VERSION = 1
+MAX_PERSISTED_RESULTS = 100000
+REVALIDATION_ATTEMPTS = 5
+REVALIDATION_BACKOFF = 1.0  # Seconds before the first retry, doubled after each failure
+MAX_WARM_AGE = 600.0  # Seconds warm answers are served without a successful revalidation
+
+
+@dataclass(frozen=True)
+class WarmAnswer:
+    allowed: bool
+    condition: object  # Matching Condition or None
+    stale: bool  # Relied on warm data that is still being revalidated
+
+
+def results_path(chain_id, directory=None):
+    return os.path.splitext(snapshot_path(chain_id, directory))[0] + ".results.json"
+
+
+def write_results(path, chain_id, block, results, origin_name=None):
+    """Persist {result key: answer} (see result_cache.result_key)"""
+    write_snapshot(path, {
+        "version": RESULTS_VERSION,
+        "chain_id": int(chain_id),
+        "origin": origin_name,
+        "block": block,
+        "results": [[implementation, method_name, param_type, "0x" + argument.hex(), result]
+                    for (implementation, method_name, param_type, argument), result in results.items()],
+    })
+
+
+def load_results(path, chain_id=None, origin_name=None):
+    """(block, {result key: answer}) of a results file"""
+    try:
+        with open(path, "r") as results_file:
+            persisted = json.load(results_file)
+        if persisted.get("version") != RESULTS_VERSION:
+            raise ValueError("unsupported version " + repr(persisted.get("version")))
+        if chain_id is not None and persisted.get("chain_id") != int(chain_id):
+            raise ValueError("results are for chain " + str(persisted.get("chain_id")))
+        if origin_name is not None and persisted.get("origin") not in (None, origin_name):
+            raise ValueError("results are for origin " + str(persisted.get("origin")))
+        results = {
+            (implementation, method_name, param_type, bytes.fromhex(argument[2:])): bool(result)
+            for implementation, method_name, param_type, argument, result in persisted["results"]
+        }
+    except (OSError, KeyError, TypeError, ValueError) as error:
+        raise SnapshotError("Cannot read results " + path + ": " + str(error))
+    return persisted.get("block"), results
+
+
+class WarmState:
+    """
+    Persisted answers of one chain and origin and the live answers observed since
+
+    `implementation_addresses` (by default the addresses in the snapshot) keys
+    answers like CachedBackend does. `origin_name` defaults to the origin the
+    snapshot was exported for, or the one in configuration/protocol.json.
+    """
+
+    def __init__(
+        self, chain_id, results=None, block=None, snapshot=None, implementation_addresses=None, directory=None,
+        origin_name=None, max_age=MAX_WARM_AGE, clock=time.monotonic,
+    ):
+        self.chain_id = int(chain_id)
+        self.origin_name = origin_name or (snapshot or {}).get("origin") or load_protocol_config().origin_name
+        self.directory = directory
+        self.results = dict(results or {})
+        self.block = block
+        implementations = snapshot["implementations"] if snapshot else {}
+        self.simulators = simulators_from_snapshot(implementations)
+        # Flag mappings were only read for these addresses
+        self.candidates = frozenset(snapshot.get("candidates", [])) if snapshot else frozenset()
+        if implementation_addresses is None:
+            implementation_addresses = {
+                implementation_id: implementation["address"]
+                for implementation_id, implementation in implementations.items() if "address" in implementation
+            }
+        self.implementation_addresses = {key: address.lower() for key, address in implementation_addresses.items()}
+        self.stale = bool(self.results or self.simulators)
+        self.changed = None  # Persisted answers that revalidation overturned
+        self.error = None  # Last revalidation error, or why warm answers were dropped
+        self.observed = OrderedDict()  # Live answers to persist, most recent last
+        self.lock = threading.Lock()
+        self.clock = clock
+        self.expires_at = clock() + max_age
+
+    @classmethod
+    def load(cls, chain_id, directory=None, implementation_addresses=None, origin_name=None):
+        """Warm state from the persisted files of a chain; missing or unreadable files start cold"""
+        origin_name = origin_name or load_protocol_config().origin_name
+        snapshot = None
+        block = None
+        results = {}
+        path = snapshot_path(chain_id, directory)
+        try:
+            if os.path.exists(path):
+                snapshot = load_snapshot(path, chain_id)
+                if snapshot.get("origin") not in (None, origin_name):
+                    raise SnapshotError("Snapshot " + path + " is for origin " + snapshot["origin"])
+                block = snapshot["block"]
+            path = results_path(chain_id, directory)
+            if os.path.exists(path):
+                block, results = load_results(path, chain_id, origin_name)
+        except SnapshotError as error:
+            warnings.warn("Starting chain " + str(chain_id) + " cold: " + str(error))
+            snapshot, block, results = None, None, {}
+        return cls(chain_id, results, block, snapshot, implementation_addresses, directory, origin_name)
+
+    def matches(self, implementation_addresses, implementation_ids):
+        """Whether `implementation_addresses` (as resolved on chain) are the ones warm answers are keyed by"""
+        resolved = {implementation_id: address.lower() for implementation_id, address in implementation_addresses.items()}
+        return all(
+            self.implementation_addresses.get(implementation_id) == resolved.get(implementation_id)
+            for implementation_id in implementation_ids
+        )
+
+    def key(self, call):
+        return result_key(call, self.implementation_addresses)
+
+    def warm_answer(self, call):
+        """Answer from persisted results or the snapshot, or None once revalidated or if unknown"""
+        if not self.stale:
+            return None
+        if self.clock() >= self.expires_at:
+            self.expire("not revalidated in time")
+            return None
+        result = self.results.get(self.key(call))
+        if result is not None:
+            return result
+        simulator = self.simulators.get(call.implementation_id)
+        if simulator is None or call.method_name not in simulator.methods:
+            return None
+        try:
+            value = decode_argument(call.param_type, call.argument)
+            answer = simulator.call(call.method_name, value)
+        except ValueError:
+            return None
+        if not answer and call.method_name in simulator.flag_methods and value not in self.candidates:
+            return None  # The snapshot does not know this address's flag
+        return answer
+
+    def observe(self, calls, answers):
+        """Record live answers for the next `save`"""
+        with self.lock:
+            for call, answer in zip(calls, answers):
+                key = self.key(call)
+                self.observed.pop(key, None)
+                self.observed[key] = answer
+            while len(self.observed) > MAX_PERSISTED_RESULTS:
+                self.observed.popitem(last=False)
+
+    def revalidation_calls(self):
+        """Requirement calls of the persisted results, for implementations with a known address"""
+        implementation_ids = {address: implementation_id for implementation_id, address in self.implementation_addresses.items()}
+        return [
+            RequirementCall(implementation_ids[implementation], method_name, param_type, argument)
+            for implementation, method_name, param_type, argument in self.results
+            if implementation in implementation_ids
+        ]
+
+    def finish_revalidation(self, block, calls, answers):
+        """Switch to live answers once `calls` were checked again at `block`"""
+        self.observe(calls, answers)
+        with self.lock:
+            self.changed = sum(self.results.get(self.key(call)) != answer for call, answer in zip(calls, answers))
+            self.block = block
+            self.stale = False
+            self.error = None
+            self.results = {}
+
+    def expire(self, error):
+        """Drop the warm answers without revalidating them"""
+        with self.lock:
+            self.error = error
+            self.stale = False
+            self.results = {}
+
+    def save(self):
+        """Persist the observed live answers (and any still unrevalidated ones)"""
+        with self.lock:
+            results = dict(self.results)
+            results.update(self.observed)
+            block = self.block
+        write_results(results_path(self.chain_id, self.directory), self.chain_id, block, results, self.origin_name)
+
+
+def load_warm_states(chain_ids=None, directory=None, origin_name=None):
+    """WarmState of each configured chain, for `origin_name` (by default the one in protocol.json)"""
+    return {
+        chain_id: WarmState.load(chain_id, directory, origin_name=origin_name)
+        for chain_id in (chain_ids or available_chain_ids())
+    }
+
+
+##############################################################
+# Sync backends
+##############################################################
+
+class WarmBackend(Backend):
+    """
+    Serve warm answers of `state` until it is revalidated, `backend` otherwise
+
+    Checks without a warm answer go to `backend` straight away.
+    """
+
+    def __init__(self, state, backend):
+        self.state = state
+        self.backend = backend
+        self.revalidation = None
+        self.error = None
+
+    def check_flagged(self, calls):
+        """(answer, stale) of each call"""
+        warm = {}
+        for call in calls:
+            answer = self.state.warm_answer(call)
+            if answer is not None:
+                warm[call] = answer
+        live_calls = list(dict.fromkeys(call for call in calls if call not in warm))
+        live = dict(zip(live_calls, self.backend.check_many(live_calls))) if live_calls else {}
+        self.state.observe(live_calls, [live[call] for call in live_calls])
+        return [(warm[call], True) if call in warm else (live[call], False) for call in calls]
+
+    def check_many(self, calls):
+        return [answer for answer, _ in self.check_flagged(calls)]
+
+    def revalidate(self, block):
+        """Check the persisted results again at `block` with the live backend"""
+        if hasattr(self.backend, "set_block"):
+            self.backend.set_block(block)
+        calls = self.state.revalidation_calls()
+        self.state.finish_revalidation(block, calls, self.backend.check_many(calls) if calls else [])
+
+    def start_revalidation(
+        self, current_block, attempts=REVALIDATION_ATTEMPTS, backoff=REVALIDATION_BACKOFF, sleep=time.sleep,
+    ):
+        """
+        Revalidate in a background thread at the block returned by
+        `current_block()`, retrying failures; warm answers keep being served,
+        flagged stale, until it succeeds or gives up
+        """
+        def run():
+            for attempt in range(attempts):
+                try:
+                    self.revalidate(current_block())
+                    return
+                except Exception as error:
+                    self.error = error
+                    self.state.error = str(error)
+                if attempt + 1 < attempts:
+                    sleep(backoff * 2 ** attempt)
+            self.state.expire("revalidation failed " + str(attempts) + " times: " + str(self.error))
+        self.revalidation = threading.Thread(target=run, name="warmup-" + str(self.state.chain_id), daemon=True)
+        self.revalidation.start()
+        return self.revalidation
+
+
+def stale_flags(candidates, conditions, stale_calls):
+    """Whether the answer for each transaction relied on a stale call"""
+    flags = []
+    for route_calls, condition in zip(candidates, conditions):
+        if condition is not None:
+            # Only the matching route decided the answer
+            route_calls = [next((route, calls) for route, calls in route_calls if route.condition is condition)]
+        flags.append(any(call in stale_calls for _, calls in route_calls for call in calls))
+    return flags
+
+
+class WarmValidator(Validator):
+    """Validator whose answers carry the stale flag of a WarmBackend"""
+
+    def screen_many(self, transactions):
+        candidates, calls = self.candidate_calls(transactions)
+        flagged = dict(zip(calls, self.backend.check_flagged(calls)))
+        conditions = self.select_conditions(candidates, {call: answer for call, (answer, _) in flagged.items()})
+        stale_calls = {call for call, (_, stale) in flagged.items() if stale}
+        return [
+            WarmAnswer(condition is not None, condition, stale)
+            for condition, stale in zip(conditions, stale_flags(candidates, conditions, stale_calls))
+        ]
+
+    def screen(self, target, data):
+        return self.screen_many([(target, data)])[0]